@@ -3,16 +3,20 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from scipy.ndimage import gaussian_filter
-import os
-import pickle
+from scaler import get_scaler
+from prediction_cache import PredictionStore
+from data_source import frame_fingerprint
+from spc_rules import evaluate_cube
+import model_registry
+import precompute
+from compute_engine import get_engine
+import wafer_map
+import density
+import tracing
 
 # ------------------------------------------------------
-# 0. REAL/FALSE LGBM 모델 설정
+# 0. REAL/FALSE LGBM 모델 설정 (파일 경로 / 버전은 model_registry)
 # ------------------------------------------------------
-current_dir = os.path.dirname(os.path.abspath(__file__))
-MODEL_REAL_FAKE_PATH = os.path.join(current_dir, "lgbm_v4.pkl")
-
 # 학습에 사용했던 피처 목록
 FEATURES = [
     '가로길이', '세로길이', '검출면적', '직경크기', '신호강도', '신호극성',
@@ -21,33 +25,38 @@ FEATURES = [
 ]
 
 
-@st.cache_resource
 def load_real_fake_model():
-    """lgbm_v4.pkl 로드 (REAL/FALSE 분류용)"""
-    if not os.path.exists(MODEL_REAL_FAKE_PATH):
-        return None, f"❌ REAL/FALSE 모델 파일 없음: {MODEL_REAL_FAKE_PATH}"
-    try:
-        with open(MODEL_REAL_FAKE_PATH, "rb") as f:
-            model = pickle.load(f)
-        return model, None
-    except Exception as e:
-        return None, f"❌ REAL/FALSE 모델 로딩 오류: {e}"
+    """lgbm_v4.pkl (REAL/FALSE 분류용) — machine 페이지와 같은 객체 공유"""
+    return model_registry.get("real_fake")
+
+
+@st.cache_resource
+def get_prediction_store():
+    """알람 리포트 예측 캐시 (프로세스 공유)"""
+    return PredictionStore()
+
+
+@st.cache_data(max_entries=16)
+def get_binned_wafer_map(_df: pd.DataFrame, fingerprint: str, color_col: str):
+    """필터 결과(지문)별 격자 집계 웨이퍼 맵"""
+    return wafer_map.bin_by_category(_df['wafer_x'], _df['wafer_y'], _df[color_col], color_col=color_col)
+
+
+@st.cache_resource(max_entries=8)
+def get_density_pyramid(_df: pd.DataFrame, fingerprint: str):
+    """원본(지문)별 밀도 피라미드 — 필터는 select 로 그룹 격자만 합산 (해상도/sigma/필터 변경 시 재사용)"""
+    return density.DensityPyramid(_df)
 
 
 def robust_scale_for_kpi(df: pd.DataFrame, feature_cols):
     """
-    KPI용 로버스트 스케일링 (df 전체를 기준으로 median / IQR 계산)
+    KPI용 로버스트 스케일링 (df 전체를 기준으로 median / IQR 계산, 스케일러는 캐시 재사용)
     """
-    ref = df[feature_cols].select_dtypes(include="number")
-    med = ref.median()
-    q1 = ref.quantile(0.25)
-    q3 = ref.quantile(0.75)
-    iqr = (q3 - q1).replace(0, 1.0)
-    x = ref.astype(float)
-    return (x - med) / iqr
+    return get_scaler(df, feature_cols).transform(df)
 
 
-def show_page(df):
+def show_page(df, df_all=None):
+    """df: 필터 결과 / df_all: 필터 전 원본 (있으면 밀도 피라미드를 원본 1개로 만들고 필터는 select 로 적용)"""
     if df.empty:
         st.warning("데이터가 존재하지 않습니다.")
         return
@@ -127,19 +136,16 @@ def show_page(df):
     # ------------------------------------------------------------------
     # 2. KPI Cards
     # ------------------------------------------------------------------
-    total_wafers = len(df)
-
-    defect_df = df[df['불량여부'].astype(str).str.upper().isin(['REAL', '1', 'TRUE', 'DEFECT'])]
-    defect_count = len(defect_df)
+    # 사전 집계가 있으면 그대로 사용 (없으면 같은 함수로 즉시 계산)
+    with tracing.stage("KPI.kpi_cards", rows=len(df)):
+        cards = precompute.lookup(st.session_state, "kpi") or get_engine().kpi_cards(df)
+    total_wafers = cards["total"]
+    defect_count = cards["defect_count"]
+    avg_defects = cards["avg_defects"]
 
     defect_rate = (defect_count / total_wafers) * 100 if total_wafers > 0 else 0
     yield_rate = 100 - defect_rate
 
-    if 'defect_count' in df.columns:
-        avg_defects = df['defect_count'].mean()
-    else:
-        avg_defects = defect_count / total_wafers if total_wafers > 0 else 0
-
     c1, c2, c3, c4 = st.columns(4)
     c1.metric(" 총 웨이퍼 수", f"{total_wafers:,}", "건수")
     c2.metric(" 수율(Yield)", f"{yield_rate:.1f}%", "비율")
@@ -193,7 +199,11 @@ def show_page(df):
         )
 
         if group_col in df.columns:
-            chart_stats = df.groupby(group_col).size().reset_index(name='Count')
+            # 사전 집계가 있으면 그룹별 건수 재계산 생략
+            with tracing.stage("KPI.group_sizes", rows=len(df)):
+                sizes = precompute.lookup(st.session_state, "group_sizes") or {}
+                group_counts = sizes[group_col] if group_col in sizes else get_engine().group_sizes(df, [group_col])[group_col]
+            chart_stats = group_counts.reset_index(name='Count')
             chart_stats[group_col] = chart_stats[group_col].astype(str)
             chart_stats = chart_stats.sort_values(by='Count', ascending=True)
 
@@ -238,13 +248,24 @@ def show_page(df):
             st.rerun()
 
         if 'wafer_x' in df.columns and 'wafer_y' in df.columns:
+            map_fp = frame_fingerprint(df, ['wafer_x', 'wafer_y'])
+
             if st.session_state['use_blur']:
-                # Blur mode
+                # Blur mode (캐시된 밀도 피라미드에서 해상도/sigma 만 바꿔서 표시)
+                r1, r2 = st.columns(2)
+                blur_bins = r1.select_slider(
+                    "해상도", options=list(density.RESOLUTIONS), value=100, key='blur_bins'
+                )
+                blur_sigma = r2.slider("sigma", 1.0, 12.0, 4.0, 0.5, key='blur_sigma')
+
                 try:
-                    heatmap, xedges, yedges = np.histogram2d(
-                        df['wafer_x'], df['wafer_y'], bins=100
-                    )
-                    heatmap_blurred = gaussian_filter(heatmap, sigma=4)
+                    with tracing.stage("KPI.density_blur", rows=len(df)):
+                        if df_all is not None and 'filter_selection' in st.session_state:
+                            pyramid = get_density_pyramid(df_all, frame_fingerprint(df_all, ['wafer_x', 'wafer_y']))
+                            select = dict(zip(density.GROUP_COLS, st.session_state['filter_selection']))
+                        else:
+                            pyramid, select = get_density_pyramid(df, map_fp), None
+                        heatmap_blurred = pyramid.smoothed(blur_bins, blur_sigma, select)
                     fig_map = go.Figure(data=go.Heatmap(
                         z=heatmap_blurred.T,
                         colorscale='Plasma',
@@ -254,24 +275,47 @@ def show_page(df):
                     st.error("좌표 변환 중 오류가 발생했습니다.")
                     fig_map = go.Figure()
             else:
-                # Raw view
-                plot_df = df.copy()
-                plot_df[color_col] = plot_df[color_col].astype(str)
-
+                # Raw view (점 개수에 따라 raw / WebGL / 격자 집계 자동 선택)
                 custom_palette = [
                     '#6C5CE7', '#A29BFE', '#74B9FF', '#0984E3',
                     '#00CEC9', '#81ECEC', '#FD79A8', '#E84393'
                 ]
 
-                fig_map = px.scatter(
-                    plot_df,
-                    x='wafer_x',
-                    y='wafer_y',
-                    color=color_col,
-                    opacity=0.8,
-                    color_discrete_sequence=custom_palette
-                )
-                fig_map.update_traces(marker=dict(size=2))
+                render_mode = wafer_map.choose_render_mode(len(df))
+
+                if render_mode == "binned":
+                    with tracing.stage("KPI.wafer_bin", rows=len(df)):
+                        plot_df = get_binned_wafer_map(df, map_fp, color_col)
+                    fig_map = px.scatter(
+                        plot_df,
+                        x='wafer_x',
+                        y='wafer_y',
+                        color=color_col,
+                        size='marker_size',
+                        size_max=6,
+                        opacity=0.8,
+                        hover_data={'count': True, 'marker_size': False},
+                        render_mode='webgl',
+                        color_discrete_sequence=custom_palette
+                    )
+                    fig_map.update_traces(marker=dict(line=dict(width=0)))
+                else:
+                    # 필요한 3개 컬럼만 추출 (전체 프레임 복사 없음)
+                    plot_df = pd.DataFrame({
+                        'wafer_x': df['wafer_x'].to_numpy(),
+                        'wafer_y': df['wafer_y'].to_numpy(),
+                        color_col: df[color_col].astype(str).to_numpy(),
+                    })
+                    fig_map = px.scatter(
+                        plot_df,
+                        x='wafer_x',
+                        y='wafer_y',
+                        color=color_col,
+                        opacity=0.8,
+                        render_mode='webgl' if render_mode == "webgl" else 'svg',
+                        color_discrete_sequence=custom_palette
+                    )
+                    fig_map.update_traces(marker=dict(size=2))
 
                 if plot_df[color_col].nunique() > 10:
                     fig_map.update_layout(showlegend=False)
@@ -284,7 +328,12 @@ def show_page(df):
                 xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
                 yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, scaleanchor="x", scaleratio=1)
             )
-            st.plotly_chart(fig_map, use_container_width=True)
+            # 점 개수만큼 커지는 figure 직렬화 (raw / webgl 모드)
+            with tracing.stage("KPI.plotly_chart[wafer_map]"):
+                st.plotly_chart(fig_map, use_container_width=True)
+
+            if not st.session_state['use_blur'] and render_mode == "binned":
+                st.caption(f"{len(df):,}개 점 → {len(plot_df):,}개 격자로 집계하여 표시")
         else:
             st.info("좌표 데이터(wafer_x, wafer_y)가 존재하지 않습니다.")
 
@@ -301,6 +350,21 @@ def show_page(df):
         unsafe_allow_html=True
     )
 
+    # 0) SPC 규칙 위반 (배치 평균 Nelson 규칙, 모델 없이도 표시)
+    if '배치번호' in df.columns:
+        with tracing.stage("KPI.spc_rules", rows=len(df)):
+            violations = evaluate_cube(get_engine().batch_cube(df), FEATURES)
+        n_drift = violations['feature'].nunique() if not violations.empty else 0
+        st.caption(f"📈 SPC 규칙 위반 {len(violations):,}건 (피처 {n_drift}개)")
+        if not violations.empty:
+            with st.expander("SPC 규칙 위반 보기 (최근 배치 순)"):
+                st.dataframe(
+                    violations.sort_values(['Batch_Index', 'rule'], ascending=[False, True], kind='stable')
+                              [['배치번호', 'feature', 'rule', 'description', 'value', 'z']]
+                              .reset_index(drop=True),
+                    use_container_width=True
+                )
+
     # 1) 모델 로드
     model, model_err = load_real_fake_model()
     if model_err:
@@ -315,86 +379,114 @@ def show_page(df):
         st.markdown("</div>", unsafe_allow_html=True)
         return
 
-    # 3) 예측 확률 생성 (불량(REAL) 확률)
-    try:
-        X_scaled = robust_scale_for_kpi(df, FEATURES)
-        proba = model.predict_proba(X_scaled)
-        y_pred_prob = proba[:, 1]
-    except Exception as e:
-        st.error(f"❌ 예측 중 오류가 발생했습니다: {e}")
-        st.markdown("</div>", unsafe_allow_html=True)
-        return
+    # 3) 예측 확률 생성 (불량(REAL) 확률, 이미 채점한 행은 캐시 재사용)
+    #    사전 집계가 있으면 요약/상위 K 는 저장값을 쓰고, 전체 목록을 펼칠 때만 채점
+    pre_alarm = precompute.lookup(st.session_state, "alarm")
+    if pre_alarm is not None and pre_alarm.get("model_version") != model_registry.version("real_fake"):
+        pre_alarm = None    # 다른 모델 버전으로 계산된 집계
+    _pred = {}
+
+    def predict_all():
+        if "prob" not in _pred:
+            # rows: 캐시에 없어서 실제로 채점한 행 수
+            with tracing.stage("KPI.predict_proba") as span:
+                store = get_prediction_store()
+                _pred["prob"] = store.predict_proba(
+                    df, model, model_registry.version("real_fake"), get_scaler(df, FEATURES), FEATURES
+                )
+                span.rows = store.last_scored
+            # 구간별 샘플 분류 (우선순위: 공정이상 > 불량 > 경고 > 정상)
+            _pred["tiers"] = precompute.alarm_tiers(_pred["prob"])
+        return _pred["prob"], _pred["tiers"]
+
+    if pre_alarm is None:
+        try:
+            _, tiers = predict_all()
+        except Exception as e:
+            st.error(f"❌ 예측 중 오류가 발생했습니다: {e}")
+            st.markdown("</div>", unsafe_allow_html=True)
+            return
+        counts = {t: len(idx) for t, idx in tiers.items()}
+    else:
+        counts = pre_alarm["counts"]
 
     # 4) 임계값 정의
-    threshold_warning = 0.4000
-    threshold_defect  = 0.6826
-    threshold_anomaly = 0.9546
-
-    # 5) 구간별 샘플 분류 (우선순위: 공정이상 > 불량 > 경고 > 정상)
-    anomaly_indices = np.where(y_pred_prob >= threshold_anomaly)[0]
-    defect_indices  = np.where(
-        (y_pred_prob >= threshold_defect) &
-        (y_pred_prob < threshold_anomaly)
-    )[0]
-    warning_indices = np.where(
-        (y_pred_prob >= threshold_warning) &
-        (y_pred_prob < threshold_defect)
-    )[0]
-    normal_indices  = np.where(y_pred_prob < threshold_warning)[0]
-
-    # 6) 요약 메트릭
+    threshold_warning, threshold_defect, threshold_anomaly = precompute.ALARM_THRESHOLDS
+
+    # 5) 요약 메트릭
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("🚨 공정이상", f"{len(anomaly_indices):,}건")
-    c2.metric("🔴 불량", f"{len(defect_indices):,}건")
-    c3.metric("🟠 경고", f"{len(warning_indices):,}건")
-    c4.metric("🟢 정상", f"{len(normal_indices):,}건")
-
-    # 7) 상세(상위 5개)
-    def _show_top(indices, title, emoji, max_rows=5):
-        if len(indices) == 0:
+    c1.metric("🚨 공정이상", f"{counts['anomaly']:,}건")
+    c2.metric("🔴 불량", f"{counts['defect']:,}건")
+    c3.metric("🟠 경고", f"{counts['warning']:,}건")
+    c4.metric("🟢 정상", f"{counts['normal']:,}건")
+
+    # 6) 상세(상위 5개) — 구간별 실제 확률 상위 K개 + 전체 구간 페이징/내보내기
+    def _show_top(tier, title, emoji, max_rows=5, page_size=100):
+        n = counts[tier]
+        if n == 0:
             st.success(f"{emoji} {title}: 없음")
             return
 
-        show_cols = [
-            c for c in
-            ["공정명", "배치번호", "웨이퍼위치", "검사순번", "결함유형", "불량여부"]
-            if c in df.columns
-        ]
+        if pre_alarm is not None:
+            st.dataframe(pre_alarm["top"][tier].head(max_rows), use_container_width=True)
+        else:
+            prob, tiers = predict_all()
+            top = precompute.top_positions(prob, tiers[tier], max_rows)
+            st.dataframe(precompute.alarm_rows(df, prob, top), use_container_width=True)
+
+        if n <= max_rows:
+            return
 
-        rows = []
-        for i in indices[:max_rows]:
-            row = {c: df.iloc[i][c] for c in show_cols}
-            row["샘플인덱스"] = int(i)
-            row["예측확률"] = float(y_pred_prob[i])
-            rows.append(row)
+        if st.toggle(f"{emoji} 전체 {n:,}건 보기", key=f"alarm_all_{title}"):
+            try:
+                prob, tiers = predict_all()
+            except Exception as e:
+                st.error(f"❌ 예측 중 오류가 발생했습니다: {e}")
+                return
+            indices = tiers[tier]
+            ordered = indices[np.argsort(-prob[indices], kind="stable")]
+            n_pages = (len(ordered) - 1) // page_size + 1
+            page = st.number_input(
+                f"페이지 (1 ~ {n_pages})", min_value=1, max_value=n_pages, value=1,
+                key=f"alarm_page_{title}"
+            )
+            start = (page - 1) * page_size
+            st.dataframe(
+                precompute.alarm_rows(df, prob, ordered[start:start + page_size]), use_container_width=True
+            )
 
-        out = pd.DataFrame(rows).sort_values("예측확률", ascending=False)
-        st.dataframe(out, use_container_width=True)
+            st.download_button(
+                "CSV 내보내기",
+                precompute.alarm_rows(df, prob, ordered).to_csv(index=False).encode("utf-8-sig"),
+                file_name=f"alarm_{title.split()[0]}.csv",
+                mime="text/csv",
+                key=f"alarm_csv_{title}"
+            )
 
     with st.expander("상세 알람 보기 (클릭)"):
         # 1. CRITICAL (공정이상)
-        if len(anomaly_indices) > 0:
+        if counts['anomaly'] > 0:
             st.markdown(f"##### 🚨 CRITICAL 공정이상 (>= {threshold_anomaly})")
         _show_top(
-            anomaly_indices,
+            'anomaly',
             f"CRITICAL 공정이상 (>= {threshold_anomaly})",
             "🚨"
         )
 
         # 2. DEFECT (불량 의심)
-        if len(defect_indices) > 0:
+        if counts['defect'] > 0:
             st.markdown(f"##### 🔴 DEFECT 불량 의심 ({threshold_defect} ~ {threshold_anomaly})")
         _show_top(
-            defect_indices,
+            'defect',
             f"DEFECT 불량 의심 ({threshold_defect} ~ {threshold_anomaly})",
             "🔴"
         )
 
         # 3. WARNING (경고)
-        if len(warning_indices) > 0:
+        if counts['warning'] > 0:
             st.markdown(f"##### 🟠 WARNING 경고 ({threshold_warning} ~ {threshold_defect})")
         _show_top(
-            warning_indices,
+            'warning',
             f"WARNING 경고 ({threshold_warning} ~ {threshold_defect})",
             "🟠"
         )
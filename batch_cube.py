@@ -0,0 +1,248 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_source import frame_fingerprint
+
+# --------------------------------------------------------------------------------
+# 배치 통계 큐브
+#   배치(등장 순서) x 수치 피처 별 count / sum / sumsq / min / max
+#   - 정렬 1회 + reduceat 으로 모든 피처를 한 번에 집계
+#   - 새 배치/행은 update() 로 기존 큐브에 합산 (이력 재스캔 없음)
+#   - 앞쪽 행이 밀려나면 (실시간 링 버퍼) 다 밀려난 배치만 빼고 일부만 남은 배치는 남은 행으로 재집계
+# --------------------------------------------------------------------------------
+BATCH_COL = '배치번호'
+
+
+class BatchCube:
+    def __init__(self, batches, features, count, total, sumsq, vmin, vmax):
+        self.batches = pd.Index(batches)
+        self.features = list(features)
+        self.count, self.sum, self.sumsq = count, total, sumsq
+        self.min, self.max = vmin, vmax
+        self._pos = {f: i for i, f in enumerate(self.features)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features=None, batch_col: str = BATCH_COL):
+        if features is None:
+            features = df.select_dtypes(include="number").columns.tolist()
+        features = [f for f in features if f in df.columns and f != batch_col]
+
+        codes, batches = pd.factorize(df[batch_col], sort=False)   # 등장 순서 = Batch_Index
+        if isinstance(batches, pd.CategoricalIndex):
+            batches = batches.astype(object)    # chunk 마다 범주가 달라도 merge 가능하도록
+        n_feat = len(features)
+        if len(codes) == 0:
+            empty = np.zeros((0, n_feat))
+            return cls(batches, features, empty.astype(np.int64), empty, empty, empty, empty)
+
+        X = df[features].to_numpy(dtype=float)
+        order = np.argsort(codes, kind="stable")
+        Xs = X[order]
+        cs = codes[order]
+        starts = np.flatnonzero(np.r_[True, cs[1:] != cs[:-1]])
+
+        valid = ~np.isnan(Xs)
+        X0 = np.where(valid, Xs, 0.0)
+        with np.errstate(invalid="ignore"):
+            cube = cls(
+                batches, features,
+                np.add.reduceat(valid.astype(np.int64), starts),
+                np.add.reduceat(X0, starts),
+                np.add.reduceat(X0 * X0, starts),
+                np.fmin.reduceat(Xs, starts),
+                np.fmax.reduceat(Xs, starts),
+            )
+        return cube
+
+    def copy(self):
+        return BatchCube(self.batches, self.features, self.count.copy(), self.sum.copy(),
+                         self.sumsq.copy(), self.min.copy(), self.max.copy())
+
+    def merge(self, other: "BatchCube") -> "BatchCube":
+        """다른 큐브를 합산 (같은 배치는 누적, 새 배치는 뒤에 추가) — in-place"""
+        if other.features != self.features:
+            other = other.reindex_features(self.features)
+
+        batches = self.batches.append(other.batches[~other.batches.isin(self.batches)])
+        pos = batches.get_indexer(other.batches)
+        n_new = len(batches) - len(self.batches)
+
+        def _grow(a, fill):
+            if n_new == 0:
+                return a
+            return np.vstack([a, np.full((n_new, a.shape[1]), fill, dtype=a.dtype)])
+
+        self.count = _grow(self.count, 0)
+        self.sum = _grow(self.sum, 0.0)
+        self.sumsq = _grow(self.sumsq, 0.0)
+        self.min = _grow(self.min, np.nan)
+        self.max = _grow(self.max, np.nan)
+
+        np.add.at(self.count, pos, other.count)
+        np.add.at(self.sum, pos, other.sum)
+        np.add.at(self.sumsq, pos, other.sumsq)
+        self.min[pos] = np.fmin(self.min[pos], other.min)
+        self.max[pos] = np.fmax(self.max[pos], other.max)
+        self.batches = batches
+        return self
+
+    def take(self, rows) -> "BatchCube":
+        """배치 위치 목록만 골라서 (순서대로) 새 큐브"""
+        return BatchCube(self.batches[rows], self.features, self.count[rows], self.sum[rows],
+                         self.sumsq[rows], self.min[rows], self.max[rows])
+
+    def update(self, df_new: pd.DataFrame, batch_col: str = BATCH_COL) -> "BatchCube":
+        """새로 들어온 행만 집계해서 합산"""
+        return self.merge(BatchCube.from_frame(df_new, self.features, batch_col))
+
+    def reindex_features(self, features):
+        idx = [self._pos.get(f) for f in features]
+
+        def _take(a, fill):
+            out = np.full((a.shape[0], len(features)), fill, dtype=a.dtype)
+            for j, i in enumerate(idx):
+                if i is not None:
+                    out[:, j] = a[:, i]
+            return out
+
+        return BatchCube(self.batches, features, _take(self.count, 0), _take(self.sum, 0.0),
+                         _take(self.sumsq, 0.0), _take(self.min, np.nan), _take(self.max, np.nan))
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def batch_mean(self, feature: str) -> pd.Series:
+        """Batch_Index -> 배치 평균 (값이 없는 배치는 제외)"""
+        j = self._pos[feature]
+        cnt = self.count[:, j]
+        keep = np.flatnonzero(cnt > 0)
+        return pd.Series(self.sum[keep, j] / cnt[keep], index=pd.Index(keep, name='Batch_Index'), name=feature)
+
+    def batch_means(self) -> pd.DataFrame:
+        """(배치 x 피처) 평균 행렬 (값 없으면 NaN)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(self.count > 0, self.sum / np.maximum(self.count, 1), np.nan)
+        return pd.DataFrame(means, index=pd.Index(range(len(self.batches)), name='Batch_Index'),
+                            columns=self.features)
+
+    def totals(self, feature: str):
+        """전체 (n, 평균, 표본표준편차)"""
+        j = self._pos[feature]
+        n = int(self.count[:, j].sum())
+        if n == 0:
+            return 0, np.nan, np.nan
+        s, ss = self.sum[:, j].sum(), self.sumsq[:, j].sum()
+        mean = s / n
+        var = (ss - n * mean * mean) / (n - 1) if n > 1 else np.nan
+        return n, mean, float(np.sqrt(max(var, 0.0))) if n > 1 else np.nan
+
+
+def label_spans(df: pd.DataFrame, batch_col: str = BATCH_COL) -> pd.DataFrame:
+    """배치별 첫 / 마지막 행 인덱스 (index = 배치, 인덱스가 증가 순서인 데이터 기준)"""
+    labels = pd.DataFrame({"first": df.index, "last": df.index})
+    return labels.groupby(df[batch_col].to_numpy(), sort=False).agg({"first": "min", "last": "max"})
+
+
+def _merge_spans(*spans) -> pd.DataFrame:
+    return pd.concat(spans).groupby(level=0, sort=False).agg({"first": "min", "last": "max"})
+
+
+class CubeCache:
+    """데이터셋 지문별 큐브 캐시
+
+    - 뒤에 행이 추가된 경우: 추가분만 집계
+    - 앞쪽 행이 밀려나고 뒤에 추가된 경우 (실시간 링 버퍼가 가득 찬 뒤): 다 밀려난 배치는 빼고,
+      일부만 남은 배치는 남은 행으로 재집계, 추가분은 합산 — 남은 행은 다시 집계하지 않음
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        # fp -> (cube, n_rows, first_label, last_label, 배치별 첫/마지막 행 인덱스)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df: pd.DataFrame, batch_col: str = BATCH_COL) -> BatchCube:
+        fp = frame_fingerprint(df)
+        with self._lock:
+            hit = self._entries.get(fp)
+            if hit is not None:
+                self._entries.move_to_end(fp)
+                return hit[0]
+            entries = list(self._entries.items())
+
+        cube = spans = None
+        if len(df) and df.index.is_monotonic_increasing:
+            for prev_fp, (prev, n, first, last, prev_spans) in reversed(entries):
+                # 기존 큐브의 행들이 그대로 앞부분에 있으면 (append-only) 추가분만 집계
+                # 인덱스 양 끝만으로는 부족하므로 (DB 조회 결과는 항상 RangeIndex) 앞부분 지문까지 확인
+                if (n < len(df) and df.index[0] == first and df.index[n - 1] == last
+                        and frame_fingerprint(df.iloc[:n]) == prev_fp):
+                    new = df.iloc[n:]
+                    cube = prev.copy().update(new, batch_col)
+                    spans = _merge_spans(prev_spans, label_spans(new, batch_col))
+                    break
+                if first < df.index[0] <= last and df.index.is_unique:
+                    hit = self._evict_and_append(df, prev, last, prev_spans, batch_col)
+                    if hit is not None:
+                        cube, spans = hit
+                        break
+        if cube is None:
+            cube = BatchCube.from_frame(df, batch_col=batch_col)
+            spans = label_spans(df, batch_col)
+
+        with self._lock:
+            self._entries[fp] = (cube, len(df), df.index[0] if len(df) else None,
+                                 df.index[-1] if len(df) else None, spans)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cube
+
+    @staticmethod
+    def _evict_and_append(df, prev: BatchCube, last, spans: pd.DataFrame, batch_col: str):
+        """prev 의 앞쪽 행(인덱스 < df.index[0])이 빠지고 뒤에 행이 붙은 df -> (큐브, 배치별 행 인덱스) / None"""
+        features = [c for c in df.select_dtypes(include="number").columns if c != batch_col]
+        if features != prev.features:
+            return None
+
+        start = df.index[0]
+        k = df.index.searchsorted(last, side="right")
+        overlap, new = df.iloc[:k], df.iloc[k:]
+
+        spans = spans.reindex(prev.batches)
+        keep = (spans["first"] >= start).to_numpy()
+        cut = ((spans["first"] < start) & (spans["last"] >= start)).to_numpy()
+
+        # 일부만 밀려난 배치는 남은 행으로 다시 집계
+        if cut.any():
+            seg = overlap.loc[:spans["last"][cut].max()]
+            seg = seg[seg[batch_col].isin(prev.batches[cut])]
+        else:
+            seg = overlap.iloc[:0]
+        redo = BatchCube.from_frame(seg, prev.features, batch_col)
+
+        # 남은 행이 이전 큐브의 행과 같은지 확인 (피처별 값 개수 / 제곱합, 인덱스가 재사용된 다른 데이터 방지)
+        X = overlap[prev.features].to_numpy(dtype=float)
+        valid = ~np.isnan(X)
+        X0 = np.where(valid, X, 0.0)
+        if not (np.array_equal(valid.sum(axis=0), prev.count[keep].sum(axis=0) + redo.count.sum(axis=0))
+                and np.allclose((X0 * X0).sum(axis=0), prev.sumsq[keep].sum(axis=0) + redo.sumsq.sum(axis=0),
+                                rtol=1e-9, atol=0.0)):
+            return None
+
+        cube = prev.take(np.flatnonzero(keep)).merge(redo)
+        spans = pd.concat([spans[keep], label_spans(seg, batch_col)])
+        # Batch_Index 는 남은 데이터에서의 첫 등장 순서 (from_frame 과 같게)
+        order = np.argsort(spans["first"].reindex(cube.batches).to_numpy(), kind="stable")
+        cube = cube.take(order).update(new, batch_col)
+        return cube, _merge_spans(spans, label_spans(new, batch_col))
+
+
+# 프로세스 공유 캐시 (페이지/세션 간 같은 데이터셋이면 재사용)
+_shared_cache = CubeCache()
+
+
+def get_cube(df: pd.DataFrame, batch_col: str = BATCH_COL) -> BatchCube:
+    return _shared_cache.get(df, batch_col)
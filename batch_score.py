@@ -0,0 +1,214 @@
+# ==========================================
+# batch_score.py  (REAL/FALSE + 결함유형 오프라인 일괄 채점)
+#
+#   python batch_score.py night.parquet -o night_scored.parquet --workers 8
+#   python batch_score.py night.csv -o night_scored.csv --reference ref.parquet
+# ==========================================
+
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_source
+import model_registry
+import model_spec
+from scaler import RobustScaler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FEATURES = model_spec.FEATURES
+LOG_FEATURES = model_spec.LOG_FEATURES
+
+# 결과 파일에 그대로 남길 식별 컬럼
+ID_COLS = ["공정명", "결함유형", "배치번호", "웨이퍼위치", "검사순번"]
+
+DEFAULT_CHUNK_SIZE = 200_000
+
+
+# ==========================================
+# 1. 입력 스트리밍 (CSV / Parquet chunk)
+# ==========================================
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def iter_input_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, columns=None):
+    """입력 파일을 chunk_size 행씩 DataFrame 으로 읽기 (컬럼명은 정규화)"""
+    if _is_parquet(path):
+        pf = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [c for c in pf.schema_arrow.names if data_source.COL_MAP.get(c, c) in columns]
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas().rename(columns=data_source.COL_MAP)
+    else:
+        usecols = None
+        if columns is not None:
+            usecols = lambda c: data_source.COL_MAP.get(c, c) in columns
+        for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=usecols):
+            yield chunk.rename(columns=data_source.COL_MAP)
+
+
+def fit_reference_scaler(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> RobustScaler:
+    """기준 데이터의 피처 컬럼만 읽어서 스케일러 fit (UI 의 '전체' 필터와 같은 기준)"""
+    # float32 로 모아서 기준 데이터 메모리 절반으로 (컬럼 확인은 첫 chunk 에서, 인덱싱 전에)
+    parts = []
+    for c in iter_input_chunks(path, chunk_size, FEATURES):
+        if not parts:
+            missing = [f for f in FEATURES if f not in c.columns]
+            if missing:
+                raise ValueError(f"기준 데이터에 필요한 피처가 없습니다: {missing}")
+        parts.append(c[FEATURES].astype(np.float32))
+    if not parts:
+        raise ValueError(f"기준 데이터가 비어 있습니다: {path}")
+    return RobustScaler.fit(pd.concat(parts, ignore_index=True), FEATURES)
+
+
+# ==========================================
+# 2. 워커 (프로세스당 모델 1회 로딩)
+# ==========================================
+_worker = {}
+
+
+def _init_worker(rf_path: str, defect_path: str, scaler: RobustScaler):
+    model_rf, err_rf = model_registry.load_file("real_fake", rf_path)
+    if err_rf:
+        raise RuntimeError(err_rf)
+    model_defect, _ = model_registry.load_file("defect", defect_path)
+
+    # 프로세스 풀이 코어를 나눠 쓰므로 모델 내부 스레드는 1개로 제한
+    for m in (model_rf, model_defect):
+        if m is not None and hasattr(m, "set_params"):
+            try:
+                m.set_params(n_jobs=1)
+            except Exception:
+                pass
+
+    _worker.update(model_rf=model_rf, model_defect=model_defect, scaler=scaler)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    model_rf = _worker["model_rf"]
+    model_defect = _worker["model_defect"]
+    scaler = _worker["scaler"]
+
+    X = data_source.feature_matrix(chunk, FEATURES)
+    # chunk 마다 추론된 dtype 이 다르면 (예: 첫 chunk 의 결함유형이 전부 빈 값 -> float) Parquet
+    # 스키마가 첫 chunk 로 고정돼서 이후 기록이 실패하므로 문자열로 통일 (빈 값은 data_source 와 같이 'nan')
+    out = chunk[[c for c in ID_COLS if c in chunk.columns]].astype(str)
+
+    # REAL/FALSE
+    X_rf = pd.DataFrame(scaler.transform_array(X), columns=FEATURES)
+    classes_rf = np.asarray(getattr(model_rf, "classes_", np.array([0, 1])))
+    if hasattr(model_rf, "predict_proba") and 1 in classes_rf:
+        idx_real = int(np.where(classes_rf == 1)[0][0])
+        prob_real = np.asarray(model_rf.predict_proba(X_rf))[:, idx_real]
+    else:
+        prob_real = np.full(len(chunk), np.nan)
+
+    out["진성확률"] = prob_real
+    out["진성/가성"] = np.where(np.asarray(model_rf.predict(X_rf)) == 1, "진성", "가성")
+    out["공정상태"] = model_spec.get_quality_tiers(prob_real)
+
+    # 결함유형
+    if model_defect is not None:
+        X_def = pd.DataFrame(scaler.transform_array(X, log_cols=LOG_FEATURES), columns=FEATURES)
+        if hasattr(model_defect, "predict_proba"):
+            proba_def = np.asarray(model_defect.predict_proba(X_def))
+            idx_max = proba_def.argmax(axis=1)
+            out["결함코드"] = model_spec.map_defect_indices(idx_max)
+            out["결함코드확률"] = proba_def[np.arange(len(idx_max)), idx_max]
+        else:
+            raw = np.asarray(model_defect.predict(X_def)).ravel()
+            out["결함코드"] = model_spec.map_defect_indices(raw)
+            out["결함코드확률"] = np.nan
+
+    return out
+
+
+# ==========================================
+# 3. 결과 저장 (입력 순서 유지)
+# ==========================================
+class ResultWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._pq_writer = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if _is_parquet(self.path):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._pq_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first,
+                      index=False, encoding="utf-8-sig" if self._first else "utf-8")
+        self._first = False
+
+    def close(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+
+
+def run(input_path: str, output_path: str, reference: str = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None,
+        rf_path: str = model_spec.MODEL_REAL_FAKE_PATH, defect_path: str = model_spec.MODEL_DEFECT_PATH):
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+
+    scaler = fit_reference_scaler(reference or input_path, chunk_size)
+    for label, fpath in (("REAL/FALSE", rf_path), ("결함유형", defect_path)):
+        if os.path.exists(fpath):
+            print(f"  {label} 모델: {os.path.basename(fpath)} ({model_registry.file_sha256(fpath)})")
+    writer = ResultWriter(output_path)
+    n_rows = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rf_path, defect_path, scaler)) as pool:
+        pending = deque()
+        for chunk in iter_input_chunks(input_path, chunk_size):
+            pending.append(pool.submit(score_chunk, chunk))
+            # 메모리 상한: 워커 수 x 2 개 chunk 까지만 대기
+            while len(pending) >= workers * 2:
+                res = pending.popleft().result()
+                writer.write(res)
+                n_rows += len(res)
+        while pending:
+            res = pending.popleft().result()
+            writer.write(res)
+            n_rows += len(res)
+
+    writer.close()
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {n_rows:,}건 채점 완료 -> {output_path} ({elapsed:.1f}s, {n_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="REAL/FALSE + 결함유형 모델 오프라인 일괄 채점")
+    parser.add_argument("input", help="입력 CSV / Parquet")
+    parser.add_argument("-o", "--output", help="결과 파일 (.csv / .parquet)")
+    parser.add_argument("--reference", help="스케일링 기준 데이터 (기본: 입력 파일 전체)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rf-model", default=model_spec.MODEL_REAL_FAKE_PATH)
+    parser.add_argument("--defect-model", default=model_spec.MODEL_DEFECT_PATH)
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + "_scored" + os.path.splitext(args.input)[1]
+    run(args.input, output, args.reference, args.chunk_size, args.workers,
+        args.rf_model, args.defect_model)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+# ==========================================
+# benchmark.py  (페이지 hot path 벤치마크, 합성 데이터)
+#
+#   python benchmark.py                                        # 10k / 1M / 10M 행
+#   python benchmark.py --rows 10000 1000000 --json bench.json
+#   python benchmark.py --json new.json --compare bench.json   # 회귀가 있으면 exit 1
+#   python benchmark.py --only KPI. stats.                     # 단계 이름 접두어로 선택
+#
+#   synthetic.py 로 원본 CSV 스키마의 데이터를 만들어 CSV -> Parquet 캐시 -> 페이지 함수 순으로 측정
+#   - 단계별 첫 호출 시간 / 반복 최솟값 / 첫 호출 중 RSS 최대 증가량(MB)
+#   - 페이지 캐시(st.cache_*, 스케일러 / 예측 캐시)를 거치지 않는 계산 자체를 측정
+#   - REAL/FALSE 모델 파일이 없으면 합성 데이터로 학습한 stub 모델 사용 (meta.models 에 표시)
+#   - COMPUTE_ENGINE / MEMORY_MODE 환경변수가 그대로 적용됨 (meta 에 기록)
+# ==========================================
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # psutil 없으면 메모리 측정 생략
+    psutil = None
+
+import data_source
+import synthetic
+import model_registry
+import precompute
+import wafer_map
+import density
+from batch_cube import BatchCube
+from colstats import CPK_SPEC
+from compute_engine import get_engine
+from filter_index import FilterIndex
+from scaler import RobustScaler
+from spc_rules import evaluate_cube
+from startup_profile import REGRESSION_RATIO
+
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+FEATURES = data_source.FEATURES
+
+# 비교 시 이 시간(초) 미만인 단계는 회귀 판정에서 제외 (측정 잡음)
+MIN_COMPARE_SEC = 0.005
+
+SPC_VAR = "에너지값"
+HIST_VAR = "신호강도"
+
+
+# ==========================================
+# 1. 측정 도구
+# ==========================================
+class PeakRSS:
+    """with 블록 동안 RSS 최대 증가량(MB) — 별도 스레드에서 주기적으로 읽음"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_mb = None
+
+    def __enter__(self):
+        if psutil is None:
+            return self
+        self._proc = psutil.Process()
+        self._base = self._peak = self._proc.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, self._proc.memory_info().rss)
+
+    def __exit__(self, *exc):
+        if psutil is None:
+            return False
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, self._proc.memory_info().rss)
+        self.peak_mb = (self._peak - self._base) / 2 ** 20
+        return False
+
+
+def measure(fn, repeat: int = 3, setup=None) -> dict:
+    """첫 호출(메모리 포함) + 나머지 반복의 최솟값 (setup 은 매 호출 전, 시간 제외)"""
+    times = []
+    peak = None
+    for i in range(max(repeat, 1)):
+        if setup is not None:
+            setup()
+        if i == 0:
+            with PeakRSS() as mem:
+                t0 = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - t0)
+            peak = mem.peak_mb
+        else:
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return {"first_s": times[0], "best_s": min(times), "peak_mb": peak}
+
+
+# ==========================================
+# 2. 모델 (파일 없으면 stub)
+# ==========================================
+def stub_model(n_rows: int = 20_000, seed: int = 0):
+    """REAL/FALSE 대체 모델 (합성 데이터로 학습, classes_ = [0, 1])"""
+    df = synthetic.generate_frame(n_rows, seed + 1)
+    X = RobustScaler.fit(df, FEATURES).transform(df)
+    y = (df['불량여부'] == 'REAL').astype(int).to_numpy()
+    try:
+        from lightgbm import LGBMClassifier
+        model = LGBMClassifier(n_estimators=100, num_leaves=31, verbose=-1)
+    except ImportError:
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        model = HistGradientBoostingClassifier(max_iter=100)
+    return model.fit(X, y)
+
+
+def load_models(seed: int = 0):
+    """(모델 dict, 출처 dict) — 출처: 파일 버전 또는 'stub'"""
+    model, err = model_registry.get("real_fake")
+    if err:
+        return {"real_fake": stub_model(seed=seed)}, {"real_fake": "stub"}
+    return {"real_fake": model}, {"real_fake": model_registry.version("real_fake")}
+
+
+# ==========================================
+# 3. 단계 (페이지 hot path 와 같은 함수 호출)
+# ==========================================
+def _scatter_json(df: pd.DataFrame, color_col: str = '공정명') -> str:
+    """KPI 웨이퍼 맵 (점 개수별 raw / webgl / binned) + plotly 직렬화"""
+    import plotly.express as px
+    mode = wafer_map.choose_render_mode(len(df))
+    if mode == "binned":
+        plot_df = wafer_map.bin_by_category(df['wafer_x'], df['wafer_y'], df[color_col], color_col=color_col)
+        fig = px.scatter(plot_df, x='wafer_x', y='wafer_y', color=color_col, size='marker_size',
+                         size_max=6, render_mode='webgl')
+    else:
+        plot_df = pd.DataFrame({
+            'wafer_x': df['wafer_x'].to_numpy(),
+            'wafer_y': df['wafer_y'].to_numpy(),
+            color_col: df[color_col].astype(str).to_numpy(),
+        })
+        fig = px.scatter(plot_df, x='wafer_x', y='wafer_y', color=color_col,
+                         render_mode='webgl' if mode == "webgl" else 'svg')
+    return fig.to_json()
+
+
+def _density_json(df: pd.DataFrame) -> str:
+    """KPI 블러 맵 (histogram2d + gaussian) + plotly 직렬화"""
+    import plotly.graph_objects as go
+    grid = density.DensityPyramid(df).smoothed(100, 4.0)
+    return go.Figure(data=go.Heatmap(z=grid.T, colorscale='Plasma', showscale=False)).to_json()
+
+
+def _spc_json(df: pd.DataFrame) -> str:
+    import stats
+    cube = BatchCube.from_frame(df)
+    fig = stats.make_spc_chart_plotly(df, SPC_VAR, cube, evaluate_cube(cube, [SPC_VAR]))
+    return fig.to_json()
+
+
+def _predict(df: pd.DataFrame, model) -> dict:
+    """KPI 알람 리포트 채점 (스케일러 fit + predict_proba + 구간 분류)"""
+    prob = np.asarray(model.predict_proba(RobustScaler.fit(df, FEATURES).transform(df)))[:, 1]
+    return precompute.alarm_summary(df, prob)
+
+
+def stages(csv_path: str, df: pd.DataFrame, models: dict):
+    """[(이름, 함수, setup)] — df 는 Parquet 캐시에서 읽은 전체 컬럼 프레임"""
+    import machine
+    import scaler
+    engine = get_engine()
+    model = models["real_fake"]
+    num_cols = df.select_dtypes(include=np.number).columns.tolist()
+    cache_path = data_source.cache_path_for(csv_path)
+    dashboard_cols = data_source.PAGE_COLUMNS["Dashboard"]
+
+    def drop_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    f_index = FilterIndex(df)
+    proc = f_index.options(0)[0]
+    defect = f_index.options(1, proc)[-1]
+    batch = f_index.options(2, proc, defect)[0]
+
+    def filter_chain():
+        idx = FilterIndex(df)
+        idx.options(0)
+        idx.options(1, proc)
+        idx.options(2, proc, defect)
+        return idx.select(df, proc, defect, "전체")
+
+    return [
+        ("main.load_data[csv->parquet]", lambda: data_source.load_csv_frame(csv_path), drop_cache),
+        ("main.load_data[parquet]", lambda: data_source.load_csv_frame(csv_path), None),
+        ("main.load_data[Dashboard cols]", lambda: data_source.load_csv_frame(csv_path, dashboard_cols), None),
+        ("main.filter_chain", filter_chain, None),
+        ("main.filter_select[batch]", lambda: f_index.select(df, proc, defect, batch), None),
+        ("KPI.kpi_cards", lambda: engine.kpi_cards(df), None),
+        ("KPI.group_sizes", lambda: engine.group_sizes(df), None),
+        ("KPI.spc_rules", lambda: evaluate_cube(BatchCube.from_frame(df), FEATURES), None),
+        ("KPI.alarm_predict", lambda: _predict(df, model), None),
+        ("KPI.density_blur", lambda: _density_json(df), None),
+        ("KPI.wafer_scatter", lambda: _scatter_json(df), None),
+        ("stats.batch_cube", lambda: BatchCube.from_frame(df), None),
+        ("stats.spc_chart", lambda: _spc_json(df), None),
+        ("stats.column_stats", lambda: engine.column_stats(df, num_cols, CPK_SPEC), None),
+        ("stats.histogram", lambda: np.histogram(df[HIST_VAR].dropna(), bins=40), None),
+        # 페이지 첫 렌더처럼 기준 데이터 스케일러 fit 포함 (스케일러 캐시 비움)
+        ("machine.compute_false_direction",
+         lambda: machine.compute_false_direction(df.iloc[[0]], df, model, FEATURES), scaler._cache.clear),
+    ]
+
+
+# ==========================================
+# 4. 실행 / 보고서
+# ==========================================
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(rows=DEFAULT_ROWS, repeat: int = 3, seed: int = 0, workdir: str = None, only=None, log=print) -> dict:
+    """크기별 단계 측정 -> 보고서 dict (workdir 에 합성 CSV 가 있으면 재사용)"""
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix="wafer-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    cache_dir = data_source.CACHE_DIR
+    data_source.CACHE_DIR = os.path.join(workdir, "cache")
+
+    models, sources = load_models(seed)
+    results = []
+    try:
+        for n in rows:
+            csv_path = os.path.join(workdir, f"synthetic-{n}-s{seed}.csv")
+            if not os.path.exists(csv_path):
+                t0 = time.perf_counter()
+                synthetic.write_csv(csv_path, n, seed)
+                log(f"  합성 CSV {n:,}행 ({time.perf_counter() - t0:.1f}s) -> {csv_path}")
+            df = data_source.load_csv_frame(csv_path)
+
+            for name, fn, setup in stages(csv_path, df, models):
+                if only and not name.startswith(tuple(only)):
+                    continue
+                res = measure(fn, repeat, setup)
+                results.append({"rows": n, "stage": name, **res})
+                mem = "-" if res["peak_mb"] is None else f"{res['peak_mb']:.0f}MB"
+                log(f"{n:>11,}  {name:<34} {res['first_s']:9.4f}s {res['best_s']:9.4f}s {mem:>8}")
+            del df
+    finally:
+        data_source.CACHE_DIR = cache_dir
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "engine": get_engine().name,
+            "memory_mode": data_source.MEMORY_MODE,
+            "models": sources,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, previous: dict, ratio: float = REGRESSION_RATIO) -> pd.DataFrame:
+    """(rows, stage) 별 best_s 비교 (ratio 배 이상 느려지면 회귀)"""
+    prev = {(r["rows"], r["stage"]): r for r in previous.get("results", [])}
+    rows = []
+    for r in current["results"]:
+        p = prev.get((r["rows"], r["stage"]))
+        before = p["best_s"] if p else None
+        change = r["best_s"] / before if before else None
+        slower = change is not None and change >= ratio and r["best_s"] >= MIN_COMPARE_SEC
+        rows.append({"rows": r["rows"], "stage": r["stage"], "best_s": r["best_s"],
+                     "previous": before, "ratio": change, "regression": bool(slower)})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="페이지 hot path 벤치마크 (합성 데이터)")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 횟수 (첫 호출 포함)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="합성 CSV / Parquet 캐시 보관 경로 (기본: 임시 폴더, 종료 시 삭제)")
+    parser.add_argument("--only", nargs="*", help="측정할 단계 이름 접두어")
+    parser.add_argument("--json", help="결과 저장 경로")
+    parser.add_argument("--compare", help="이전 결과 JSON (회귀 표시)")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>11}  {'stage':<34} {'first':>10} {'best':>10} {'peak':>8}")
+    report = run(args.rows, args.repeat, args.seed, args.workdir, args.only)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 보고서 -> {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            table = compare(report, json.load(f))
+        pd.set_option("display.width", 160)
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if table["regression"].any():
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# 컬럼 통계 커널
+#   수치 컬럼 전체를 (행 x 컬럼) 행렬 하나로 만들어 한 번에 계산
+#   - describe() 항목 (count / mean / std / min / 25% / 50% / 75% / max)
+#   - ±3σ 이상치 개수
+#   - spec (LSL, USL) 기준 Cpk
+# --------------------------------------------------------------------------------
+DESCRIBE_COLS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+QUANTILES = (0.25, 0.50, 0.75)
+CPK_MIN_COUNT = 3
+
+# Cpk 규격 (LSL, USL)
+CPK_SPEC = {
+    "에너지값": (0, 6000),
+    "검출면적": (0, 0.5),
+    "신호강도": (0, 1500),
+    "잡음정도": (0, 800),
+    "명도수준": (0, 500),
+    "기준편차": (0, 300)
+}
+
+
+def cpk_vector(cols, n, mean, std, spec=None) -> np.ndarray:
+    """Cpk = min(USL - μ, μ - LSL) / 3σ (spec 없음 / 표본 부족 / σ=0 이면 NaN)"""
+    spec = dict(spec or {})
+    lsl = np.array([spec.get(c, (np.nan, np.nan))[0] for c in cols], dtype=float)
+    usl = np.array([spec.get(c, (np.nan, np.nan))[1] for c in cols], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cpk = np.minimum(usl - mean, mean - lsl) / (3 * std)
+    cpk[(np.asarray(n) < CPK_MIN_COUNT) | (std == 0)] = np.nan
+    return cpk
+
+
+def column_stats(df: pd.DataFrame, cols, spec=None) -> pd.DataFrame:
+    """컬럼별 describe + outliers(±3σ) + cpk (spec 이 없는 컬럼은 NaN)"""
+    cols = list(cols)
+    X = df[cols].to_numpy(dtype=float)
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, X, 0.0).sum(axis=0) / n
+        dev = np.where(valid, X - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+        std[n < 2] = np.nan
+
+        # ±3σ 밖 (NaN 비교는 False)
+        upper, lower = mean + 3 * std, mean - 3 * std
+        outliers = ((X > upper) | (X < lower)).sum(axis=0)
+
+        # 정렬 1회로 min / 분위수 / max (NaN 은 각 컬럼 끝으로 정렬됨)
+        Xs = np.sort(X, axis=0)
+        q = {}
+        for p in QUANTILES:
+            pos = p * (n - 1)
+            lo = np.clip(np.floor(pos).astype(np.int64), 0, None)
+            hi = np.clip(np.ceil(pos).astype(np.int64), 0, None)
+            v_lo = np.take_along_axis(Xs, lo[None, :], axis=0)[0]
+            v_hi = np.take_along_axis(Xs, hi[None, :], axis=0)[0]
+            q[p] = v_lo + (v_hi - v_lo) * (pos - lo)
+        last = np.clip(n - 1, 0, None)
+        vmin = Xs[0] if len(Xs) else np.full(len(cols), np.nan)
+        vmax = np.take_along_axis(Xs, last[None, :], axis=0)[0] if len(Xs) else vmin
+
+        cpk = cpk_vector(cols, n, mean, std, spec)
+
+    empty = n == 0
+    for a in (vmin, vmax, *q.values()):
+        a[empty] = np.nan
+
+    return pd.DataFrame({
+        'count': n.astype(float),
+        'mean': mean,
+        'std': std,
+        'min': vmin,
+        '25%': q[0.25],
+        '50%': q[0.50],
+        '75%': q[0.75],
+        'max': vmax,
+        'outliers': np.where(n < 2, 0, outliers),
+        'cpk': cpk,
+    }, index=pd.Index(cols))
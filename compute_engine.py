@@ -0,0 +1,305 @@
+# ==========================================
+# compute_engine.py  (대시보드 집계 백엔드: pandas / polars)
+#
+#   COMPUTE_ENGINE=polars streamlit run main.py
+#   python compute_engine.py --rows 100000 1000000 --repeat 3     # 엔진별 집계 시간 비교
+#
+#   페이지는 get_engine() 의 kpi_cards / group_sizes / column_stats / batch_cube 만 호출
+#   결과 형태는 엔진과 무관하게 같음 (pandas Series / DataFrame / BatchCube)
+#   polars 엔진은 lazy 쿼리를 collect_all 로 한 번에 실행 (멀티스레드),
+#   scan() 으로 Parquet 캐시를 직접 읽으면 필터/컬럼이 스캔 단계로 push-down
+# ==========================================
+
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:  # polars 없으면 pandas 엔진만 사용
+    pl = None
+
+import data_source
+import batch_cube
+import precompute
+from batch_cube import BatchCube, BATCH_COL
+from colstats import column_stats, cpk_vector, DESCRIBE_COLS, QUANTILES, CPK_SPEC
+
+COMPUTE_ENGINE = os.getenv("COMPUTE_ENGINE", "pandas").lower()
+_CACHE_SIZE = 8
+
+
+# ==========================================
+# 1. pandas (기존 구현)
+# ==========================================
+class PandasEngine:
+    name = "pandas"
+
+    def kpi_cards(self, df: pd.DataFrame) -> dict:
+        return precompute.kpi_cards(df)
+
+    def group_sizes(self, df: pd.DataFrame, cols=precompute.GROUP_COLS) -> dict:
+        return {c: df.groupby(c, observed=True).size() for c in cols if c in df.columns}
+
+    def column_stats(self, df: pd.DataFrame, cols, spec=None) -> pd.DataFrame:
+        return column_stats(df, cols, spec)
+
+    def batch_cube(self, df: pd.DataFrame, batch_col: str = BATCH_COL) -> BatchCube:
+        return batch_cube.get_cube(df, batch_col)
+
+
+# ==========================================
+# 2. polars (lazy 쿼리, 변환 결과는 데이터셋 지문별 캐시)
+# ==========================================
+class PolarsEngine:
+    name = "polars"
+
+    def __init__(self, max_entries: int = _CACHE_SIZE):
+        self.max_entries = max_entries
+        self._frames = OrderedDict()    # (지문, 컬럼) -> pl.DataFrame
+        self._cubes = OrderedDict()     # 지문 -> BatchCube
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # 입력 변환
+    # -------------------------
+    def _remember(self, store: OrderedDict, key, value):
+        with self._lock:
+            store[key] = value
+            store.move_to_end(key)
+            while len(store) > self.max_entries:
+                store.popitem(last=False)
+        return value
+
+    def _lazy(self, frame, cols=None):
+        """pandas DataFrame / polars (Lazy)Frame -> LazyFrame
+
+        pandas 는 cols 만 변환 (문자열 컬럼 변환 비용이 크므로 쿼리에 필요한 컬럼만)
+        """
+        if isinstance(frame, pl.LazyFrame):
+            return frame
+        if isinstance(frame, pl.DataFrame):
+            return frame.lazy()
+        cols = list(frame.columns) if cols is None else [c for c in cols if c in frame.columns]
+        key = (data_source.frame_fingerprint(frame), tuple(cols))
+        with self._lock:
+            hit = self._frames.get(key)
+        if hit is None:
+            hit = self._remember(self._frames, key, pl.from_pandas(frame[cols], include_index=False))
+        return hit.lazy()
+
+    @staticmethod
+    def _columns(lf) -> list:
+        return lf.collect_schema().names()
+
+    def scan(self, csv_path: str, filters=(), columns=None):
+        """정규화된 Parquet 캐시를 lazy 스캔 (필터/컬럼 push-down, '전체' 는 조건 없음)"""
+        cache_path = data_source.cache_path_for(csv_path)
+        if not os.path.exists(cache_path):
+            data_source.build_parquet_cache(csv_path, cache_path)
+        lf = pl.scan_parquet(cache_path)
+        for col, val in filters:
+            if val not in (None, "전체"):
+                lf = lf.filter(pl.col(col).cast(pl.Utf8) == val)
+        if columns is not None:
+            names = self._columns(lf)
+            lf = lf.select([c for c in dict.fromkeys(columns) if c in names])
+        return lf
+
+    # -------------------------
+    # 집계
+    # -------------------------
+    def kpi_cards(self, frame) -> dict:
+        lf = self._lazy(frame, ['불량여부', 'defect_count'])
+        exprs = [
+            pl.len().alias("total"),
+            pl.col('불량여부').cast(pl.Utf8).str.to_uppercase()
+              .is_in(precompute.DEFECT_TOKENS).sum().alias("defect_count"),
+        ]
+        if 'defect_count' in self._columns(lf):
+            exprs.append(pl.col('defect_count').cast(pl.Float64).mean().alias("avg_defects"))
+        row = lf.select(exprs).collect().row(0, named=True)
+
+        total, defect_count = int(row["total"]), int(row["defect_count"] or 0)
+        if "avg_defects" in row:
+            avg = row["avg_defects"]
+            avg_defects = float("nan") if avg is None else float(avg)
+        else:
+            avg_defects = defect_count / total if total > 0 else 0
+        return {"total": total, "defect_count": defect_count, "avg_defects": avg_defects}
+
+    def group_sizes(self, frame, cols=precompute.GROUP_COLS) -> dict:
+        lf = self._lazy(frame, cols)
+        cols = [c for c in cols if c in self._columns(lf)]
+        queries = [
+            lf.select(pl.col(c).cast(pl.Utf8)).drop_nulls().group_by(c).len().sort(c)
+            for c in cols
+        ]
+        out = {}
+        for c, res in zip(cols, pl.collect_all(queries)):
+            out[c] = pd.Series(res["len"].to_numpy().astype(np.int64),
+                               index=pd.Index(res[c].to_list(), name=c))
+        return out
+
+    def column_stats(self, frame, cols, spec=None) -> pd.DataFrame:
+        cols = list(cols)
+        lf = self._lazy(frame, cols)
+        exprs = []
+        for i, c in enumerate(cols):
+            x = pl.col(c).cast(pl.Float64)
+            mean, std = x.mean(), x.std(ddof=1)
+            exprs += [
+                x.count().alias(f"{i}|count"),
+                mean.alias(f"{i}|mean"),
+                std.alias(f"{i}|std"),
+                x.min().alias(f"{i}|min"),
+                *[x.quantile(p, interpolation="linear").alias(f"{i}|{p}") for p in QUANTILES],
+                x.max().alias(f"{i}|max"),
+                ((x > mean + 3 * std) | (x < mean - 3 * std)).sum().alias(f"{i}|outliers"),
+            ]
+        row = lf.select(exprs).collect().row(0, named=True) if cols else {}
+
+        def _vec(key):
+            return np.array([np.nan if row[f"{i}|{key}"] is None else row[f"{i}|{key}"]
+                             for i in range(len(cols))], dtype=float)
+
+        n, mean, std = _vec("count"), _vec("mean"), _vec("std")
+        out = pd.DataFrame({
+            'count': n,
+            'mean': mean,
+            'std': std,
+            'min': _vec("min"),
+            **{f"{int(p * 100)}%": _vec(p) for p in QUANTILES},
+            'max': _vec("max"),
+            'outliers': np.where(n < 2, 0, np.nan_to_num(_vec("outliers"))).astype(np.int64),
+            'cpk': cpk_vector(cols, n, mean, std, spec),
+        }, index=pd.Index(cols))
+        return out[DESCRIBE_COLS + ['outliers', 'cpk']]
+
+    def batch_cube(self, frame, batch_col: str = BATCH_COL) -> BatchCube:
+        key = data_source.frame_fingerprint(frame) if isinstance(frame, pd.DataFrame) else None
+        if key is not None:
+            with self._lock:
+                hit = self._cubes.get((key, batch_col))
+            if hit is not None:
+                return hit
+
+        if isinstance(frame, pd.DataFrame):
+            frame = frame[[batch_col] + frame.select_dtypes(include="number").columns.drop(batch_col, errors="ignore").tolist()]
+        lf = self._lazy(frame)
+        schema = lf.collect_schema()
+        features = [c for c, t in schema.items() if t.is_numeric() and c != batch_col]
+
+        aggs = []
+        for f in features:
+            x = pl.col(f).cast(pl.Float64)
+            aggs += [x.count().alias(f"{f}|n"), x.sum().alias(f"{f}|s"), (x * x).sum().alias(f"{f}|ss"),
+                     x.min().alias(f"{f}|min"), x.max().alias(f"{f}|max")]
+        # maintain_order=True -> 배치 등장 순서 = Batch_Index (pandas 큐브와 동일)
+        res = (lf.with_columns(pl.col(batch_col).cast(pl.Utf8))
+                 .group_by(batch_col, maintain_order=True).agg(aggs).collect())
+
+        def _mat(suffix, dtype=float):
+            if not features:
+                return np.zeros((res.height, 0), dtype=dtype)
+            return np.column_stack([res[f"{f}|{suffix}"].to_numpy().astype(dtype) for f in features])
+
+        cube = BatchCube(res[batch_col].to_list(), features, _mat("n", np.int64), _mat("s"), _mat("ss"),
+                         _mat("min"), _mat("max"))
+        if key is not None:
+            self._remember(self._cubes, (key, batch_col), cube)
+        return cube
+
+
+# ==========================================
+# 3. 엔진 선택
+# ==========================================
+_engines = {}
+
+
+def get_engine(name: str = None):
+    """COMPUTE_ENGINE (pandas | polars) 엔진 (polars 미설치 시 pandas)"""
+    name = (name or COMPUTE_ENGINE).lower()
+    if name == "polars" and pl is None:
+        name = "pandas"
+    if name not in _engines:
+        _engines[name] = PolarsEngine() if name == "polars" else PandasEngine()
+    return _engines[name]
+
+
+# ==========================================
+# 4. 벤치마크 (엔진별 같은 집계 시간 비교)
+# ==========================================
+def scale_rows(df: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    """원본을 반복해서 n_rows 행으로 (배치번호는 반복마다 새 라벨)"""
+    reps = int(np.ceil(n_rows / max(len(df), 1)))
+    parts = []
+    for r in range(reps):
+        part = df.copy()
+        if BATCH_COL in part.columns and r:
+            part[BATCH_COL] = part[BATCH_COL].astype(str) + f"-{r}"
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True).iloc[:n_rows]
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        sec = time.perf_counter() - t0
+        best = sec if best is None else min(best, sec)
+    return best
+
+
+def benchmark(df: pd.DataFrame, repeat: int = 3) -> pd.DataFrame:
+    """태스크별 pandas / polars 시간 (polars 는 변환 포함 첫 호출 + 변환 후 반복 호출)"""
+    num_cols = df.select_dtypes(include=np.number).columns.tolist()
+    tasks = {
+        "kpi_cards": lambda e, f: e.kpi_cards(f),
+        "group_sizes": lambda e, f: e.group_sizes(f),
+        "column_stats": lambda e, f: e.column_stats(f, num_cols, CPK_SPEC),
+        # 큐브 캐시 적중을 제외하려고 pandas 는 직접 생성
+        "batch_cube": lambda e, f: BatchCube.from_frame(f) if isinstance(e, PandasEngine) else e.batch_cube(f),
+    }
+    pandas_engine = PandasEngine()
+    lazy = PolarsEngine()._lazy(df) if pl is not None else None
+
+    rows = []
+    for task, fn in tasks.items():
+        row = {"rows": len(df), "task": task, "pandas": _best_of(lambda: fn(pandas_engine, df), repeat)}
+        if pl is not None:
+            row["polars"] = _best_of(lambda: fn(PolarsEngine(), lazy), repeat)
+            row["polars_cold"] = _best_of(lambda: fn(PolarsEngine(), df), 1)    # 필요한 컬럼 변환 포함
+            row["speedup"] = row["pandas"] / row["polars"]
+        rows.append(row)
+    return pd.DataFrame(rows).set_index(["rows", "task"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pandas / polars 집계 엔진 비교")
+    parser.add_argument("--csv", default=data_source.find_csv(), help="원본 CSV (없으면 합성 데이터)")
+    parser.add_argument("--rows", type=int, nargs="*", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.csv is None:
+        # 원본이 없으면 합성 데이터 (synthetic.py)
+        import synthetic
+        frames = (synthetic.generate_frame(n) for n in args.rows)
+    else:
+        base = data_source.load_csv_frame(args.csv)
+        frames = (scale_rows(base, n) for n in args.rows)
+    tables = [benchmark(df, repeat=args.repeat) for df in frames]
+    pd.set_option("display.width", 160)
+    print(pd.concat(tables).to_string(float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 없으면 기존 pandas CSV 경로만 사용
+    pa = None
+
+# --------------------------------------------------------------------------------
+# 0. 경로 / 컬럼 설정
+# --------------------------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+CSV_CANDIDATES = [
+    'C:\\Jupyer_Workspace\\project3\\cleaned_wafer_data.csv',
+    'C:\\Jupyer_Workspace\\project3\\반도체.csv'
+]
+
+# 변환된 Parquet 캐시 저장 위치
+CACHE_DIR = os.getenv("WAFER_CACHE_DIR", os.path.join(current_dir, ".cache"))
+
+# 캐시 포맷이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_SCHEMA_VERSION = 1
+
+# chunk 단위 스캔 시 한 번에 읽는 행 수
+CHUNK_ROWS = int(os.getenv("WAFER_CHUNK_ROWS", "500000"))
+
+# compact: 라벨 컬럼 category / 피처 float32 / 정수 컬럼 downcast 로 세션당 메모리 절감
+MEMORY_MODE = os.getenv("MEMORY_MODE", "standard").lower()
+COMPACT = MEMORY_MODE == "compact"
+FEATURE_DTYPE = np.float32 if COMPACT else np.float64
+
+COL_MAP = {
+    'Process': '공정명', 'process': '공정명',
+    'failureType': '결함유형', 'defect_type': '결함유형',
+    'lotName': '배치번호', 'batch_no': '배치번호',
+    'x': 'wafer_x', 'y': 'wafer_y',
+    'is_defect': '불량여부', 'label': '불량여부'
+}
+
+LABEL_DEFAULTS = {'공정명': 'Unknown', '결함유형': 'Normal', '배치번호': 'Batch_001'}
+LABEL_COLS = list(LABEL_DEFAULTS)
+
+NORMAL_TOKENS = ['none', 'normal', 'nan']
+
+FEATURES = [
+    '가로길이', '세로길이', '검출면적', '직경크기', '신호강도', '신호극성',
+    '에너지값', '기준편차', '명도수준', '잡음정도', '중심거리', '방향각도',
+    '정렬정도', '점형지수', '영역잡음', '상대강도', '활성지수', '패치신호', 'Aspect_Ratio'
+]
+
+# 페이지별 필요 컬럼 (None = 전체 컬럼)
+PAGE_COLUMNS = {
+    "Dashboard": LABEL_COLS + ['불량여부', 'wafer_x', 'wafer_y', '웨이퍼위치', '검사순번', 'defect_count'] + FEATURES,
+    "Stats": None,
+    "Machine": LABEL_COLS + FEATURES,
+}
+
+
+def find_csv():
+    """후보 경로 중 존재하는 CSV 경로 반환 (없으면 None)"""
+    env_path = os.getenv("WAFER_CSV_PATH")
+    for fpath in ([env_path] if env_path else []) + CSV_CANDIDATES:
+        if os.path.exists(fpath):
+            return fpath
+    return None
+
+
+# --------------------------------------------------------------------------------
+# 1. 공통 전처리 (pandas)
+# --------------------------------------------------------------------------------
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """컬럼명 통일 + 라벨 컬럼 문자열화 + 불량여부 파생 (in-place)"""
+    df.rename(columns=COL_MAP, inplace=True)
+
+    for col, default in LABEL_DEFAULTS.items():
+        if col not in df.columns:
+            df[col] = default
+
+    for col in LABEL_COLS:
+        df[col] = df[col].astype(str)
+
+    if '불량여부' not in df.columns:
+        is_normal = df['결함유형'].str.lower().isin(NORMAL_TOKENS)
+        df['불량여부'] = np.where(is_normal, 'NORMAL', 'REAL')
+
+    return df
+
+
+# --------------------------------------------------------------------------------
+# 2. Parquet 캐시 (CSV -> 1회 변환 -> 이후 memory-map 으로 필요한 컬럼만 읽기)
+# --------------------------------------------------------------------------------
+def source_signature(path: str) -> str:
+    """원본 파일 경로/수정시각/크기 기반 시그니처"""
+    st_ = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st_.st_mtime_ns}|{st_.st_size}|v{CACHE_SCHEMA_VERSION}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_path_for(csv_path: str) -> str:
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(CACHE_DIR, f"{base}-{source_signature(csv_path)}.parquet")
+
+
+def _normalize_table(table):
+    """pyarrow Table 에 normalize_columns 와 동일한 전처리 적용"""
+    names = [COL_MAP.get(n, n) for n in table.column_names]
+    table = table.rename_columns(names)
+
+    # 원본 인덱스 덤프 컬럼 제거 (column pruning)
+    keep = [n for n in table.column_names if not n.startswith('Unnamed:')]
+    table = table.select(keep)
+
+    for col, default in LABEL_DEFAULTS.items():
+        if col in table.column_names:
+            arr = pc.fill_null(pc.cast(table[col], pa.string()), 'nan')
+            table = table.set_column(table.column_names.index(col), col, arr)
+        else:
+            table = table.append_column(col, pa.array([default] * table.num_rows, pa.string()))
+
+    if '불량여부' not in table.column_names:
+        is_normal = pc.is_in(pc.utf8_lower(table['결함유형']), value_set=pa.array(NORMAL_TOKENS))
+        table = table.append_column('불량여부', pc.if_else(is_normal, 'NORMAL', 'REAL'))
+
+    # 라벨 컬럼은 dictionary 인코딩 (카디널리티가 낮아 용량/IO 가 크게 줄어듦)
+    for col in LABEL_COLS + ['불량여부']:
+        idx = table.column_names.index(col)
+        table = table.set_column(idx, col, pc.dictionary_encode(table[col]))
+
+    return table
+
+
+def build_parquet_cache(csv_path: str, cache_path: str = None) -> str:
+    """CSV 를 정규화된 Parquet 캐시로 1회 변환하고 경로 반환"""
+    cache_path = cache_path or cache_path_for(csv_path)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    table = pacsv.read_csv(csv_path)  # 멀티스레드 파서
+    table = _normalize_table(table)
+
+    tmp_path = cache_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd", use_dictionary=True, row_group_size=1_000_000)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def read_parquet_cache(cache_path: str, columns=None) -> pd.DataFrame:
+    """memory-map 으로 필요한 컬럼만 읽어 DataFrame 반환"""
+    schema = pq.read_schema(cache_path)
+    if columns is not None:
+        columns = [c for c in dict.fromkeys(columns) if c in schema.names]
+
+    table = pq.read_table(cache_path, columns=columns, memory_map=True)
+    return _decode_dictionaries(table).to_pandas()
+
+
+def _decode_dictionaries(table):
+    # 페이지 코드가 문자열 컬럼을 기대하므로 dictionary 는 풀어서 전달
+    # (compact 모드는 그대로 두면 to_pandas 가 category 로 변환)
+    if COMPACT:
+        return table
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, pc.cast(table[field.name], pa.string()))
+    return table
+
+
+def load_csv_frame(csv_path: str, columns=None) -> pd.DataFrame:
+    """Parquet 캐시가 있으면 재사용, 없으면 변환 후 읽기 (pyarrow 없으면 CSV 직접)"""
+    if pa is None:
+        df = normalize_columns(pd.read_csv(csv_path))
+        if columns is not None:
+            df = df[[c for c in dict.fromkeys(columns) if c in df.columns]]
+    else:
+        cache_path = cache_path_for(csv_path)
+        if not os.path.exists(cache_path):
+            build_parquet_cache(csv_path, cache_path)
+        df = read_parquet_cache(cache_path, columns)
+    return compact_frame(df) if COMPACT else df
+
+
+def iter_csv_chunks(csv_path: str, columns=None, filters=(), chunk_size: int = CHUNK_ROWS):
+    """정규화된 데이터를 chunk 단위로 순회 (필터/컬럼은 Parquet 스캔에 push-down)
+
+    filters: (('공정명', 'PC'), ('결함유형', '전체'), ...) — '전체' 는 조건 없음
+    """
+    filters = [(col, val) for col, val in filters if val not in (None, "전체")]
+
+    if pa is None:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            chunk = normalize_columns(chunk)
+            for col, val in filters:
+                chunk = chunk[chunk[col] == val]
+            if columns is not None:
+                chunk = chunk[[c for c in dict.fromkeys(columns) if c in chunk.columns]]
+            yield chunk
+        return
+
+    cache_path = cache_path_for(csv_path)
+    if not os.path.exists(cache_path):
+        build_parquet_cache(csv_path, cache_path)
+
+    dataset = pads.dataset(cache_path, format="parquet")
+    if columns is not None:
+        columns = [c for c in dict.fromkeys(columns) if c in dataset.schema.names]
+
+    expr = None
+    for col, val in filters:
+        cond = pc.field(col) == val
+        expr = cond if expr is None else expr & cond
+
+    for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=chunk_size):
+        if batch.num_rows:
+            yield _decode_dictionaries(pa.Table.from_batches([batch])).to_pandas()
+
+
+# --------------------------------------------------------------------------------
+# 3. compact 메모리 표현
+# --------------------------------------------------------------------------------
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """라벨 컬럼 -> category (범주는 정렬 순서), 피처 -> float32, 정수 컬럼 -> 최소 정수형"""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in LABEL_COLS or col == '불량여부':
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype("category")
+            # 사이드바 옵션 / 정렬이 문자열 모드와 같도록 범주를 정렬 (사용되지 않는 범주 제거)
+            s = s.cat.remove_unused_categories()
+            s = s.cat.reorder_categories(sorted(s.cat.categories, key=str))
+        elif col in FEATURES and pd.api.types.is_float_dtype(s.dtype):
+            s = s.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            s = pd.to_numeric(s, downcast="integer")
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def feature_matrix(df: pd.DataFrame, cols=FEATURES, dtype=None) -> np.ndarray:
+    """(행 x 피처) C-contiguous 행렬 — LightGBM 등에 추가 변환 없이 전달 (기본 dtype: FEATURE_DTYPE)"""
+    return np.ascontiguousarray(df[list(cols)].to_numpy(dtype=dtype or FEATURE_DTYPE))
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame = None) -> pd.DataFrame:
+    """컬럼별 메모리 (bytes, 문자열 포함 deep 계산) before / after 비교"""
+    after = compact_frame(before) if after is None else after
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False).reindex(b.index)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.reindex(b.index).astype(str),
+        'bytes_before': b,
+        'bytes_after': a,
+    })
+    report.loc['합계'] = ['', '', b.sum(), a.sum()]
+    report['ratio'] = report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)
+    return report
+
+
+# --------------------------------------------------------------------------------
+# 4. 데이터셋 지문 (필터 결과별 캐시 키)
+# --------------------------------------------------------------------------------
+def frame_fingerprint(df: pd.DataFrame, cols=None) -> str:
+    """행 수 / 인덱스 양 끝 / 수치 컬럼 합계 기반의 가벼운 지문"""
+    cols = list(df.columns) if cols is None else [c for c in cols if c in df.columns]
+    h = hashlib.sha1(repr((len(df), cols)).encode("utf-8"))
+    if len(df):
+        h.update(repr((df.index[0], df.index[-1])).encode("utf-8"))
+        num = df[cols].select_dtypes(include="number")
+        if num.shape[1]:
+            h.update(num.sum().to_numpy(dtype=float).tobytes())
+    return h.hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="데이터셋 메모리 리포트 (standard vs compact)")
+    parser.add_argument("csv", nargs="?", default=find_csv())
+    args = parser.parse_args()
+
+    full = normalize_columns(pd.read_csv(args.csv))
+    report = memory_report(full)
+    pd.set_option("display.width", 160)
+    print(report.to_string(formatters={
+        'bytes_before': '{:,.0f}'.format, 'bytes_after': '{:,.0f}'.format, 'ratio': '{:.2f}'.format
+    }))
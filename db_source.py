@@ -0,0 +1,173 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import data_source
+
+try:
+    import duckdb
+except ImportError:  # DuckDB 는 선택 사항 (없으면 SQLite 만 지원)
+    duckdb = None
+
+# --------------------------------------------------------------------------------
+# 0. DB 설정 (환경변수)
+# --------------------------------------------------------------------------------
+DB_PATH = os.getenv("DB_PATH", "")
+DB_TABLE = os.getenv("DB_TABLE", "wafer_data")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_CHUNK_SIZE = int(os.getenv("DB_CHUNK_SIZE", "200000"))
+
+# 사이드바 필터 순서 (공정명 -> 결함유형 -> 배치번호)
+FILTER_COLS = ['공정명', '결함유형', '배치번호']
+
+
+def is_configured() -> bool:
+    return bool(DB_PATH) and os.path.exists(DB_PATH)
+
+
+# --------------------------------------------------------------------------------
+# 1. 커넥션 풀
+# --------------------------------------------------------------------------------
+class ConnectionPool:
+    """고정 크기 커넥션 풀 (SQLite / DuckDB 파일)"""
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE):
+        self.path = path
+        self.is_duckdb = path.endswith((".duckdb", ".ddb"))
+        if self.is_duckdb and duckdb is None:
+            raise RuntimeError("duckdb 패키지가 설치되어 있지 않습니다.")
+
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+        self._lock = threading.Lock()
+        self._columns = None
+
+    def _connect(self):
+        if self.is_duckdb:
+            return duckdb.connect(self.path, read_only=True)
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    @contextmanager
+    def connection(self, timeout: float = 30.0):
+        conn = self._pool.get(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def table_columns(self, table: str):
+        """테이블 컬럼 목록 (1회 조회 후 재사용)"""
+        with self._lock:
+            if self._columns is None:
+                with self.connection() as conn:
+                    cur = conn.execute(f"SELECT * FROM {_quote(table)} LIMIT 0")
+                    self._columns = [d[0] for d in cur.description]
+            return self._columns
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+# --------------------------------------------------------------------------------
+# 2. 쿼리 생성 (사이드바 필터 -> WHERE 절)
+# --------------------------------------------------------------------------------
+def resolve_column(db_columns, name: str):
+    """정규화된 컬럼명(공정명 등)에 대응하는 DB 원본 컬럼명 찾기"""
+    if name in db_columns:
+        return name
+    for src, dst in data_source.COL_MAP.items():
+        if dst == name and src in db_columns:
+            return src
+    return None
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def build_where(db_columns, filters):
+    """filters: [(정규화 컬럼명, 값)] -> (WHERE 절, 파라미터). '전체' 는 조건 없음"""
+    clauses, params = [], []
+    for name, value in filters:
+        if value is None or value == "전체":
+            continue
+        col = resolve_column(db_columns, name)
+        if col is None:
+            continue
+        clauses.append(f"{_quote(col)} = ?")
+        params.append(str(value))
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+def build_select(db_columns, table: str, filters, columns=None):
+    """필요 컬럼만 SELECT (컬럼 pruning + predicate pushdown)"""
+    if columns is None:
+        select_cols = list(db_columns)
+    else:
+        select_cols = []
+        for name in columns:
+            col = resolve_column(db_columns, name)
+            if col is not None and col not in select_cols:
+                select_cols.append(col)
+        # 정규화에 필요한 라벨 원본 컬럼은 항상 포함
+        for name in FILTER_COLS + ['불량여부']:
+            col = resolve_column(db_columns, name)
+            if col is not None and col not in select_cols:
+                select_cols.append(col)
+
+    where, params = build_where(db_columns, filters)
+    sql = f"SELECT {', '.join(_quote(c) for c in select_cols)} FROM {_quote(table)}{where}"
+    return sql, params
+
+
+# --------------------------------------------------------------------------------
+# 3. 조회 함수
+# --------------------------------------------------------------------------------
+def distinct_values(pool: ConnectionPool, name: str, filters=(), table: str = DB_TABLE):
+    """사이드바 옵션 목록 (DISTINCT, DB 에서 정렬)"""
+    db_columns = pool.table_columns(table)
+    col = resolve_column(db_columns, name)
+    if col is None:
+        return [data_source.LABEL_DEFAULTS.get(name, "Unknown")]
+
+    where, params = build_where(db_columns, filters)
+    sql = (f"SELECT DISTINCT CAST({_quote(col)} AS VARCHAR) AS v FROM {_quote(table)}"
+           f"{where} ORDER BY v")
+    with pool.connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [str(r[0]) for r in rows]
+
+
+def iter_chunks(pool: ConnectionPool, filters=(), columns=None,
+                table: str = DB_TABLE, chunksize: int = DB_CHUNK_SIZE):
+    """필터가 적용된 결과를 chunk 단위 DataFrame 으로 스트리밍"""
+    db_columns = pool.table_columns(table)
+    sql, params = build_select(db_columns, table, filters, columns)
+
+    with pool.connection() as conn:
+        cur = conn.execute(sql, params)
+        names = [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=names)
+
+
+def load_filtered(pool: ConnectionPool, filters=(), columns=None,
+                  table: str = DB_TABLE, chunksize: int = DB_CHUNK_SIZE):
+    """chunk 를 모아 정규화된 DataFrame 반환 (결과 없으면 빈 DataFrame)"""
+    chunks = list(iter_chunks(pool, filters, columns, table, chunksize))
+    if not chunks:
+        return pd.DataFrame(columns=FILTER_COLS)
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    return data_source.normalize_columns(df)
@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# 웨이퍼 밀도 피라미드
+#   - wafer_x / wafer_y 를 한 번만 훑어서 (공정명, 결함유형, 배치번호) 그룹별
+#     기본 해상도(BASE_BINS) 격자 카운트를 희소 형태로 보관
+#   - 낮은 해상도는 블록 합으로, '전체' 는 그룹 레이어 합으로 계산 (히스토그램 재계산 없음)
+# --------------------------------------------------------------------------------
+BASE_BINS = 400
+RESOLUTIONS = (50, 100, 200, 400)     # BASE_BINS 의 약수만 허용
+GROUP_COLS = ['공정명', '결함유형', '배치번호']
+
+# 격자 크기 x sigma 가 이 값을 넘으면 FFT 컨볼루션으로 스무딩
+FFT_MIN_WORK = 200 * 200 * 8
+
+# 피라미드당 보관하는 격자 / 스무딩 결과 수 (LRU, 400x400 float64 1개 = 1.28MB)
+CACHE_ENTRIES = 24
+
+
+class DensityPyramid:
+    def __init__(self, df: pd.DataFrame, x_col='wafer_x', y_col='wafer_y',
+                 group_cols=GROUP_COLS, base_bins: int = BASE_BINS):
+        self.base_bins = base_bins
+        self.group_cols = [c for c in group_cols if c in df.columns]
+
+        x = df[x_col].to_numpy(dtype=float)
+        y = df[y_col].to_numpy(dtype=float)
+        valid = np.isfinite(x) & np.isfinite(y)
+
+        if valid.any():
+            self.x_range = (float(x[valid].min()), float(x[valid].max()))
+            self.y_range = (float(y[valid].min()), float(y[valid].max()))
+        else:
+            self.x_range = self.y_range = (0.0, 1.0)
+
+        # 그룹 코드 (조합 단위)
+        if self.group_cols:
+            gkey = pd.MultiIndex.from_frame(df[self.group_cols])
+            gcode, groups = pd.factorize(gkey)
+            self.groups = pd.DataFrame(list(groups), columns=self.group_cols)
+        else:
+            gcode = np.zeros(len(df), dtype=np.int64)
+            self.groups = pd.DataFrame(index=[0])
+
+        ix = self._bin(x[valid], self.x_range)
+        iy = self._bin(y[valid], self.y_range)
+        cell = ix * base_bins + iy
+        n_cells = base_bins * base_bins
+
+        # (그룹, 칸) 희소 카운트: 그룹 순으로 정렬되어 그룹별 구간 슬라이스 가능
+        flat, counts = np.unique(gcode[valid].astype(np.int64) * n_cells + cell, return_counts=True)
+        self._group_idx, self._cell = np.divmod(flat, n_cells)
+        self._count = counts
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bin(self, v, rng):
+        lo, hi = rng
+        width = (hi - lo) or 1.0
+        # np.histogram2d 와 동일하게 최댓값은 마지막 칸에 포함
+        return np.minimum(((v - lo) / width * self.base_bins).astype(np.int64), self.base_bins - 1)
+
+    def _group_mask(self, select):
+        if not select:
+            return None
+        mask = np.ones(len(self.groups), dtype=bool)
+        for col, val in select.items():
+            if col in self.groups.columns and val not in (None, "전체"):
+                mask &= (self.groups[col] == val).to_numpy()
+        return mask
+
+    def _cached(self, key):
+        with self._lock:
+            out = self._cache.get(key)
+            if out is not None:
+                self._cache.move_to_end(key)
+            return out
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return value
+
+    def grid(self, bins: int = 100, select=None) -> np.ndarray:
+        """(bins, bins) 카운트 격자 [x, y] — select 예: {'공정명': 'PC'}"""
+        if self.base_bins % bins:
+            raise ValueError(f"bins 는 {self.base_bins} 의 약수여야 합니다: {bins}")
+
+        key = ("grid", bins, tuple(sorted((select or {}).items())))
+        out = self._cached(key)
+        if out is not None:
+            return out
+
+        mask = self._group_mask(select)
+        if mask is None:
+            cell, count = self._cell, self._count
+        else:
+            keep = mask[self._group_idx]
+            cell, count = self._cell[keep], self._count[keep]
+
+        b = self.base_bins
+        base = np.bincount(cell, weights=count, minlength=b * b).reshape(b, b)
+        f = b // bins
+        out = base.reshape(bins, f, bins, f).sum(axis=(1, 3)) if f > 1 else base
+        return self._remember(key, out)
+
+    def smoothed(self, bins: int = 100, sigma: float = 4.0, select=None) -> np.ndarray:
+        key = ("smooth", bins, float(sigma), tuple(sorted((select or {}).items())))
+        out = self._cached(key)
+        if out is not None:
+            return out
+        return self._remember(key, smooth(self.grid(bins, select), sigma))
+
+
+def _gaussian_kernel(sigma: float, truncate: float = 4.0) -> np.ndarray:
+    radius = int(truncate * sigma + 0.5)
+    r = np.arange(-radius, radius + 1)
+    k1 = np.exp(-0.5 * (r / sigma) ** 2)
+    k1 /= k1.sum()
+    return np.outer(k1, k1)
+
+
+def smooth(grid: np.ndarray, sigma: float) -> np.ndarray:
+    """가우시안 스무딩 (큰 격자/큰 sigma 는 FFT 컨볼루션)"""
+    if sigma <= 0:
+        return grid
+    # scipy 는 블러 모드를 처음 켤 때만 import (대시보드 첫 진입 비용 절감)
+    if grid.size * sigma < FFT_MIN_WORK:
+        from scipy.ndimage import gaussian_filter
+        return gaussian_filter(grid, sigma=sigma)
+    from scipy.signal import fftconvolve
+    # gaussian_filter 기본 경계(reflect)와 맞추기 위해 반사 패딩 후 FFT
+    radius = int(4.0 * sigma + 0.5)
+    padded = np.pad(grid, radius, mode="symmetric")
+    out = fftconvolve(padded, _gaussian_kernel(sigma), mode="same")
+    return out[radius:-radius, radius:-radius]
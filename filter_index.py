@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# 사이드바 계단식 필터용 사전 인덱스
+#   (공정명, 결함유형, 배치번호) 조합 -> 행 위치 구간
+#   옵션 목록/슬라이스를 전체 컬럼 스캔 없이 조합 테이블 조회로 처리
+# --------------------------------------------------------------------------------
+FILTER_COLS = ['공정명', '결함유형', '배치번호']
+ALL = "전체"
+
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame, cols=FILTER_COLS):
+        self.cols = list(cols)
+        self.n_rows = len(df)
+
+        # 컬럼별 범주 코드 (sort=True -> 범주가 정렬된 순서 = 옵션 표시 순서)
+        self.categories = []
+        codes = []
+        for c in self.cols:
+            code, cats = pd.factorize(df[c], sort=True)
+            codes.append(code.astype(np.int64))
+            self.categories.append(np.asarray(cats, dtype=object))
+        self._lookup = [{v: i for i, v in enumerate(cats)} for cats in self.categories]
+
+        # 조합 키 = 혼합 진법 정수
+        key = np.zeros(self.n_rows, dtype=np.int64)
+        for code, cats in zip(codes, self.categories):
+            key = key * len(cats) + code
+
+        # 키 기준 안정 정렬 -> 조합별 연속 구간 [start, end)
+        self._order = np.argsort(key, kind="stable")
+        uniq, starts = np.unique(key[self._order], return_index=True)
+        self._starts = starts
+        self._ends = np.append(starts[1:], self.n_rows)
+
+        # 조합 테이블 (조합 수 x 컬럼 수) 의 코드
+        combo = np.empty((len(uniq), len(self.cols)), dtype=np.int64)
+        rest = uniq.copy()
+        for j in range(len(self.cols) - 1, -1, -1):
+            size = len(self.categories[j])
+            combo[:, j] = rest % size
+            rest //= size
+        self._combo = combo
+
+    def _combo_mask(self, selections):
+        """선택값 목록 (앞에서부터, '전체' 는 무시) 에 맞는 조합 mask"""
+        mask = np.ones(len(self._combo), dtype=bool)
+        for j, sel in enumerate(selections):
+            if sel is None or sel == ALL:
+                continue
+            code = self._lookup[j].get(sel)
+            if code is None:
+                return np.zeros(len(self._combo), dtype=bool)
+            mask &= self._combo[:, j] == code
+        return mask
+
+    def options(self, level: int, *selections):
+        """level 번째 컬럼의 옵션 목록 (상위 선택값 기준, 정렬됨)"""
+        mask = self._combo_mask(selections[:level])
+        codes = np.unique(self._combo[mask, level])
+        return self.categories[level][codes].tolist()
+
+    def positions(self, *selections):
+        """선택 조건에 해당하는 행 위치 (전부 '전체' 이면 None)"""
+        if all(s is None or s == ALL for s in selections):
+            return None
+        hits = np.flatnonzero(self._combo_mask(selections))
+        if len(hits) == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = np.concatenate([self._order[self._starts[h]:self._ends[h]] for h in hits])
+        pos.sort()  # 원본 행 순서 유지
+        return pos
+
+    def select(self, df: pd.DataFrame, *selections) -> pd.DataFrame:
+        pos = self.positions(*selections)
+        if pos is None:
+            return df
+        if len(pos) and pos[-1] - pos[0] + 1 == len(pos):
+            # 연속 구간이면 슬라이스 (copy-on-write 에서는 복사 없는 view)
+            return df.iloc[pos[0]:pos[-1] + 1]
+        return df.take(pos)
@@ -0,0 +1,390 @@
+# ==========================================
+# inference_server.py  (모델 추론 전용 로컬 서비스 + 마이크로 배칭)
+#
+#   python inference_server.py --port 8766 --workers 4 --window-ms 5
+#   INFERENCE_URL=http://127.0.0.1:8766 streamlit run main.py
+#
+#   동시에 들어온 단건 요청을 (모델, 메서드) 별로 짧은 시간창 동안 모아
+#   한 번의 predict / predict_proba / YOLO predict 로 실행한 뒤 요청별로 나눠서 응답
+#
+#   GET  /health
+#   GET  /models                                    모델별 버전 / classes_ / 피처 수
+#   POST /predict {"model", "method", "rows", "columns"} -> {"result": [...]}
+#   POST /yolo    {"image"(base64), "conf", "annotate"} -> {"detections": [[cls, conf, x1, y1, x2, y2]], "annotated"}
+#   POST /yolo    {"images": [base64, ...], "conf", "annotate"} -> {"results": [{"detections", "annotated"}, ...]}
+# ==========================================
+
+import io
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import model_registry
+
+# --------------------------------------------------------------------------------
+# 0. 설정 (환경변수)
+# --------------------------------------------------------------------------------
+INFERENCE_URL = os.getenv("INFERENCE_URL", "")
+INFERENCE_TIMEOUT_SEC = float(os.getenv("INFERENCE_TIMEOUT_SEC", "30"))
+
+DEFAULT_PORT = 8766
+BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_ROWS = int(os.getenv("INFERENCE_MAX_BATCH_ROWS", "4096"))
+MAX_BATCH_IMAGES = int(os.getenv("INFERENCE_MAX_BATCH_IMAGES", "16"))
+WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+TABULAR_MODELS = ("real_fake", "defect")
+METHODS = ("predict", "predict_proba")
+
+
+# --------------------------------------------------------------------------------
+# 1. 마이크로 배처 (키별 asyncio 큐 -> 워커 풀)
+# --------------------------------------------------------------------------------
+class MicroBatcher:
+    """같은 키로 들어온 요청을 window 안에서 최대 max_size 만큼 모아 run(items) 1회 실행
+
+    run(items) 는 워커 스레드에서 실행되고 items 와 같은 길이의 결과 목록을 반환
+    size(item) 는 배치 크기 계산용 (예: 행 수)
+    """
+
+    def __init__(self, pool: ThreadPoolExecutor, window_ms: float = BATCH_WINDOW_MS,
+                 max_size: int = MAX_BATCH_ROWS, size=lambda item: 1):
+        self.pool = pool
+        self.window = window_ms / 1000.0
+        self.max_size = max_size
+        self.size = size
+        self._queues = {}
+        self.stats = {"requests": 0, "batches": 0}
+
+    async def submit(self, key, item, run):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            loop.create_task(self._drain(key, queue, run))
+        self.stats["requests"] += 1
+        await queue.put((item, fut))
+        return await fut
+
+    async def _drain(self, key, queue: asyncio.Queue, run):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            total = self.size(batch[0][0])
+            deadline = loop.time() + self.window
+            while total < self.max_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(nxt)
+                total += self.size(nxt[0])
+
+            self.stats["batches"] += 1
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.pool, run, items)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+
+def _get_model(name: str):
+    model, err = model_registry.get(name)
+    if model is None:
+        raise RuntimeError(err or f"❌ {name} 모델 없음")
+    return model
+
+
+def run_tabular(name: str, method: str, items, columns=None):
+    """행 묶음들을 이어붙여 1회 추론 후 원래 요청 단위로 분할"""
+    model = _get_model(name)
+    X = np.vstack(items)
+    if columns is not None:
+        import pandas as pd
+        X = pd.DataFrame(X, columns=list(columns))
+    out = np.asarray(getattr(model, method)(X))
+    bounds = np.cumsum([len(x) for x in items])[:-1]
+    return np.split(out, bounds)
+
+
+def _encode_png(frame_bgr: np.ndarray) -> str:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(frame_bgr[..., ::-1])).save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def run_yolo(conf: float, items):
+    """items: [(image_bytes, annotate)] -> [(detections, annotated_png_b64)]"""
+    from PIL import Image
+    model = _get_model("yolo")
+    images = [Image.open(io.BytesIO(data)).convert("RGB") for data, _ in items]
+    results = model.predict(source=images, conf=conf, save=False, verbose=False)
+
+    out = []
+    for (_, annotate), result in zip(items, results):
+        detections = [[int(b.cls[0]), float(b.conf[0]), *map(float, b.xyxy[0].tolist())] for b in result.boxes]
+        out.append((detections, _encode_png(result.plot()) if annotate else None))
+    return out
+
+
+# --------------------------------------------------------------------------------
+# 2. HTTP 서버 (asyncio streams, JSON 본문)
+# --------------------------------------------------------------------------------
+class InferenceServer:
+    def __init__(self, workers: int = WORKERS, window_ms: float = BATCH_WINDOW_MS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self.rows = MicroBatcher(self.pool, window_ms, MAX_BATCH_ROWS, size=len)
+        self.images = MicroBatcher(self.pool, window_ms, MAX_BATCH_IMAGES)
+        self.started = time.time()
+
+    # -------------------------
+    # 엔드포인트
+    # -------------------------
+    def models(self) -> dict:
+        info = {}
+        for name in model_registry.ARTIFACTS:
+            model, err = model_registry.get(name)
+            classes = getattr(model, "classes_", None)
+            info[name] = {
+                "version": model_registry.version(name),
+                "classes": None if classes is None or isinstance(classes, dict) else np.asarray(classes).tolist(),
+                "n_features": getattr(model, "n_features_in_", None),
+                "error": err,
+            }
+        return info
+
+    async def predict(self, body: dict) -> dict:
+        name, method = body.get("model"), body.get("method", "predict_proba")
+        if name not in TABULAR_MODELS or method not in METHODS:
+            raise ValueError(f"지원하지 않는 요청: {name}.{method}")
+        X = np.asarray(body["rows"], dtype=float)
+        if X.ndim != 2:
+            raise ValueError("rows 는 2차원 배열이어야 합니다.")
+        # 컬럼 구성이 다른 요청이 섞이지 않도록 열 수 / 컬럼명도 키에 포함
+        columns = tuple(body["columns"]) if body.get("columns") else None
+        key = (name, method, X.shape[1], columns)
+        res = await self.rows.submit(key, X, lambda items: run_tabular(name, method, items, columns))
+        return {"result": res.tolist(), "version": model_registry.version(name)}
+
+    async def yolo(self, body: dict) -> dict:
+        conf = float(body.get("conf", 0.25))
+        annotate = bool(body.get("annotate", True))
+        run = lambda items: run_yolo(conf, items)
+        if "images" in body:
+            # 여러 장은 한꺼번에 배처 큐에 넣어서 같은 배치(최대 MAX_BATCH_IMAGES 장)로 묶이도록
+            results = await asyncio.gather(*(
+                self.images.submit(("yolo", conf), (base64.b64decode(img), annotate), run) for img in body["images"]
+            ))
+            return {"results": [{"detections": d, "annotated": a} for d, a in results]}
+        item = (base64.b64decode(body["image"]), annotate)
+        detections, annotated = await self.images.submit(("yolo", conf), item, run)
+        return {"detections": detections, "annotated": annotated}
+
+    async def route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True, "uptime": time.time() - self.started,
+                         "rows": self.rows.stats, "images": self.images.stats}
+        if method == "GET" and path == "/models":
+            loop = asyncio.get_running_loop()
+            return 200, await loop.run_in_executor(self.pool, self.models)
+        if method == "POST" and path in ("/predict", "/yolo"):
+            payload = json.loads(body.decode("utf-8") or "{}")
+            handler = self.predict if path == "/predict" else self.yolo
+            return 200, await handler(payload)
+        return 404, {"error": f"not found: {method} {path}"}
+
+    # -------------------------
+    # HTTP/1.1 (keep-alive)
+    # -------------------------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+
+                try:
+                    status, payload = await self.route(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    status, payload = (400 if isinstance(e, (ValueError, KeyError)) else 503), {"error": str(e)}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERROR'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"inference server: http://{host}:{port} (workers={self.pool._max_workers}, "
+              f"window={self.rows.window * 1000:.1f}ms)")
+        async with server:
+            await server.serve_forever()
+
+
+# --------------------------------------------------------------------------------
+# 3. 클라이언트 (Streamlit 쪽)
+# --------------------------------------------------------------------------------
+class InferenceClient:
+    def __init__(self, url: str = INFERENCE_URL, timeout: float = INFERENCE_TIMEOUT_SEC):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="inference-client")
+        self._models = None
+
+    def _request(self, path: str, payload: dict = None) -> dict:
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(
+            self.url + path, data=data,
+            headers={"Content-Type": "application/json"} if data is not None else {}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read().decode("utf-8")).get("error", str(e))) from None
+
+    def models(self, refresh: bool = False) -> dict:
+        if self._models is None or refresh:
+            self._models = self._request("/models")
+        return self._models
+
+    def predict(self, name: str, method: str, X) -> np.ndarray:
+        payload = {"model": name, "method": method, "rows": np.asarray(X, dtype=float).tolist()}
+        if hasattr(X, "columns"):
+            payload["columns"] = [str(c) for c in X.columns]
+        return np.asarray(self._request("/predict", payload)["result"])
+
+    @staticmethod
+    def _yolo_result(res: dict):
+        frame = None
+        if res.get("annotated"):
+            from PIL import Image
+            rgb = np.asarray(Image.open(io.BytesIO(base64.b64decode(res["annotated"]))).convert("RGB"))
+            frame = rgb[..., ::-1]
+        return [(int(d[0]), float(d[1]), tuple(d[2:6])) for d in res["detections"]], frame
+
+    def yolo(self, image_bytes: bytes, conf: float = 0.25, annotate: bool = True):
+        """-> ([(cls_id, conf, (x1, y1, x2, y2))], annotated BGR 배열 또는 None)"""
+        res = self._request("/yolo", {"image": base64.b64encode(image_bytes).decode("ascii"),
+                                      "conf": conf, "annotate": annotate})
+        return self._yolo_result(res)
+
+    def yolo_many(self, images, conf: float = 0.25, annotate: bool = False):
+        """여러 장을 요청 1회로 (서버가 한 배치로 묶어서 추론) -> [yolo() 와 같은 결과]"""
+        res = self._request("/yolo", {"images": [base64.b64encode(d).decode("ascii") for d in images],
+                                      "conf": conf, "annotate": annotate})
+        return [self._yolo_result(r) for r in res["results"]]
+
+    def submit(self, fn, *args, **kwargs):
+        """비동기 호출 (concurrent.futures.Future) — 여러 모델 요청을 동시에 보낼 때"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+
+class RemoteModel:
+    """sklearn 호환 predict / predict_proba 를 추론 서버로 위임 (machine 페이지 코드 변경 없이 사용)"""
+
+    def __init__(self, client: InferenceClient, name: str, meta: dict):
+        self.client = client
+        self.name = name
+        self.version = meta.get("version")
+        if meta.get("classes") is not None:
+            self.classes_ = np.asarray(meta["classes"])
+        if meta.get("n_features") is not None:
+            self.n_features_in_ = meta["n_features"]
+
+    def predict(self, X):
+        return self.client.predict(self.name, "predict", X)
+
+    def predict_proba(self, X):
+        return self.client.predict(self.name, "predict_proba", X)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """INFERENCE_URL 이 설정된 경우 프로세스 공용 클라이언트 (없으면 None)"""
+    global _client
+    if not INFERENCE_URL:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(INFERENCE_URL)
+    return _client
+
+
+def remote_model(name: str):
+    """(RemoteModel, err) — 서버에 연결할 수 없으면 (None, err)"""
+    client = get_client()
+    if client is None:
+        return None, "❌ INFERENCE_URL 미설정"
+    try:
+        meta = client.models().get(name)
+    except Exception as e:
+        return None, f"❌ 추론 서버 연결 실패 ({client.url}): {e}"
+    if meta is None or meta.get("error"):
+        return None, (meta or {}).get("error") or f"❌ 추론 서버에 {name} 모델 없음"
+    return RemoteModel(client, name, meta), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모델 추론 서비스 (요청 마이크로 배칭)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS, help="배치 수집 시간창(ms)")
+    parser.add_argument("--no-warm", action="store_true", help="시작 시 모델 미리 로딩하지 않음")
+    args = parser.parse_args(argv)
+
+    if not args.no_warm:
+        for name, (ver, err) in model_registry.warm().items():
+            print(f"{name:10s} {ver:16s}" + (f"  {err}" if err else ""))
+
+    try:
+        asyncio.run(InferenceServer(args.workers, args.window_ms).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
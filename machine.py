@@ -2,71 +2,21 @@
 # machine.py  (UPDATED - defect model -> joblib)
 # ==========================================
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-from PIL import Image
-from ultralytics import YOLO
-import os
-import pickle
-import joblib  # ✅ 추가: joblib 로딩
+from scaler import get_scaler
+import model_registry
+import inference_server
+import tracing
 import streamlit.components.v1 as components
+# 피처 / 결함코드 / 공정상태 라벨은 UI 없는 model_spec 에서 관리 (batch_score / yolo_batch 등 CLI 와 공용)
+from model_spec import FEATURES, LOG_FEATURES, map_defect_index, get_quality_status
 
 
 # ==========================================
-# 0. 수치 기반 모델용 피처 설정 (웨이퍼위치 제거, 19개)
-# ==========================================
-FEATURES = [
-    '가로길이', '세로길이', '검출면적', '직경크기', '신호강도', '신호극성',
-    '에너지값', '기준편차', '명도수준', '잡음정도', '중심거리', '방향각도',
-    '정렬정도', '점형지수', '영역잡음', '상대강도', '활성지수', '패치신호', 'Aspect_Ratio'
-]
-
-MODEL_REAL_FAKE_PATH = r"lgbm_v4.pkl"
-MODEL_DEFECT_PATH = r"C:\Jupyer_Workspace\project3\best_defect_model.joblib"  # ✅ 변경: pkl -> joblib
-
-LOG_FEATURES = [
-    '가로길이', '세로길이', '검출면적', '직경크기', '신호강도',
-    '에너지값', '기준편차', '명도수준', '잡음정도', '중심거리',
-    '방향각도', '정렬정도', '점형지수', '영역잡음', '상대강도',
-    '활성지수', '패치신호', 'Aspect_Ratio'
-]
-
-# 결함 라벨 매핑 (모델은 0~10 index를 내고, 실제 결함코드로 변환)
-DEFECT_CLASS_LIST = [9, 10, 14, 17, 20, 21, 22, 28, 39, 56, 99]
-
-def map_defect_index(idx: int) -> int:
-    """모델의 index 예측값을 실제 결함코드로 매핑"""
-    try:
-        idx = int(idx)
-    except:
-        return idx
-    if 0 <= idx < len(DEFECT_CLASS_LIST):
-        return int(DEFECT_CLASS_LIST[idx])
-    return idx
-
-
-# ==========================================
-# 1. YOLO 형상 분류용 클래스
-# ==========================================
-CLASS_NAMES = {
-    0: 'Center', 1: 'Donut', 2: 'Edge-Loc', 3: 'Edge-Ring',
-    4: 'Loc', 5: 'Near-full', 6: 'Random', 7: 'Scratch'
-}
-
-DEFECT_KNOWLEDGE_BASE = {
-    'Center': {'korean': '센터 불량', 'cause': 'CBCMP', 'action': '이제/센터 구간 CMP 편차 여부 확인'},
-    'Donut': {'korean': '도넛형 불량', 'cause': 'CBCMP', 'action': '패드 상태, 압력 조건, 슬러리 공급 균일성 점검'},
-    'Edge-Loc': {'korean': '엣지 국부 불량', 'cause': 'PC, RMG', 'action': 'PC 공정 전·후 표면 클리닝 상태 점검, 설비 상태(온도, 압력, 회전/이송 조건 등) 변동 이력 확인'},
-    'Edge-Ring': {'korean': '엣지 링 불량', 'cause': 'RMG', 'action': '웨이퍼 중심/에지 구간별 결함 분포 비교'},
-    'Loc': {'korean': '국부 불량', 'cause': 'PC', 'action': 'PC 공정 전·후 표면 클리닝 상태 점검'},
-    'Near-full': {'korean': '전면 불량', 'cause': '심각한 장비 고장, 원자재 불량', 'action': '즉시 생산 중단 및 장비 전수 점검'},
-    'Random': {'korean': '랜덤 불량', 'cause': '정전기(ESD), 미세 스크래치', 'action': 'ESD 방지 대책 및 이송 환경 점검'},
-    'Scratch': {'korean': '스크래치', 'cause': '물리적 접촉, 슬러리 이물질', 'action': '패드 상태, 압력 조건, 슬러리 공급 균일성 점검'}
-}
-
-# ==========================================
-# 1-1. 결함유형 중심 도메인 설명 (공정 SHAP 빨간 표시 포함)
+# 1. 결함유형 중심 도메인 설명 (공정 SHAP 빨간 표시 포함)
 # ==========================================
 DEFECT_DOMAIN_KB = {
     9: {"title": "CBCMP, PC, RMG – 9번 유형 (가성 불량 False)",
@@ -164,186 +114,185 @@ DEFECT_DOMAIN_KB = {
 
 # ==========================================
 # 2. 모델 로딩 함수들
+#   (model_registry: 프로세스당 1회 로딩, joblib / ultralytics 는 로딩 시점에 import)
+#   INFERENCE_URL 이 설정되면 추론 서버 모델(RemoteModel)을 쓰고, 연결 실패 시 로컬 로딩
 # ==========================================
-@st.cache_resource
-def load_real_fake_model():
-    if not os.path.exists(MODEL_REAL_FAKE_PATH):
-        return None, f"❌ REAL/FALSE 모델 파일 없음: {MODEL_REAL_FAKE_PATH}"
-    try:
-        with open(MODEL_REAL_FAKE_PATH, "rb") as f:
-            model = pickle.load(f)
-        return model, None
-    except Exception as e:
-        return None, f"❌ REAL/FALSE 모델 로딩 오류: {e}"
-
+def _load_model(name: str):
+    if inference_server.get_client() is not None:
+        model, err = inference_server.remote_model(name)
+        if model is not None:
+            return model, None
+    return model_registry.get(name)
 
-@st.cache_resource
-def load_defect_model():
-    # ✅ joblib 로딩으로 변경
-    if not os.path.exists(MODEL_DEFECT_PATH):
-        return None, f"❌ 결함유형 모델 파일 없음: {MODEL_DEFECT_PATH}"
-    try:
-        obj = joblib.load(MODEL_DEFECT_PATH)
 
-        # (1) dict로 저장된 경우 (예: {"model":..., "meta":...})
-        if isinstance(obj, dict):
-            for key in ["model", "clf", "classifier", "pipeline"]:
-                if key in obj and hasattr(obj[key], "predict"):
-                    return obj[key], None
-            for v in obj.values():
-                if hasattr(v, "predict"):
-                    return v, None
-            return None, "❌ best_defect_model.joblib 내부에서 predict 가능한 모델을 찾지 못했습니다."
+def load_real_fake_model():
+    return _load_model("real_fake")
 
-        # (2) 바로 estimator / pipeline 인 경우
-        if hasattr(obj, "predict"):
-            return obj, None
 
-        return None, "❌ best_defect_model.joblib 로딩은 되었지만 모델 객체가 아닙니다."
-    except Exception as e:
-        return None, f"❌ 결함유형 모델 로딩 오류: {e}"
+def load_defect_model():
+    return _load_model("defect")
 
 
 # ==========================================
 # 3. 스케일링 함수
 # ==========================================
 def robust_scale_single(input_df: pd.DataFrame, ref_df: pd.DataFrame, feature_cols):
-    ref = ref_df[feature_cols].select_dtypes(include="number")
-    med = ref.median()
-    q1 = ref.quantile(0.25)
-    q3 = ref.quantile(0.75)
-    iqr = (q3 - q1).replace(0, 1.0)
-    x = input_df[feature_cols].astype(float)
-    return (x - med) / iqr
+    return get_scaler(ref_df, feature_cols).transform(input_df)
 
 
 def log_robust_scale_single(input_df: pd.DataFrame, ref_df: pd.DataFrame,
                             feature_cols, log_cols):
-    ref = ref_df[feature_cols].copy()
-    for c in log_cols:
-        if c in ref.columns:
-            ref[c] = np.log1p(ref[c].clip(lower=0))
-
-    med = ref.median()
-    q1 = ref.quantile(0.25)
-    q3 = ref.quantile(0.75)
-    iqr = (q3 - q1).replace(0, 1.0)
-
-    x = input_df[feature_cols].copy().astype(float)
-    for c in log_cols:
-        if c in x.columns:
-            x[c] = np.log1p(x[c].clip(lower=0))
-
-    return (x - med) / iqr
+    return get_scaler(ref_df, feature_cols).transform(input_df, log_cols=log_cols)
 
 
 # ==========================================
 # 4. REAL/FALSE 방향성 분석 (가성으로 가려면?)
 # ==========================================
-def compute_false_direction(input_df, df_final, model_rf, feature_cols):
+# 피처별 sweep 비율 (기준값 대비 ±%), 방향 판정은 ±10% 기준
+SENSITIVITY_STEPS = (0.05, 0.10, 0.20)
+DIRECTION_STEP = 0.10
+# 응답 곡선이 항상 방향 판정 지점을 포함하도록
+RESPONSE_STEPS = tuple(sorted(set(SENSITIVITY_STEPS) | {DIRECTION_STEP}))
+
+
+def _step_sizes(vals: np.ndarray, ratio: float) -> np.ndarray:
+    """비율별 변화량 (0 이면 ratio*10, 그 외엔 최소 ratio)"""
+    abs_vals = np.abs(vals)
+    return np.where(abs_vals != 0, np.maximum(abs_vals * ratio, ratio), ratio * 10)
+
+
+def compute_false_response(input_df, df_final, model_rf, feature_cols, steps=RESPONSE_STEPS):
+    """피처별 ±step 변화에 따른 가성확률 응답 곡선 (predict_proba 1회 호출)"""
+    if not hasattr(model_rf, "predict_proba"):
+        return None
+
+    classes = getattr(model_rf, "classes_", np.array([0, 1]))
+    if 0 not in classes:
+        return None
+    idx_false = int(np.where(classes == 0)[0][0])
+
+    scaler = get_scaler(df_final, feature_cols)
+    base = input_df[feature_cols].iloc[0].to_numpy(dtype=float)
+    ratios = np.array(sorted({-s for s in steps} | set(steps)), dtype=float)
+    n_feat, n_step = len(feature_cols), len(ratios)
+
+    # (피처 x step) 변화량 행렬 -> 기준행 1개 + 변형행 n_feat*n_step 개를 한 번에 구성
+    deltas = np.stack([np.sign(r) * _step_sizes(base, abs(r)) for r in ratios], axis=1)
+    X = np.tile(base, (1 + n_feat * n_step, 1))
+    rows = np.arange(1, 1 + n_feat * n_step)
+    cols = np.repeat(np.arange(n_feat), n_step)
+    X[rows, cols] += deltas.ravel()
+
+    X_scaled = pd.DataFrame(scaler.transform_array(X), columns=feature_cols)
+    proba = np.asarray(model_rf.predict_proba(X_scaled))[:, idx_false]
+
+    return pd.DataFrame({
+        "feature": np.repeat(feature_cols, n_step),
+        "step": np.tile(ratios, n_feat),
+        "value": X[rows, cols],
+        "proba_false": proba[1:],
+        "delta": proba[1:] - proba[0],
+    })
+
+
+def directions_from_response(curve: pd.DataFrame, step: float = DIRECTION_STEP, threshold: float = 0.01):
+    """응답 곡선의 ±step 지점으로 up/down/neutral 판정"""
     directions = {}
-    try:
-        if not hasattr(model_rf, "predict_proba"):
-            return directions
-
-        classes = getattr(model_rf, "classes_", np.array([0, 1]))
-        if 0 in classes:
-            idx_false = int(np.where(classes == 0)[0][0])
+    if curve is None or curve.empty:
+        return directions
+
+    down = curve[np.isclose(curve["step"], -step)].set_index("feature")["delta"]
+    up = curve[np.isclose(curve["step"], step)].set_index("feature")["delta"]
+
+    for f in curve["feature"].unique():
+        inc_down, inc_up = down.get(f, 0.0), up.get(f, 0.0)
+        if (inc_down > threshold) and (inc_down > inc_up + 0.005):
+            directions[f] = "down"
+        elif (inc_up > threshold) and (inc_up > inc_down + 0.005):
+            directions[f] = "up"
         else:
-            return directions
-
-        X_base = robust_scale_single(input_df, df_final, feature_cols)
-        base_proba = model_rf.predict_proba(X_base)[0][idx_false]
-
-        for f in feature_cols:
-            val = float(input_df[f].iloc[0])
-            abs_val = abs(val)
-            step = max(abs_val * 0.1, 0.1) if abs_val != 0 else 1.0
-
-            df_down = input_df.copy()
-            df_up = input_df.copy()
-            df_down[f] = val - step
-            df_up[f] = val + step
-
-            X_down = robust_scale_single(df_down, df_final, feature_cols)
-            X_up = robust_scale_single(df_up, df_final, feature_cols)
-
-            p_down = model_rf.predict_proba(X_down)[0][idx_false]
-            p_up = model_rf.predict_proba(X_up)[0][idx_false]
-
-            inc_down = p_down - base_proba
-            inc_up = p_up - base_proba
-            threshold = 0.01
+            directions[f] = "neutral"
+    return directions
 
-            if (inc_down > threshold) and (inc_down > inc_up + 0.005):
-                directions[f] = "down"
-            elif (inc_up > threshold) and (inc_up > inc_down + 0.005):
-                directions[f] = "up"
-            else:
-                directions[f] = "neutral"
 
+def compute_false_direction(input_df, df_final, model_rf, feature_cols):
+    try:
+        curve = compute_false_response(input_df, df_final, model_rf, feature_cols)
+        return directions_from_response(curve)
     except Exception:
         return {}
 
-    return directions
-
 
 # ==========================================
-# 5. 진성 확률 기반 공정 상태 라벨링
+# 5. YOLO 멀티모달 모델 로딩
 # ==========================================
-def get_quality_status(prob_real: float):
-    if prob_real is None:
-        return "정보 부족", "진성 확률 정보 없음", "#7f8c8d", "⚪"
-
-    p = float(prob_real)
-
-    if p < 0.40:
-        return "정상", "가성 결함 경향. 공정 이상 신호는 낮음.", "#27ae60", "🟢"
-    elif p < 0.68:
-        return "경고", "진성/가성 경계. 로트·장비 트렌드 점검 권장.", "#e67e22", "🟠"
-    elif p < 0.95:
-        return "불량", "진성 결함 가능성이 높은 영역.", "#e74c3c", "🔴"
-    else:
-        return "공정이상", "진성 결함 가능성이 매우 높음. 긴급점검 필요.", "#c0392b", "🚨"
-
-
-# ==========================================
-# 6. YOLO 멀티모달 모델 로딩
-# ==========================================
-@st.cache_resource
 def load_multimodal_model():
-    model = YOLO("best.pt")
+    model, err = model_registry.get("yolo")
+    if err:
+        raise RuntimeError(err)
     return model
 
 
-def run_yolo_analysis(pil_image: Image.Image):
-    model = load_multimodal_model()
-    results = model.predict(source=pil_image, conf=0.25, save=False, verbose=False)
-    result = results[0]
-    annotated_frame = result.plot()
-
-    detections = []
-    if len(result.boxes) > 0:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            cname = CLASS_NAMES.get(cls_id, f"Class-{cls_id}")
-            detections.append((cname, conf))
-
-        main_defect = max(detections, key=lambda x: x[1])[0]
-        knowledge = DEFECT_KNOWLEDGE_BASE.get(
-            main_defect,
-            {"korean": main_defect, "cause": "원인 미등록", "action": "조치 정보 없음"}
-        )
-    else:
-        main_defect = None
-        knowledge = None
-
-    return annotated_frame, detections, main_defect, knowledge
+def run_yolo_analysis(pil_image: "Image.Image", data: bytes = None):
+    """단일 이미지 분석 (yolo_batch 캐시 공유 — 같은 이미지는 다시 predict 하지 않음)"""
+    import io
+    import yolo_batch
+    if data is None:
+        buf = io.BytesIO()
+        pil_image.save(buf, format="PNG")
+        data = buf.getvalue()
+
+    record = yolo_batch.analyze_bytes(data, conf=0.25)
+    annotated_frame = yolo_batch.annotate(pil_image, record)    # RGB
+    return annotated_frame, record["detections"], record["main_defect"], record["knowledge"]
+
+
+def show_yolo_bulk():
+    """폴더(zip) 단위 일괄 분석 — 이미지별 요약 + lot 집계, 박스 이미지는 선택 시에만 렌더링"""
+    import yolo_batch
+
+    archive = st.file_uploader("웨이퍼 맵 이미지 묶음 (zip, 하위 폴더명 = lot)", type=["zip"], key="yolo_zip")
+    if archive is None:
+        st.info("lot 별 폴더로 정리한 이미지를 zip 으로 업로드하세요.")
+        return
+
+    if st.button("일괄 분석 실행", use_container_width=True):
+        bar = st.progress(0.0)
+        try:
+            with tracing.stage("machine.yolo_bulk") as span:
+                summary, _ = yolo_batch.analyze(
+                    yolo_batch.iter_images(archive.getvalue(), lot=os.path.splitext(archive.name)[0]),
+                    progress=lambda d, t: bar.progress(d / t)
+                )
+                span.rows = len(summary)
+            # 요약 행과 같은 순서의 zip 저장 경로 (박스 이미지 볼 때 해당 항목만 읽음)
+            st.session_state.yolo_bulk = (archive.file_id, summary, yolo_batch.zip_image_paths(archive.getvalue()))
+        except Exception as e:
+            st.error(f"YOLO 일괄 분석 중 오류 발생: {e}")
+        bar.empty()
+
+    saved = st.session_state.get("yolo_bulk")
+    if not saved or saved[0] != archive.file_id:
+        return
+    _, summary, paths = saved
+
+    st.caption(f"{len(summary):,}장 분석 (캐시 재사용 {int(summary['cached'].sum()):,}장)")
+    st.dataframe(summary.drop(columns=["hash", "cached"]), use_container_width=True, height=260)
+    st.markdown("#### lot 별 주 결함 유형")
+    st.dataframe(yolo_batch.aggregate(summary), use_container_width=True)
+    st.download_button("요약 CSV 다운로드", summary.to_csv(index=False).encode("utf-8-sig"),
+                       file_name="yolo_summary.csv", mime="text/csv", use_container_width=True)
+
+    # 같은 'lot / 파일명' 이 여러 개여도 구분되도록 행 위치로 선택
+    pick = st.selectbox("박스 이미지 보기", [None] + list(range(len(paths))), key="yolo_bulk_pick",
+                        format_func=lambda i: "선택 안 함" if i is None else paths[i])
+    if pick is not None:
+        data = yolo_batch.read_zip_entry(archive.getvalue(), paths[pick])
+        st.image(yolo_batch.annotate(data, yolo_batch.analyze_bytes(data)), use_container_width=True)
 
 
 # ==========================================
-# 7. 페이지 본문 (main.py에서 호출)
+# 6. 페이지 본문 (main.py에서 호출)
 # ==========================================
 def show_page(df_final: pd.DataFrame):
     st.markdown("""
@@ -369,18 +318,6 @@ def show_page(df_final: pd.DataFrame):
         </style>
     """, unsafe_allow_html=True)
 
-    # -----------------------------
-    # 모델 로딩
-    # -----------------------------
-    model_rf, err_rf = load_real_fake_model()
-    model_defect, err_defect = load_defect_model()
-
-    # 에러 메시지 출력(원하면 지워도 됨)
-    if err_rf:
-        st.error(err_rf)
-    if err_defect:
-        st.error(err_defect)
-
     st.markdown("<h2 style='font-weight:700;'>결함 예측 & 멀티모달 분석</h2>", unsafe_allow_html=True)
 
     col1, col2, col3 = st.columns([1.5, 1.8, 1.3])
@@ -392,6 +329,7 @@ def show_page(df_final: pd.DataFrame):
     if "pred_defect_conf" not in st.session_state: st.session_state.pred_defect_conf = None
     if "last_input_df" not in st.session_state: st.session_state.last_input_df = None
     if "direction_hint" not in st.session_state: st.session_state.direction_hint = {}
+    if "direction_curve" not in st.session_state: st.session_state.direction_curve = None
 
     # ---------------------------------------------------------
     # (1) 왼쪽 열 — 피처 입력 + 예측 버튼
@@ -399,7 +337,8 @@ def show_page(df_final: pd.DataFrame):
     with col1:
         st.markdown("<h4>① 입력 피처 설정</h4>", unsafe_allow_html=True)
 
-        med = df_final[FEATURES].median(numeric_only=True)
+        with tracing.stage("machine.median", rows=len(df_final)):
+            med = df_final[FEATURES].median(numeric_only=True)
 
         with st.form("input_form"):
             vals = {}
@@ -413,6 +352,19 @@ def show_page(df_final: pd.DataFrame):
             submitted = st.form_submit_button("예측 실행", use_container_width=True)
 
         if submitted:
+            # -----------------------------
+            # 모델 로딩 (예측을 처음 실행할 때)
+            # -----------------------------
+            with tracing.stage("machine.load_models"):
+                model_rf, err_rf = load_real_fake_model()
+                model_defect, err_defect = load_defect_model()
+
+            # 에러 메시지 출력(원하면 지워도 됨)
+            if err_rf:
+                st.error(err_rf)
+            if err_defect:
+                st.error(err_defect)
+
             try:
                 input_df = pd.DataFrame([vals])[FEATURES]
 
@@ -422,20 +374,21 @@ def show_page(df_final: pd.DataFrame):
                 if model_rf is None:
                     raise RuntimeError("REAL/FALSE 모델이 로딩되지 않았습니다.")
 
-                X_rf = robust_scale_single(input_df, df_final, FEATURES)
-
-                classes_rf = getattr(model_rf, "classes_", np.array([0, 1]))
-                if hasattr(model_rf, "predict_proba"):
-                    prob_arr = np.array(model_rf.predict_proba(X_rf))[0]
-                    if 1 in classes_rf:
-                        idx_real = int(np.where(classes_rf == 1)[0][0])
-                        prob_real = float(prob_arr[idx_real])
+                with tracing.stage("machine.predict_real_fake", rows=1):
+                    X_rf = robust_scale_single(input_df, df_final, FEATURES)
+
+                    classes_rf = getattr(model_rf, "classes_", np.array([0, 1]))
+                    if hasattr(model_rf, "predict_proba"):
+                        prob_arr = np.array(model_rf.predict_proba(X_rf))[0]
+                        if 1 in classes_rf:
+                            idx_real = int(np.where(classes_rf == 1)[0][0])
+                            prob_real = float(prob_arr[idx_real])
+                        else:
+                            prob_real = None
                     else:
                         prob_real = None
-                else:
-                    prob_real = None
 
-                label_rf = "진성" if model_rf.predict(X_rf)[0] == 1 else "가성"
+                    label_rf = "진성" if model_rf.predict(X_rf)[0] == 1 else "가성"
 
                 st.session_state.pred_real_fake = label_rf
                 st.session_state.pred_real_conf = prob_real
@@ -445,7 +398,8 @@ def show_page(df_final: pd.DataFrame):
                 # 결함유형 예측 (joblib)
                 # -----------------
                 if model_defect is not None:
-                    X_def = log_robust_scale_single(input_df, df_final, FEATURES, LOG_FEATURES)
+                    with tracing.stage("machine.log_scale", rows=1):
+                        X_def = log_robust_scale_single(input_df, df_final, FEATURES, LOG_FEATURES)
 
                     if hasattr(model_defect, "predict_proba"):
                         proba_def = np.array(model_defect.predict_proba(X_def))[0]
@@ -464,9 +418,14 @@ def show_page(df_final: pd.DataFrame):
                 # -----------------
                 # 방향성 분석
                 # -----------------
-                st.session_state.direction_hint = compute_false_direction(
-                    input_df, df_final, model_rf, FEATURES
-                )
+                try:
+                    with tracing.stage("machine.false_direction") as span:
+                        curve = compute_false_response(input_df, df_final, model_rf, FEATURES)
+                        span.rows = 0 if curve is None else len(curve) + 1
+                except Exception:
+                    curve = None
+                st.session_state.direction_curve = curve
+                st.session_state.direction_hint = directions_from_response(curve)
 
             except Exception as e:
                 st.error(f"예측 오류: {e}")
@@ -561,12 +520,24 @@ def show_page(df_final: pd.DataFrame):
                             else:
                                 st.markdown(f"- {f} : 영향 미미(중립)")
 
+                    curve = st.session_state.direction_curve
+                    if curve is not None and not curve.empty:
+                        st.markdown("#### 📈 피처별 가성확률 변화 (Δ, 기준값 대비 ±%)")
+                        table = curve.pivot(index="feature", columns="step", values="delta").reindex(FEATURES)
+                        table.columns = [f"{c * 100:+.0f}%" for c in table.columns]
+                        st.dataframe(table.style.format("{:+.4f}"), use_container_width=True)
+
     # ---------------------------------------------------------
     # (3) 오른쪽 열 — 이미지 기반 형상 분류 (YOLO)
     # ---------------------------------------------------------
     with col3:
         st.markdown("<h4>③ 이미지 기반 형상 분석 (YOLO)</h4>", unsafe_allow_html=True)
 
+        yolo_mode = st.radio("분석 단위", ["단일 이미지", "일괄 (zip)"], horizontal=True, key="yolo_mode")
+        if yolo_mode == "일괄 (zip)":
+            show_yolo_bulk()
+            return
+
         uploaded = st.file_uploader(
             "웨이퍼 결함 이미지 업로드 (png/jpg/jpeg)",
             type=["png", "jpg", "jpeg"]
@@ -574,9 +545,11 @@ def show_page(df_final: pd.DataFrame):
 
         if uploaded is not None:
             try:
+                from PIL import Image
                 image = Image.open(uploaded)
 
-                annotated, det_list, main_def, know = run_yolo_analysis(image)
+                with tracing.stage("machine.yolo", rows=1):
+                    annotated, det_list, main_def, know = run_yolo_analysis(image, uploaded.getvalue())
 
                 st.markdown("#### 업로드 이미지")
                 st.image(image, use_container_width=True)
@@ -598,7 +571,7 @@ def show_page(df_final: pd.DataFrame):
                     st.dataframe(det_df[["불량유형(영문)", "신뢰도(%)"]], use_container_width=True)
 
                 st.markdown("#### YOLO 출력 이미지")
-                st.image(annotated, channels="BGR", use_container_width=True)
+                st.image(annotated, use_container_width=True)
 
             except Exception as e:
                 st.error(f"YOLO 분석 중 오류 발생: {e}")
@@ -1,6 +1,19 @@
 import streamlit as st
 import pandas as pd
 import os
+import data_source as data_source_mod
+import db_source
+import realtime
+from filter_index import FilterIndex
+from sketches import StreamingSummary
+import startup_profile
+import tracing
+
+# copy-on-write: 페이지가 받는 프레임/슬라이스는 원본과 메모리를 공유하고, 수정 시에만 복사
+pd.set_option("mode.copy_on_write", True)
+
+# 이번 rerun 의 단계별 시간 / 행 수 / 메모리 기록 시작 (8. 단계 프로파일)
+trace_run = tracing.begin_run()
 
 # --------------------------------------------------------------------------------
 # 1. 페이지 기본 설정
@@ -46,60 +59,89 @@ st.markdown("""
 # --------------------------------------------------------------------------------
 DATA_SOURCE = os.getenv("DATA_SOURCE", "csv").lower()
 
+# db 모드: 전체 테이블을 읽지 않고 사이드바 필터를 WHERE 절로 내려서 조회
+USE_DB = DATA_SOURCE == "db" and db_source.is_configured()
+
+# api 모드: 백그라운드 폴링 -> 링 버퍼 (캐시 전체 재로딩 없이 신규 행만 반영)
+USE_API = DATA_SOURCE == "api" and bool(realtime.API_URL)
+
+# streaming 통계: Stats 페이지는 라벨 컬럼만 메모리에 올리고, 수치 통계는 파일을 chunk 로 훑은 요약으로 계산
+STATS_STREAMING = os.getenv("STATS_BACKEND", "memory").lower() == "streaming" and not (USE_DB or USE_API)
+
+# 사이드바에 모듈 import / 모델 로딩 시간 표시
+SHOW_STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
+# 사이드바에 rerun 단계 프로파일 토글 표시 (기록 자체는 항상, TRACE_FILE 로 파일 기록)
+SHOW_TRACE = os.getenv("TRACE_OVERLAY", "0") == "1"
+
 
 # --------------------------------------------------------------------------------
 # 4. 데이터 로드 함수
 # --------------------------------------------------------------------------------
-@st.cache_data
-def load_data(data_source: str):
+@st.cache_resource(max_entries=4)
+def load_data(data_source: str, columns=None):
+    """세션 공용 프레임 (cache_data 와 달리 rerun 마다 전체 복사본을 만들지 않음, 읽기 전용)"""
     df = None
     is_realtime = False
+    normalized = False
 
     if data_source == "db":
+        # 필터 단위 조회는 load_db_slice 에서 처리 (DB 미설정 시 CSV fallback)
         pass
 
     elif data_source == "api":
+        # 실시간 수집은 get_realtime_feed 에서 처리 (API 미설정 시 CSV fallback)
         pass
 
-    # CSV fallback
+    # CSV fallback (Parquet 캐시 경유, 페이지에 필요한 컬럼만 로드)
     if df is None:
-        file_names = [
-            'C:\\Jupyer_Workspace\\project3\\cleaned_wafer_data.csv',
-            'C:\\Jupyer_Workspace\\project3\\반도체.csv'
-        ]
-        for fpath in file_names:
-            if os.path.exists(fpath):
-                df = pd.read_csv(fpath)
-                break
+        fpath = data_source_mod.find_csv()
+        if fpath is not None:
+            df = data_source_mod.load_csv_frame(fpath, columns)
+            normalized = True
         is_realtime = False
 
-    # 공통 전처리
-    if df is not None:
-        col_map = {
-            'Process': '공정명', 'process': '공정명',
-            'failureType': '결함유형', 'defect_type': '결함유형',
-            'lotName': '배치번호', 'batch_no': '배치번호',
-            'x': 'wafer_x', 'y': 'wafer_y',
-            'is_defect': '불량여부', 'label': '불량여부'
-        }
-        df.rename(columns=col_map, inplace=True)
+    # 공통 전처리 (CSV 는 Parquet 캐시 변환 시 이미 적용됨)
+    if df is not None and not normalized:
+        df = data_source_mod.normalize_columns(df)
+        if data_source_mod.COMPACT:
+            df = data_source_mod.compact_frame(df)
 
-        if '공정명' not in df.columns: df['공정명'] = 'Unknown'
-        if '결함유형' not in df.columns: df['결함유형'] = 'Normal'
-        if '배치번호' not in df.columns: df['배치번호'] = 'Batch_001'
+    return df, is_realtime
 
-        for col in ['공정명', '결함유형', '배치번호']:
-            df[col] = df[col].astype(str)
 
-        if '불량여부' not in df.columns:
-            df['불량여부'] = df['결함유형'].apply(
-                lambda x: 'NORMAL' if str(x).lower() in ['none', 'normal', 'nan'] else 'REAL'
-            )
+@st.cache_resource
+def get_db_pool():
+    return db_source.ConnectionPool(db_source.DB_PATH)
+
+
+@st.cache_resource(max_entries=4)
+def get_filter_index(_df: pd.DataFrame, key):
+    """사이드바 필터 인덱스 (데이터가 바뀔 때만 재생성)"""
+    return FilterIndex(_df)
 
-    return df, is_realtime
 
+@st.cache_resource
+def get_realtime_feed():
+    return realtime.RealtimeFeed(realtime.API_URL).start()
 
-df_raw, REALTIME_ACTIVE = load_data(DATA_SOURCE)
+
+@st.cache_resource(max_entries=8)
+def load_stats_summary(csv_path: str, signature: str, filters):
+    """필터 조합별 스트리밍 요약 (signature: 원본 파일이 바뀌면 재계산)"""
+    return StreamingSummary.from_chunks(
+        lambda: data_source_mod.iter_csv_chunks(csv_path, filters=filters)
+    )
+
+
+@st.cache_data(ttl=300)
+def load_db_options(name: str, filters=()):
+    return db_source.distinct_values(get_db_pool(), name, filters)
+
+
+@st.cache_resource(ttl=300, max_entries=16)
+def load_db_slice(filters, columns=None):
+    return db_source.load_filtered(get_db_pool(), filters, columns)
 
 
 # --------------------------------------------------------------------------------
@@ -112,21 +154,64 @@ with st.sidebar:
     st.markdown("<br>", unsafe_allow_html=True)
 
     menu = st.radio("Menu", ["Dashboard", "Stats", "Machine"], label_visibility="collapsed")
+    trace_run.label = menu
+
+    page_cols = data_source_mod.PAGE_COLUMNS.get(menu)
+    page_cols = tuple(page_cols) if page_cols else None
+    if menu == "Stats" and STATS_STREAMING:
+        page_cols = tuple(data_source_mod.LABEL_COLS + ['불량여부'])
+
     st.subheader("Filter")
 
+    if USE_API:
+        feed = get_realtime_feed()
+        df_raw, buffer_version = feed.snapshot()
+        REALTIME_ACTIVE = feed.is_active()
+    elif not USE_DB:
+        with tracing.stage("main.load_data") as span:
+            df_raw, REALTIME_ACTIVE = load_data(DATA_SOURCE, page_cols)
+            span.rows = 0 if df_raw is None else len(df_raw)
+
     # 필터 처리
-    if df_raw is not None:
-        proc_opts = ["전체"] + sorted(df_raw['공정명'].unique().tolist())
+    if USE_DB:
+        REALTIME_ACTIVE = False
+
+        proc_opts = ["전체"] + load_db_options('공정명')
+        sel_proc = st.selectbox("공정명 (Process)", proc_opts)
+
+        defect_opts = ["전체"] + load_db_options('결함유형', (('공정명', sel_proc),))
+        sel_defect = st.selectbox("결함유형 (Type)", defect_opts)
+
+        batch_opts = ["전체"] + load_db_options('배치번호', (('공정명', sel_proc), ('결함유형', sel_defect)))
+        sel_batch = st.selectbox("배치번호 (Batch)", batch_opts)
+
+        with tracing.stage("main.load_db_slice") as span:
+            df_final = load_db_slice(
+                (('공정명', sel_proc), ('결함유형', sel_defect), ('배치번호', sel_batch)), page_cols
+            )
+            span.rows = len(df_final)
+
+        st.markdown(
+            f"<div style='text-align:right; color:#888; font-size:12px;'>선택 데이터: {len(df_final):,} 건</div>",
+            unsafe_allow_html=True
+        )
+    elif df_raw is not None:
+        index_key = (DATA_SOURCE, page_cols, buffer_version if USE_API else 0)
+        with tracing.stage("main.filter_index", rows=len(df_raw)):
+            f_index = get_filter_index(df_raw, index_key)
+
+        proc_opts = ["전체"] + f_index.options(0)
         sel_proc = st.selectbox("공정명 (Process)", proc_opts)
-        df1 = df_raw if sel_proc == "전체" else df_raw[df_raw['공정명'] == sel_proc]
 
-        defect_opts = ["전체"] + sorted(df1['결함유형'].unique().tolist())
+        defect_opts = ["전체"] + f_index.options(1, sel_proc)
         sel_defect = st.selectbox("결함유형 (Type)", defect_opts)
-        df2 = df1 if sel_defect == "전체" else df1[df1['결함유형'] == sel_defect]
 
-        batch_opts = ["전체"] + sorted(df2['배치번호'].unique().tolist())
+        batch_opts = ["전체"] + f_index.options(2, sel_proc, sel_defect)
         sel_batch = st.selectbox("배치번호 (Batch)", batch_opts)
-        df_final = df2 if sel_batch == "전체" else df2[df2['배치번호'] == sel_batch]
+
+        with tracing.stage("main.filter_select") as span:
+            df_final = f_index.select(df_raw, sel_proc, sel_defect, sel_batch)
+            span.rows = len(df_final)
 
         st.markdown(
             f"<div style='text-align:right; color:#888; font-size:12px;'>선택 데이터: {len(df_final):,} 건</div>",
@@ -134,7 +219,18 @@ with st.sidebar:
         )
     else:
         df_final = pd.DataFrame()
-        st.error("데이터 로드 실패")
+        if USE_API:
+            st.info("실시간 데이터 수신 대기중")
+        else:
+            st.error("데이터 로드 실패")
+
+    # 페이지가 사전 집계(precompute.py)를 찾을 때 쓰는 현재 필터 / 원본 시그니처 (CSV 원본만 해당)
+    csv_source = None if (USE_DB or USE_API) else data_source_mod.find_csv()
+    if not df_final.empty:
+        st.session_state['filter_selection'] = (sel_proc, sel_defect, sel_batch)
+    st.session_state['source_signature'] = (
+        data_source_mod.source_signature(csv_source) if csv_source is not None else None
+    )
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -143,6 +239,19 @@ with st.sidebar:
     else:
         st.markdown("<div style='text-align:center; color:#E74C3C; font-weight:700;'>● 중단</div>", unsafe_allow_html=True)
 
+    if USE_API and feed.last_error:
+        st.caption(f"수집 오류: {feed.last_error}")
+
+
+# 실시간 모드: 버퍼 버전이 바뀐 경우에만 전체 rerun (새 데이터 없으면 아무것도 다시 그리지 않음)
+if USE_API:
+    @st.fragment(run_every=realtime.API_POLL_SEC)
+    def watch_realtime(seen_version: int):
+        if feed.buffer.version != seen_version:
+            st.rerun()
+
+    watch_realtime(buffer_version)    # 실제로 그린 스냅샷의 버전 (그 사이 들어온 chunk 도 rerun 대상)
+
 
 # --------------------------------------------------------------------------------
 # 6. 페이지 라우팅
@@ -151,24 +260,71 @@ if not df_final.empty:
 
     if menu == "Dashboard":
         try:
-            import KPI
-            KPI.show_page(df_final)
+            KPI = startup_profile.timed_import("KPI")
+            with tracing.stage("KPI.show_page", rows=len(df_final)):
+                KPI.show_page(df_final, None if USE_DB else df_raw)
         except Exception as e:
             st.error(f"KPI.py 오류: {e}")
 
     elif menu == "Stats":
         try:
-            import stats
-            stats.show_page(df_final)
+            stats = startup_profile.timed_import("stats")
+            if STATS_STREAMING:
+                with tracing.stage("main.load_stats_summary"):
+                    summary = load_stats_summary(
+                        csv_source, st.session_state['source_signature'],
+                        (('공정명', sel_proc), ('결함유형', sel_defect), ('배치번호', sel_batch))
+                    )
+                with tracing.stage("stats.show_page", rows=len(df_final)):
+                    stats.show_page(df_final, summary)
+            else:
+                with tracing.stage("stats.show_page", rows=len(df_final)):
+                    stats.show_page(df_final)
         except:
             st.info("stats.py 파일 없음")
 
     elif menu == "Machine":
         try:
-            import machine
-            machine.show_page(df_final)
+            machine = startup_profile.timed_import("machine")
+            with tracing.stage("machine.show_page", rows=len(df_final)):
+                machine.show_page(df_final)
         except Exception as e:
             st.error(f"machine.py 오류: {e}")
 
 else:
     st.warning("조건에 맞는 데이터가 없습니다.")
+
+
+# --------------------------------------------------------------------------------
+# 7. 시작 프로파일 (STARTUP_PROFILE=1)
+# --------------------------------------------------------------------------------
+if SHOW_STARTUP_PROFILE:
+    with st.sidebar.expander("⏱ 시작 프로파일"):
+        prof = startup_profile.report()
+        if prof.empty:
+            st.caption("측정 기록 없음")
+        else:
+            st.dataframe(prof.style.format({"seconds": "{:.3f}s"}), use_container_width=True, hide_index=True)
+
+
+# --------------------------------------------------------------------------------
+# 8. 단계 프로파일 (TRACE_OVERLAY=1)
+# --------------------------------------------------------------------------------
+trace_run = tracing.end_run()
+
+if SHOW_TRACE and st.sidebar.toggle("⏱ 단계 프로파일", key="trace_overlay"):
+    with st.sidebar.expander(f"rerun #{trace_run.id} · {trace_run.seconds * 1000:,.0f} ms", expanded=True):
+        trace = tracing.report(trace_run)
+        if trace.empty:
+            st.caption("측정 기록 없음")
+        else:
+            st.dataframe(
+                trace.style.format({"ms": "{:,.1f}", "rows": "{:,.0f}", "mem_mb": "{:+.1f}", "p50_ms": "{:,.1f}"},
+                                   na_rep="-")
+                           .apply(lambda r: ["color: #d63031" if r["regression"] else ""] * len(r), axis=1),
+                use_container_width=True, hide_index=True
+            )
+        st.download_button(
+            "Chrome trace 내려받기", tracing.export_chrome(), file_name="trace.json",
+            mime="application/json", use_container_width=True
+        )
@@ -0,0 +1,216 @@
+# ==========================================
+# model_registry.py  (모델 아티팩트 로딩 / 버전 관리)
+#
+#   model, err = model_registry.get("real_fake")     # 프로세스당 1회 로딩
+#   model_registry.version("real_fake")               # 파일 sha256 앞 16자리
+#
+#   python model_registry.py --warm                   # 전체 로딩 + 버전 출력
+#   python model_registry.py --export real_fake       # ONNX 변환 캐시 생성
+# ==========================================
+
+import os
+import sys
+import pickle
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+from startup_profile import measure
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 모델 파일 위치 (기본: 앱 폴더)
+MODEL_DIR = os.getenv("MODEL_DIR", current_dir)
+
+ARTIFACTS = {
+    "real_fake": os.getenv("MODEL_REAL_FAKE_FILE", "lgbm_v4.pkl"),
+    "defect": os.getenv("MODEL_DEFECT_FILE", "best_defect_model.joblib"),
+    "yolo": os.getenv("MODEL_YOLO_FILE", "best.pt"),
+}
+
+LABELS = {"real_fake": "REAL/FALSE", "defect": "결함유형", "yolo": "YOLO"}
+
+# onnx: 변환 가능한 트리/ sklearn 모델을 onnxruntime 으로 실행 (onnxmltools / skl2onnx 필요)
+MODEL_EXPORT = os.getenv("MODEL_EXPORT", "").lower()
+EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", os.path.join(current_dir, ".cache", "models"))
+
+_models = {}      # name -> (model, err)
+_versions = {}    # name -> sha256 앞 16자리
+_locks = {}       # name -> 로딩 lock (큰 모델 로딩 중에도 다른 모델은 조회 가능)
+_lock = threading.Lock()
+
+
+def path(name: str) -> str:
+    fname = ARTIFACTS[name]
+    return fname if os.path.isabs(fname) else os.path.join(MODEL_DIR, fname)
+
+
+def file_sha256(fpath: str) -> str:
+    h = hashlib.sha256()
+    with open(fpath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+# ==========================================
+# 1. 파일 로더 (캐시 없음, batch_score 등에서 경로 지정 로딩)
+# ==========================================
+def _unwrap_estimator(obj):
+    # (1) dict로 저장된 경우 (예: {"model":..., "meta":...})
+    if isinstance(obj, dict):
+        for key in ["model", "clf", "classifier", "pipeline"]:
+            if key in obj and hasattr(obj[key], "predict"):
+                return obj[key], None
+        for v in obj.values():
+            if hasattr(v, "predict"):
+                return v, None
+        return None, "❌ best_defect_model.joblib 내부에서 predict 가능한 모델을 찾지 못했습니다."
+
+    # (2) 바로 estimator / pipeline 인 경우
+    if hasattr(obj, "predict"):
+        return obj, None
+
+    return None, "❌ best_defect_model.joblib 로딩은 되었지만 모델 객체가 아닙니다."
+
+
+def load_file(name: str, fpath: str):
+    """아티팩트 파일 로딩 -> (model, err)"""
+    label = LABELS.get(name, name)
+    if not os.path.exists(fpath):
+        return None, f"❌ {label} 모델 파일 없음: {fpath}"
+    try:
+        with measure("model", os.path.basename(fpath)):
+            if name == "yolo":
+                from ultralytics import YOLO
+                return YOLO(fpath), None
+
+            if fpath.endswith(".joblib"):
+                import joblib
+                # 비압축 joblib 이면 numpy 배열을 memory-map -> 여러 워커 프로세스가 페이지 캐시 공유
+                return _unwrap_estimator(joblib.load(fpath, mmap_mode="r"))
+
+            with open(fpath, "rb") as f:
+                return pickle.load(f), None
+    except Exception as e:
+        return None, f"❌ {label} 모델 로딩 오류: {e}"
+
+
+# ==========================================
+# 2. 레지스트리 (프로세스당 1회)
+# ==========================================
+def get(name: str):
+    """(model, err) — 같은 프로세스의 모든 페이지/세션이 같은 객체를 공유"""
+    if name in _models:
+        return _models[name]
+    with _lock:
+        name_lock = _locks.setdefault(name, threading.Lock())
+
+    with name_lock:
+        if name in _models:
+            return _models[name]
+
+        fpath = path(name)
+        model, err = load_file(name, fpath)
+        if model is not None:
+            _versions[name] = file_sha256(fpath)
+            if MODEL_EXPORT == "onnx" and name != "yolo":
+                model = export_onnx(name, model) or model
+        _models[name] = (model, err)
+        return _models[name]
+
+
+def version(name: str) -> str:
+    """로딩된 아티팩트 버전 (로딩 전이면 로딩, 파일 없으면 'missing')"""
+    get(name)
+    return _versions.get(name, "missing")
+
+
+def warm(names=None) -> dict:
+    """서버 시작 시 미리 로딩 (fork 전에 호출하면 자식 워커가 메모리를 공유)"""
+    return {n: (version(n), get(n)[1]) for n in (names or ARTIFACTS)}
+
+
+# ==========================================
+# 3. ONNX 변환 (선택)
+# ==========================================
+class OnnxPredictor:
+    """sklearn 호환 predict / predict_proba 를 onnxruntime 세션으로 실행"""
+
+    def __init__(self, session, source):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.classes_ = getattr(source, "classes_", None)
+        self.source = source
+
+    def _run(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return self.session.run(None, {self.input_name: X})
+
+    def predict(self, X):
+        return self._run(X)[0]
+
+    def predict_proba(self, X):
+        return np.asarray(self._run(X)[1])
+
+
+def _convert_onnx(model, n_features: int):
+    if hasattr(model, "booster_"):
+        from onnxmltools import convert_lightgbm
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        return convert_lightgbm(model, initial_types=[("input", FloatTensorType([None, n_features]))], zipmap=False)
+
+    from skl2onnx import to_onnx
+    sample = np.zeros((1, n_features), dtype=np.float32)
+    return to_onnx(model, sample, options={id(model): {"zipmap": False}})
+
+
+def export_onnx(name: str, model):
+    """ONNX 변환 결과(버전별 캐시)로 OnnxPredictor 반환 — 변환 불가 시 None"""
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return None
+
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is None:
+        return None
+
+    out_path = os.path.join(EXPORT_DIR, f"{name}-{_versions.get(name, 'unknown')}.onnx")
+    try:
+        if not os.path.exists(out_path):
+            onx = _convert_onnx(model, int(n_features))
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            with open(out_path + ".tmp", "wb") as f:
+                f.write(onx.SerializeToString())
+            os.replace(out_path + ".tmp", out_path)
+        session = ort.InferenceSession(out_path, providers=["CPUExecutionProvider"])
+    except Exception:
+        return None
+    return OnnxPredictor(session, model)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모델 아티팩트 로딩 / 버전 확인")
+    parser.add_argument("--warm", action="store_true", help="전체 아티팩트 로딩 후 버전 출력")
+    parser.add_argument("--export", nargs="*", help="ONNX 변환 캐시 생성 (이름 생략 시 yolo 제외 전체)")
+    args = parser.parse_args(argv)
+
+    if args.export is not None:
+        for name in args.export or [n for n in ARTIFACTS if n != "yolo"]:
+            model, err = get(name)
+            if err:
+                print(err)
+                continue
+            fast = model if isinstance(model, OnnxPredictor) else export_onnx(name, model)
+            print(f"{name}: {'ONNX 변환 완료' if fast is not None else 'ONNX 변환 불가 (onnxruntime / 변환기 확인)'}")
+
+    if args.warm or args.export is None:
+        for name, (ver, err) in warm().items():
+            print(f"{name:10s} {ver:16s} {path(name)}" + (f"  {err}" if err else ""))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
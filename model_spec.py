@@ -0,0 +1,103 @@
+# ==========================================
+# model_spec.py  (모델 입출력 규격 — Streamlit 없이 import 가능)
+#
+#   machine.py (페이지) 와 batch_score.py / yolo_batch.py (CLI) 가 같이 사용
+#   CLI 워커가 streamlit / 페이지 의존성을 불러오지 않도록 페이지 모듈과 분리
+# ==========================================
+
+import numpy as np
+
+import model_registry
+
+
+# ==========================================
+# 1. 수치 기반 모델용 피처 설정 (웨이퍼위치 제거, 19개)
+# ==========================================
+FEATURES = [
+    '가로길이', '세로길이', '검출면적', '직경크기', '신호강도', '신호극성',
+    '에너지값', '기준편차', '명도수준', '잡음정도', '중심거리', '방향각도',
+    '정렬정도', '점형지수', '영역잡음', '상대강도', '활성지수', '패치신호', 'Aspect_Ratio'
+]
+
+# 모델 파일 경로는 model_registry (MODEL_DIR / MODEL_*_FILE 환경변수) 에서 관리
+MODEL_REAL_FAKE_PATH = model_registry.path("real_fake")
+MODEL_DEFECT_PATH = model_registry.path("defect")  # ✅ 변경: pkl -> joblib
+
+LOG_FEATURES = [
+    '가로길이', '세로길이', '검출면적', '직경크기', '신호강도',
+    '에너지값', '기준편차', '명도수준', '잡음정도', '중심거리',
+    '방향각도', '정렬정도', '점형지수', '영역잡음', '상대강도',
+    '활성지수', '패치신호', 'Aspect_Ratio'
+]
+
+# ==========================================
+# 2. 결함 라벨 매핑 (모델은 0~10 index를 내고, 실제 결함코드로 변환)
+# ==========================================
+DEFECT_CLASS_LIST = [9, 10, 14, 17, 20, 21, 22, 28, 39, 56, 99]
+
+def map_defect_index(idx: int) -> int:
+    """모델의 index 예측값을 실제 결함코드로 매핑"""
+    try:
+        idx = int(idx)
+    except:
+        return idx
+    if 0 <= idx < len(DEFECT_CLASS_LIST):
+        return int(DEFECT_CLASS_LIST[idx])
+    return idx
+
+
+def map_defect_indices(idx_arr) -> np.ndarray:
+    """map_defect_index 의 벡터 버전 (범위 밖 index 는 그대로 유지)"""
+    idx_arr = np.asarray(idx_arr).astype(np.int64)
+    classes = np.asarray(DEFECT_CLASS_LIST, dtype=np.int64)
+    valid = (idx_arr >= 0) & (idx_arr < len(classes))
+    return np.where(valid, classes[np.clip(idx_arr, 0, len(classes) - 1)], idx_arr)
+
+
+# ==========================================
+# 3. 진성 확률 기반 공정 상태 라벨링
+# ==========================================
+def get_quality_status(prob_real: float):
+    if prob_real is None:
+        return "정보 부족", "진성 확률 정보 없음", "#7f8c8d", "⚪"
+
+    p = float(prob_real)
+
+    if p < 0.40:
+        return "정상", "가성 결함 경향. 공정 이상 신호는 낮음.", "#27ae60", "🟢"
+    elif p < 0.68:
+        return "경고", "진성/가성 경계. 로트·장비 트렌드 점검 권장.", "#e67e22", "🟠"
+    elif p < 0.95:
+        return "불량", "진성 결함 가능성이 높은 영역.", "#e74c3c", "🔴"
+    else:
+        return "공정이상", "진성 결함 가능성이 매우 높음. 긴급점검 필요.", "#c0392b", "🚨"
+
+
+def get_quality_tiers(prob_real) -> np.ndarray:
+    """get_quality_status 의 라벨만 벡터로 계산 (NaN -> 정보 부족)"""
+    p = np.asarray(prob_real, dtype=float)
+    return np.select(
+        [np.isnan(p), p < 0.40, p < 0.68, p < 0.95],
+        ["정보 부족", "정상", "경고", "불량"],
+        default="공정이상"
+    )
+
+
+# ==========================================
+# 4. YOLO 형상 분류용 클래스 / 형상별 원인·조치
+# ==========================================
+CLASS_NAMES = {
+    0: 'Center', 1: 'Donut', 2: 'Edge-Loc', 3: 'Edge-Ring',
+    4: 'Loc', 5: 'Near-full', 6: 'Random', 7: 'Scratch'
+}
+
+DEFECT_KNOWLEDGE_BASE = {
+    'Center': {'korean': '센터 불량', 'cause': 'CBCMP', 'action': '이제/센터 구간 CMP 편차 여부 확인'},
+    'Donut': {'korean': '도넛형 불량', 'cause': 'CBCMP', 'action': '패드 상태, 압력 조건, 슬러리 공급 균일성 점검'},
+    'Edge-Loc': {'korean': '엣지 국부 불량', 'cause': 'PC, RMG', 'action': 'PC 공정 전·후 표면 클리닝 상태 점검, 설비 상태(온도, 압력, 회전/이송 조건 등) 변동 이력 확인'},
+    'Edge-Ring': {'korean': '엣지 링 불량', 'cause': 'RMG', 'action': '웨이퍼 중심/에지 구간별 결함 분포 비교'},
+    'Loc': {'korean': '국부 불량', 'cause': 'PC', 'action': 'PC 공정 전·후 표면 클리닝 상태 점검'},
+    'Near-full': {'korean': '전면 불량', 'cause': '심각한 장비 고장, 원자재 불량', 'action': '즉시 생산 중단 및 장비 전수 점검'},
+    'Random': {'korean': '랜덤 불량', 'cause': '정전기(ESD), 미세 스크래치', 'action': 'ESD 방지 대책 및 이송 환경 점검'},
+    'Scratch': {'korean': '스크래치', 'cause': '물리적 접촉, 슬러리 이물질', 'action': '패드 상태, 압력 조건, 슬러리 공급 균일성 점검'}
+}
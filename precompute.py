@@ -0,0 +1,264 @@
+# ==========================================
+# precompute.py  (대시보드 집계 사전 계산 데몬)
+#
+#   python precompute.py                 # 원본이 바뀔 때마다 재계산 (기본 60초 주기 확인)
+#   python precompute.py --once          # 1회 계산 후 종료
+#
+#   필터 조합 (공정명 x 결함유형 x 배치번호, 각 단계 '전체' 포함) 별로
+#   KPI 카드 / 그룹별 건수 / 배치 큐브 / 컬럼 통계(Cpk) / 알람 구간 집계를
+#   SQLite 저장소에 기록하고, 페이지는 원본 시그니처가 같을 때만 읽어서 사용
+#
+#   알람 집계는 페이지와 같이 조합별 필터 결과로 스케일러를 다시 맞추므로 한 행이 조합 수
+#   (최대 공정 x 결함유형 x 배치 각 단계 '전체' 포함 8개) 만큼 채점됨. 행 집합이 같은 조합
+#   (예: 한 공정에만 있는 배치의 '전체/전체/배치' 와 '공정/전체/배치') 은 한 번만 채점
+# ==========================================
+
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import argparse
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+import data_source
+import model_registry
+from batch_cube import BatchCube
+from colstats import column_stats, CPK_SPEC
+from filter_index import FilterIndex
+from scaler import RobustScaler
+
+STORE_PATH = os.getenv("PRECOMPUTE_DB", os.path.join(data_source.CACHE_DIR, "precomputed.db"))
+INTERVAL_SEC = float(os.getenv("PRECOMPUTE_INTERVAL_SEC", "60"))
+
+FEATURES = data_source.FEATURES
+
+# 알람 구간 임계값 (경고 / 불량 / 공정이상)
+ALARM_THRESHOLDS = (0.4000, 0.6826, 0.9546)
+ALARM_TIERS = ("anomaly", "defect", "warning", "normal")
+ALARM_SHOW_COLS = ["공정명", "배치번호", "웨이퍼위치", "검사순번", "결함유형", "불량여부"]
+ALARM_TOP_K = 5
+
+DEFECT_TOKENS = ['REAL', '1', 'TRUE', 'DEFECT']
+GROUP_COLS = ['공정명', '결함유형', '배치번호']
+
+
+# ==========================================
+# 1. 집계 함수 (페이지 실시간 계산과 공용)
+# ==========================================
+def kpi_cards(df: pd.DataFrame) -> dict:
+    total = len(df)
+    defect_count = int(df['불량여부'].astype(str).str.upper().isin(DEFECT_TOKENS).sum())
+    if 'defect_count' in df.columns:
+        avg_defects = float(df['defect_count'].mean())
+    else:
+        avg_defects = defect_count / total if total > 0 else 0
+    return {"total": total, "defect_count": defect_count, "avg_defects": avg_defects}
+
+
+def group_sizes(df: pd.DataFrame) -> dict:
+    """드릴다운 컬럼별 건수 (KPI 추세 차트용)"""
+    return {c: df.groupby(c, observed=True).size() for c in GROUP_COLS if c in df.columns}
+
+
+def alarm_tiers(prob: np.ndarray) -> dict:
+    """구간별 행 위치 (우선순위: 공정이상 > 불량 > 경고 > 정상)"""
+    t_warn, t_defect, t_anomaly = ALARM_THRESHOLDS
+    return {
+        "anomaly": np.where(prob >= t_anomaly)[0],
+        "defect": np.where((prob >= t_defect) & (prob < t_anomaly))[0],
+        "warning": np.where((prob >= t_warn) & (prob < t_defect))[0],
+        "normal": np.where(prob < t_warn)[0],
+    }
+
+
+def alarm_rows(df: pd.DataFrame, prob: np.ndarray, pos: np.ndarray) -> pd.DataFrame:
+    show_cols = [c for c in ALARM_SHOW_COLS if c in df.columns]
+    out = df[show_cols].take(pos).reset_index(drop=True)
+    out["샘플인덱스"] = pos.astype(int)
+    out["예측확률"] = prob[pos].astype(float)
+    return out
+
+
+def top_positions(prob: np.ndarray, indices: np.ndarray, k: int = ALARM_TOP_K) -> np.ndarray:
+    """구간 내 확률 상위 k 개 위치 (argpartition 후 k 개만 정렬)"""
+    if len(indices) == 0:
+        return indices
+    probs = prob[indices]
+    k = min(k, len(indices))
+    top = np.argpartition(-probs, k - 1)[:k]
+    return indices[top[np.argsort(-probs[top], kind="stable")]]
+
+
+def alarm_summary(df: pd.DataFrame, prob: np.ndarray) -> dict:
+    tiers = alarm_tiers(prob)
+    return {
+        "counts": {t: len(idx) for t, idx in tiers.items()},
+        "top": {t: alarm_rows(df, prob, top_positions(prob, idx)) for t, idx in tiers.items() if t != "normal"},
+    }
+
+
+# ==========================================
+# 2. 저장소 (SQLite, 시그니처 단위 교체)
+# ==========================================
+class MaterializedStore:
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+
+    def _connect(self, readonly=False):
+        if readonly:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS aggregates ("
+            " signature TEXT, proc TEXT, defect TEXT, batch TEXT, kind TEXT, payload BLOB,"
+            " PRIMARY KEY (signature, proc, defect, batch, kind))"
+        )
+        return conn
+
+    def meta(self, key: str):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with closing(self._connect(readonly=True)) as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def signature(self):
+        """저장된 집계의 원본 시그니처 (없으면 None)"""
+        return self.meta('signature')
+
+    def get(self, signature: str, selection, kind: str):
+        """selection: (공정명, 결함유형, 배치번호) — 시그니처가 다르면 None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with closing(self._connect(readonly=True)) as conn:
+                row = conn.execute(
+                    "SELECT payload FROM aggregates"
+                    " WHERE signature = ? AND proc = ? AND defect = ? AND batch = ? AND kind = ?",
+                    (signature, *selection, kind)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return pickle.loads(row[0]) if row else None
+
+    def replace(self, signature: str, rows, model_version: str = None):
+        """rows: [(selection, kind, obj)] — 한 트랜잭션으로 기록 후 이전 시그니처 삭제"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?)",
+                    [(signature, *sel, kind, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+                     for sel, kind, obj in rows]
+                )
+                conn.execute("DELETE FROM aggregates WHERE signature != ?", (signature,))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('computed_at', ?)", (str(time.time()),))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('model_version', ?)", (model_version,))
+        finally:
+            conn.close()
+
+
+def lookup(state, kind: str, store: MaterializedStore = None):
+    """페이지용: session_state 의 현재 필터/시그니처에 맞는 사전 집계 (없으면 None)"""
+    selection = state.get('filter_selection')
+    signature = state.get('source_signature')
+    if selection is None or signature is None:
+        return None
+    return (store or MaterializedStore()).get(signature, selection, kind)
+
+
+# ==========================================
+# 3. 사전 계산
+# ==========================================
+def iter_selections(f_index: FilterIndex):
+    """사이드바에서 선택 가능한 모든 (공정명, 결함유형, 배치번호) 조합 ('전체' 포함)"""
+    for proc in ["전체"] + f_index.options(0):
+        for defect in ["전체"] + f_index.options(1, proc):
+            for batch in ["전체"] + f_index.options(2, proc, defect):
+                yield proc, defect, batch
+
+
+def compute_all(df: pd.DataFrame, model=None, model_version: str = None):
+    """필터 조합별 집계 목록 [(selection, kind, obj)]"""
+    f_index = FilterIndex(df)
+    num_cols = df.select_dtypes(include=np.number).columns.tolist()
+    has_features = all(c in df.columns for c in FEATURES)
+
+    rows = []
+    alarms = {}     # 스케일링 기준 지문 -> 알람 집계 (행 집합이 같은 조합끼리 공유)
+    for sel in iter_selections(f_index):
+        part = f_index.select(df, *sel)
+        if part.empty:
+            continue
+        rows.append((sel, "kpi", kpi_cards(part)))
+        rows.append((sel, "group_sizes", group_sizes(part)))
+        rows.append((sel, "colstats", column_stats(part, num_cols, CPK_SPEC)))
+        if '배치번호' in part.columns:
+            rows.append((sel, "cube", BatchCube.from_frame(part, num_cols)))
+
+        if model is not None and has_features:
+            # 페이지와 같은 기준: 필터 결과 자체로 스케일링 후 REAL 확률
+            ref = data_source.frame_fingerprint(part, FEATURES)
+            if ref not in alarms:
+                scaler = RobustScaler.fit(part, FEATURES, fingerprint=ref)
+                prob = np.asarray(model.predict_proba(scaler.transform(part)))[:, 1]
+                alarms[ref] = {**alarm_summary(part, prob), "model_version": model_version}
+            rows.append((sel, "alarm", alarms[ref]))
+    return rows
+
+
+def refresh(csv_path: str, store: MaterializedStore):
+    signature = data_source.source_signature(csv_path)
+    t0 = time.perf_counter()
+    df = data_source.load_csv_frame(csv_path)
+    model, _ = model_registry.get("real_fake")
+    model_version = model_registry.version("real_fake")
+    rows = compute_all(df, model, model_version)
+    store.replace(signature, rows, model_version)
+    n_sel = len({sel for sel, _, _ in rows})
+    print(f"✅ 사전 집계 {n_sel:,}개 조합 저장 ({time.perf_counter() - t0:.1f}s) -> {store.path}")
+    return signature
+
+
+def run(csv_path: str = None, store_path: str = STORE_PATH, interval: float = INTERVAL_SEC, once: bool = False):
+    store = MaterializedStore(store_path)
+    while True:
+        path = csv_path or data_source.find_csv()
+        if path is None:
+            print("❌ 데이터 파일을 찾을 수 없습니다.")
+        elif (data_source.source_signature(path) != store.signature()
+              or model_registry.version("real_fake") != store.meta('model_version')):
+            refresh(path, store)
+        if once:
+            return
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="대시보드 집계 사전 계산 데몬",
+        epilog="모델이 있으면 조합마다 스케일러를 다시 맞춰 채점하므로 행 하나가 최대 8회 "
+               "predict_proba 됨 (행 집합이 같은 조합은 1회). 대용량 원본에서는 --once 로 "
+               "소요 시간을 먼저 확인"
+    )
+    parser.add_argument("--csv", help="원본 CSV (기본: WAFER_CSV_PATH / 기본 후보 경로)")
+    parser.add_argument("--db", default=STORE_PATH, help="집계 저장소 SQLite 경로")
+    parser.add_argument("--interval", type=float, default=INTERVAL_SEC, help="원본 변경 확인 주기(초)")
+    parser.add_argument("--once", action="store_true", help="1회 계산 후 종료")
+    args = parser.parse_args(argv)
+    run(args.csv, args.db, args.interval, args.once)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
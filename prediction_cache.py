@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# 행 단위 예측 캐시
+#   키: (모델 버전, 스케일링 기준 지문) -> {행 id: 예측확률}
+#   스케일링 기준(필터 결과)이 같으면 이미 채점한 행은 다시 predict 하지 않음
+# --------------------------------------------------------------------------------
+
+
+class PredictionStore:
+    def __init__(self, max_keys: int = 8):
+        self.max_keys = max_keys
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self.last_scored = 0    # 직전 호출에서 실제로 채점한 행 수
+
+    def predict_proba(self, df: pd.DataFrame, model, model_version: str, scaler,
+                      feature_cols, class_col: int = 1) -> np.ndarray:
+        """df 행별 class_col 확률 (캐시에 없는 행만 채점)"""
+        key = (model_version, scaler.fingerprint, tuple(feature_cols), class_col)
+
+        # 행 id 가 중복이면 캐시할 수 없으므로 전부 채점
+        if not df.index.is_unique:
+            self.last_scored = len(df)
+            return np.asarray(model.predict_proba(scaler.transform(df)))[:, class_col]
+
+        with self._lock:
+            known = self._tables.get(key)
+            if known is not None:
+                self._tables.move_to_end(key)
+
+        if known is None:
+            cached = np.full(len(df), np.nan)
+        else:
+            cached = known.reindex(df.index).to_numpy(dtype=float, copy=True)
+
+        missing = np.isnan(cached)
+        self.last_scored = int(missing.sum())
+        if self.last_scored:
+            rows = df.iloc[np.flatnonzero(missing)] if self.last_scored < len(df) else df
+            proba = np.asarray(model.predict_proba(scaler.transform(rows)))[:, class_col]
+            cached[missing] = proba
+
+            new = pd.Series(proba, index=rows.index)
+            with self._lock:
+                known = self._tables.get(key)
+                if known is not None:
+                    # 다른 세션이 먼저 채점한 행은 제외
+                    new = new[~new.index.isin(known.index)]
+                self._tables[key] = new if known is None else pd.concat([known, new])
+                self._tables.move_to_end(key)
+                while len(self._tables) > self.max_keys:
+                    self._tables.popitem(last=False)
+
+        return cached
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import threading
+import argparse
+import urllib.request
+import urllib.parse
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+import data_source
+
+# --------------------------------------------------------------------------------
+# 0. 실시간 수집 설정 (환경변수)
+# --------------------------------------------------------------------------------
+API_URL = os.getenv("API_URL", "")
+API_POLL_SEC = float(os.getenv("API_POLL_SEC", "2"))
+API_BATCH_LIMIT = int(os.getenv("API_BATCH_LIMIT", "50000"))
+API_BUFFER_ROWS = int(os.getenv("API_BUFFER_ROWS", "500000"))
+API_TIMEOUT_SEC = float(os.getenv("API_TIMEOUT_SEC", "5"))
+
+
+# --------------------------------------------------------------------------------
+# 1. 링 버퍼 (최근 N건만 유지, 행 인덱스 = 전역 수신 순번)
+# --------------------------------------------------------------------------------
+class RingBuffer:
+    """정규화된 chunk 를 쌓아두는 고정 용량 버퍼"""
+
+    def __init__(self, capacity: int = API_BUFFER_ROWS):
+        self.capacity = capacity
+        self._chunks = deque()
+        self._rows = 0
+        self._next_seq = 0      # 다음에 들어올 행의 전역 순번
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_version = -1
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def head_seq(self) -> int:
+        """버퍼에 남아있는 가장 오래된 행의 순번"""
+        return self._next_seq - self._rows
+
+    def append(self, df: pd.DataFrame):
+        if df is None or df.empty:
+            return
+        df = data_source.normalize_columns(df.reset_index(drop=True))
+        df.index = pd.RangeIndex(self._next_seq, self._next_seq + len(df))
+
+        with self._lock:
+            self._chunks.append(df)
+            self._rows += len(df)
+            self._next_seq += len(df)
+
+            # 용량 초과분은 오래된 chunk 부터 제거
+            while self._rows > self.capacity:
+                overflow = self._rows - self.capacity
+                head = self._chunks[0]
+                if len(head) <= overflow:
+                    self._chunks.popleft()
+                    self._rows -= len(head)
+                else:
+                    self._chunks[0] = head.iloc[overflow:]
+                    self._rows -= overflow
+
+            self.version += 1
+
+    def snapshot(self):
+        """(현재 버퍼 전체, 그 시점의 버전) — 버전이 바뀐 경우에만 새로 붙임
+
+        버전은 스냅샷과 같은 잠금 구간에서 읽으므로 캐시 키로 그대로 써도 됨
+
+        인덱스는 전역 순번이고 뒤에만 행이 붙으므로 batch_cube.CubeCache 는 추가분만 집계함
+        (오래된 행이 밀려나면 다 밀려난 배치만 빼고 일부 남은 배치만 재집계). 스케일러 / 예측
+        캐시는 필터 결과 자체가 기준이라 버전이 바뀌면 다시 계산
+        """
+        with self._lock:
+            if self._snapshot_version == self.version:
+                return self._snapshot, self._snapshot_version
+            chunks = list(self._chunks)
+            version = self.version
+
+        if not chunks:
+            snap = None
+        elif self._snapshot is not None and chunks[0].index[0] >= self._snapshot.index[0]:
+            # 이전 스냅샷 + 새로 들어온 chunk 만 이어붙이기
+            prev = self._snapshot.loc[chunks[0].index[0]:]
+            new = [c for c in chunks if c.index[0] > self._snapshot.index[-1]]
+            snap = pd.concat([prev] + new) if new else prev
+        else:
+            snap = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+        with self._lock:
+            self._snapshot, self._snapshot_version = snap, version
+        return snap, version
+
+
+# --------------------------------------------------------------------------------
+# 2. 수집 스레드 (HTTP 폴링)
+# --------------------------------------------------------------------------------
+def fetch_records(url: str, cursor: int, limit: int = API_BATCH_LIMIT, timeout: float = API_TIMEOUT_SEC):
+    """GET {url}?since=cursor&limit=N -> (다음 cursor, DataFrame)"""
+    sep = "&" if "?" in url else "?"
+    query = urllib.parse.urlencode({"since": cursor, "limit": limit})
+    with urllib.request.urlopen(f"{url}{sep}{query}", timeout=timeout) as resp:
+        payload = json.loads(resp.read().decode("utf-8"))
+    records = payload.get("records", [])
+    return int(payload.get("cursor", cursor + len(records))), pd.DataFrame.from_records(records)
+
+
+class RealtimeFeed:
+    """백그라운드 폴링으로 신규 검사 레코드를 RingBuffer 에 적재"""
+
+    def __init__(self, url: str = API_URL, poll_sec: float = API_POLL_SEC,
+                 capacity: int = API_BUFFER_ROWS):
+        self.url = url
+        self.poll_sec = poll_sec
+        self.buffer = RingBuffer(capacity)
+        self.cursor = 0
+        self.last_ok = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="realtime-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def poll_once(self):
+        cursor, df = fetch_records(self.url, self.cursor)
+        self.buffer.append(df)
+        self.cursor = cursor
+        self.last_ok = time.time()
+        self.last_error = None
+        return len(df)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                n = self.poll_once()
+            except Exception as e:
+                self.last_error = str(e)
+                n = 0
+            # 밀린 데이터가 있으면 바로 다음 요청
+            if n < API_BATCH_LIMIT:
+                self._stop.wait(self.poll_sec)
+
+    def is_active(self) -> bool:
+        """스레드가 살아있고 최근 폴링이 성공했으면 True"""
+        alive = self._thread is not None and self._thread.is_alive()
+        return alive and self.last_ok is not None and (time.time() - self.last_ok) < self.poll_sec * 3 + API_TIMEOUT_SEC
+
+    def snapshot(self):
+        return self.buffer.snapshot()
+
+
+# --------------------------------------------------------------------------------
+# 3. 로컬 테스트용 가짜 서버 (CSV 를 초당 rate 건씩 흘려보냄)
+# --------------------------------------------------------------------------------
+def serve_fake(csv_path: str, port: int = 8765, rate: float = 200.0):
+    source = pd.read_csv(csv_path)
+    started = time.time()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            qs = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            since = int(qs.get("since", ["0"])[0])
+            limit = int(qs.get("limit", [str(API_BATCH_LIMIT)])[0])
+
+            available = min(len(source), int((time.time() - started) * rate))
+            end = min(available, since + limit)
+            chunk = source.iloc[since:end]
+
+            body = json.dumps({
+                "cursor": max(end, since),
+                "records": json.loads(chunk.to_json(orient="records", force_ascii=False)),
+            }, ensure_ascii=False).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"fake realtime source: http://127.0.0.1:{port}/records ({len(source):,} rows, {rate}/s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="실시간 수집 테스트용 가짜 API 서버")
+    parser.add_argument("--csv", default=data_source.find_csv())
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=200.0, help="초당 공급 건수")
+    args = parser.parse_args()
+    serve_fake(args.csv, args.port, args.rate)
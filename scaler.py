@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_source import frame_fingerprint, feature_matrix
+
+# --------------------------------------------------------------------------------
+# 로버스트 스케일러 (median / IQR), 원본 공간 + log1p 공간 통계를 함께 보관
+#   같은 기준 데이터(필터 결과)면 페이지/재실행 간에 재사용
+# --------------------------------------------------------------------------------
+_CACHE_SIZE = 16
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _log1p_clip(X: np.ndarray) -> np.ndarray:
+    return np.log1p(np.clip(X, 0, None))
+
+
+class RobustScaler:
+    def __init__(self, feature_cols, med, iqr, log_med, log_iqr, fingerprint=None):
+        self.feature_cols = list(feature_cols)
+        self.med, self.iqr = med, iqr
+        self.log_med, self.log_iqr = log_med, log_iqr
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def fit(cls, ref_df: pd.DataFrame, feature_cols, fingerprint=None):
+        """기준 데이터에서 원본/로그 공간의 median, IQR 을 한 번에 계산"""
+        feature_cols = list(feature_cols)
+        numeric = ref_df[feature_cols].select_dtypes(include="number").columns
+        is_num = np.array([c in numeric for c in feature_cols])
+
+        X = np.full((len(ref_df), len(feature_cols)), np.nan)
+        if is_num.any():
+            X[:, is_num] = ref_df[numeric].to_numpy(dtype=float)
+
+        def _stats(M):
+            if len(M) == 0:
+                nan = np.full(M.shape[1], np.nan)
+                return nan, nan.copy()
+            q1, med, q3 = np.nanquantile(M, [0.25, 0.5, 0.75], axis=0)
+            iqr = q3 - q1
+            iqr[iqr == 0] = 1.0
+            return med, iqr
+
+        med, iqr = _stats(X)
+        log_med, log_iqr = _stats(_log1p_clip(X))
+        return cls(feature_cols, med, iqr, log_med, log_iqr, fingerprint)
+
+    def _params(self, log_cols):
+        """컬럼별로 로그/원본 통계 선택"""
+        use_log = np.isin(self.feature_cols, list(log_cols))
+        return (np.where(use_log, self.log_med, self.med),
+                np.where(use_log, self.log_iqr, self.iqr),
+                use_log)
+
+    def transform_array(self, X: np.ndarray, log_cols=()) -> np.ndarray:
+        """(n, 피처수) 배열을 벡터 연산 한 번으로 스케일링 (float32 입력은 float32 유지)"""
+        X = np.asarray(X)
+        dtype = np.float32 if X.dtype == np.float32 else np.float64
+        X = X.astype(dtype, copy=False)
+        if not log_cols:
+            return (X - self.med.astype(dtype)) / self.iqr.astype(dtype)
+        med, iqr, use_log = self._params(log_cols)
+        X = np.where(use_log, _log1p_clip(X), X)
+        return (X - med.astype(dtype)) / iqr.astype(dtype)
+
+    def transform(self, df: pd.DataFrame, log_cols=()) -> pd.DataFrame:
+        X = feature_matrix(df, self.feature_cols)
+        return pd.DataFrame(self.transform_array(X, log_cols), index=df.index, columns=self.feature_cols)
+
+
+def get_scaler(ref_df: pd.DataFrame, feature_cols) -> RobustScaler:
+    """기준 데이터 지문별로 캐시된 스케일러 반환 (없으면 fit)"""
+    key = (frame_fingerprint(ref_df, feature_cols), tuple(feature_cols))
+    with _lock:
+        scaler = _cache.get(key)
+        if scaler is not None:
+            _cache.move_to_end(key)
+            return scaler
+
+    scaler = RobustScaler.fit(ref_df, feature_cols, fingerprint=key[0])
+    with _lock:
+        _cache[key] = scaler
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return scaler
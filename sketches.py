@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+
+from batch_cube import BatchCube, BATCH_COL
+from colstats import DESCRIBE_COLS, QUANTILES, cpk_vector
+
+# --------------------------------------------------------------------------------
+# 스트리밍 통계 (chunk 단위 누적, 파티션끼리 merge 가능)
+#   Moments         : count / 평균 / M2 / min / max (Welford-Chan 병합, 정확값)
+#   KLLSketch       : 분위수 스케치 (메모리 O(k), 근사값)
+#   FixedHistogram  : 고정 구간 히스토그램 (구간이 같으면 합산)
+#   StreamingSummary: 위 세 가지 + 배치 큐브를 묶은 2-pass 요약
+#     1차 pass: 모멘트 / 분위수 / 배치 큐브
+#     freeze() : 전체 min/max 로 히스토그램 구간, 평균±3σ 로 이상치 기준 확정
+#     2차 pass: 히스토그램 / 이상치 개수
+# --------------------------------------------------------------------------------
+DEFAULT_BINS = 40
+DEFAULT_K = 200
+
+
+class Moments:
+    def __init__(self, n_cols: int):
+        self.n = np.zeros(n_cols, dtype=np.int64)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.nan)
+        self.max = np.full(n_cols, np.nan)
+
+    def update(self, X: np.ndarray):
+        valid = ~np.isnan(X)
+        nb = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mb = np.where(valid, X, 0.0).sum(axis=0) / nb
+            dev = np.where(valid, X - mb, 0.0)
+            other = Moments(len(nb))
+            other.n, other.mean, other.m2 = nb, np.nan_to_num(mb), (dev * dev).sum(axis=0)
+            if len(X):
+                other.min, other.max = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        self.merge(other)
+
+    def merge(self, other: "Moments"):
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            w = np.where(n > 0, other.n / np.maximum(n, 1), 0.0)
+            self.mean = self.mean + delta * w
+            self.m2 = self.m2 + other.m2 + delta * delta * self.n * w
+        self.n = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > 1, np.sqrt(self.m2 / (self.n - 1)), np.nan)
+
+
+class KLLSketch:
+    """KLL 분위수 스케치 (레벨 h 의 원소 가중치 = 2^h)"""
+
+    def __init__(self, k: int = DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            lvl = self.levels[h]
+            if len(lvl) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                lvl = np.sort(lvl)
+                odd = len(lvl) % 2
+                # 짝수 개를 정렬 후 하나 건너 하나씩 (무작위 시작) 윗 레벨로 승격
+                promoted = lvl[odd:][self._rng.integers(2)::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = lvl[:odd]
+            h += 1
+
+    def update(self, values):
+        v = np.asarray(values, dtype=float)
+        v = v[~np.isnan(v)]
+        if len(v):
+            self.n += len(v)
+            self.levels[0] = np.concatenate([self.levels[0], v])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, lvl in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], lvl])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        if len(self.levels) == 1:
+            # 아직 압축 전이면 정확값 (pandas describe 와 동일한 선형 보간)
+            return np.quantile(self.levels[0], qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cw = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cw, qs * cw[-1], side="left")
+        return items[np.clip(idx, 0, len(items) - 1)]
+
+
+class FixedHistogram:
+    def __init__(self, edges: np.ndarray):
+        self.edges = np.asarray(edges, dtype=float)          # (n_cols, bins + 1)
+        self.counts = np.zeros((self.edges.shape[0], self.edges.shape[1] - 1), dtype=np.int64)
+
+    def update(self, X: np.ndarray):
+        for j in range(self.counts.shape[0]):
+            col = X[:, j]
+            col = col[~np.isnan(col)]
+            if len(col) and np.isfinite(self.edges[j]).all():
+                self.counts[j] += np.histogram(col, bins=self.edges[j])[0]
+        return self
+
+    def merge(self, other: "FixedHistogram"):
+        if not np.array_equal(self.edges, other.edges, equal_nan=True):
+            raise ValueError("히스토그램 구간이 달라 병합할 수 없습니다.")
+        self.counts += other.counts
+        return self
+
+
+class StreamingSummary:
+    def __init__(self, cols, bins: int = DEFAULT_BINS, k: int = DEFAULT_K, batch_col: str = BATCH_COL):
+        self.cols = list(cols)
+        self.bins = bins
+        self.batch_col = batch_col
+        self.moments = Moments(len(self.cols))
+        self.sketches = [KLLSketch(k) for _ in self.cols]
+        self.cube = None
+        self.hist = None
+        self.outliers = np.zeros(len(self.cols), dtype=np.int64)
+        self._limits = None
+
+    # ------------------------------------------------------------------
+    # 누적
+    # ------------------------------------------------------------------
+    def _matrix(self, chunk: pd.DataFrame) -> np.ndarray:
+        X = np.full((len(chunk), len(self.cols)), np.nan)
+        for j, c in enumerate(self.cols):
+            if c in chunk.columns:
+                X[:, j] = chunk[c].to_numpy(dtype=float)
+        return X
+
+    def add(self, chunk: pd.DataFrame):
+        """1차 pass: 모멘트 / 분위수 스케치 / 배치 큐브"""
+        X = self._matrix(chunk)
+        self.moments.update(X)
+        for j, sk in enumerate(self.sketches):
+            sk.update(X[:, j])
+        if self.batch_col in chunk.columns:
+            part = BatchCube.from_frame(chunk, self.cols, self.batch_col)
+            self.cube = part if self.cube is None else self.cube.merge(part)
+        return self
+
+    def freeze(self, reference: "StreamingSummary" = None):
+        """1차 pass 결과(기본: 자기 자신, 분산 처리 시 병합된 전체 요약)로 2차 pass 기준 확정"""
+        ref = (reference or self).moments
+        edges = np.full((len(self.cols), self.bins + 1), np.nan)
+        for j in range(len(self.cols)):
+            if ref.n[j]:
+                # np.histogram(series, bins) 와 같은 구간
+                edges[j] = np.histogram_bin_edges(np.array([ref.min[j], ref.max[j]]), bins=self.bins)
+        self.hist = FixedHistogram(edges)
+        std = ref.std
+        self._limits = (ref.mean - 3 * std, ref.mean + 3 * std)
+        return self
+
+    def add_second_pass(self, chunk: pd.DataFrame):
+        """2차 pass: 히스토그램 / ±3σ 이상치 개수"""
+        if self.hist is None:
+            raise RuntimeError("freeze() 이후에 호출해야 합니다.")
+        X = self._matrix(chunk)
+        self.hist.update(X)
+        lower, upper = self._limits
+        with np.errstate(invalid="ignore"):
+            self.outliers += ((X > upper) | (X < lower)).sum(axis=0)
+        return self
+
+    def merge(self, other: "StreamingSummary"):
+        """다른 파티션 요약 합산 (같은 cols / 같은 단계여야 함)"""
+        if other.cols != self.cols:
+            raise ValueError("컬럼 구성이 다른 요약은 병합할 수 없습니다.")
+        self.moments.merge(other.moments)
+        for a, b in zip(self.sketches, other.sketches):
+            a.merge(b)
+        if other.cube is not None:
+            self.cube = other.cube.copy() if self.cube is None else self.cube.merge(other.cube)
+        if self.hist is not None and other.hist is not None:
+            self.hist.merge(other.hist)
+            self.outliers += other.outliers
+        return self
+
+    @classmethod
+    def from_chunks(cls, chunk_source, cols=None, **kwargs) -> "StreamingSummary":
+        """chunk_source() 를 두 번 순회해서 요약 생성 (cols 없으면 첫 chunk 의 수치 컬럼)"""
+        summary = None
+        for chunk in chunk_source():
+            if summary is None:
+                if cols is None:
+                    cols = [c for c in chunk.select_dtypes(include="number").columns]
+                summary = cls(cols, **kwargs)
+            summary.add(chunk)
+        if summary is None:
+            summary = cls(cols or [], **kwargs)
+
+        summary.freeze()
+        for chunk in chunk_source():
+            summary.add_second_pass(chunk)
+        return summary
+
+    # ------------------------------------------------------------------
+    # 조회 (colstats.column_stats 와 같은 형태)
+    # ------------------------------------------------------------------
+    def column_stats(self, spec=None) -> pd.DataFrame:
+        m = self.moments
+        n, std = m.n, m.std
+        with np.errstate(invalid="ignore"):
+            mean = np.where(n > 0, m.mean, np.nan)
+        quant = np.array([sk.quantile(QUANTILES) for sk in self.sketches]).reshape(len(self.cols), len(QUANTILES))
+
+        out = pd.DataFrame({
+            'count': n.astype(float),
+            'mean': mean,
+            'std': std,
+            'min': m.min,
+            **{f"{int(p * 100)}%": quant[:, i] for i, p in enumerate(QUANTILES)},
+            'max': m.max,
+            'outliers': np.where(n < 2, 0, self.outliers),
+            'cpk': cpk_vector(self.cols, n, mean, std, spec),
+        }, index=pd.Index(self.cols))
+        return out[DESCRIBE_COLS + ['outliers', 'cpk']]
+
+    def histogram(self, col: str):
+        """(counts, edges) — 2차 pass 전이면 None"""
+        if self.hist is None or col not in self.cols:
+            return None
+        j = self.cols.index(col)
+        return self.hist.counts[j], self.hist.edges[j]
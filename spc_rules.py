@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# Nelson 규칙 (Western Electric 확장) 엔진
+#   (배치 x 피처) 평균 행렬을 z 점수로 바꾼 뒤 누적합 기반 구간 카운트로
+#   모든 피처 / 모든 배치의 8개 규칙을 한 번에 판정
+#   위반은 규칙 구간의 마지막 배치에 기록 (결측 배치는 연속 구간을 끊음)
+# --------------------------------------------------------------------------------
+RULES = {
+    1: "±3σ 이탈",
+    2: "9연속 중심선 한쪽",
+    3: "6연속 증가/감소",
+    4: "14연속 교대 증감",
+    5: "3개 중 2개 2σ 밖 (같은 쪽)",
+    6: "5개 중 4개 1σ 밖 (같은 쪽)",
+    7: "15연속 1σ 이내",
+    8: "8연속 1σ 밖 (양쪽)",
+}
+ALL_RULES = tuple(RULES)
+
+VIOLATION_COLS = ['Batch_Index', '배치번호', 'feature', 'rule', 'description', 'value', 'z']
+
+
+def _window_count(mask: np.ndarray, w: int) -> np.ndarray:
+    """(n, f) bool -> (n - w + 1, f) 길이 w 구간별 True 개수"""
+    c = np.zeros((mask.shape[0] + 1, mask.shape[1]), dtype=np.int32)
+    np.cumsum(mask, axis=0, out=c[1:])
+    return c[w:] - c[:-w]
+
+
+def _at_end(hit: np.ndarray, w: int, n: int) -> np.ndarray:
+    """구간 판정 (n - w + 1, f) -> 구간 끝 배치 위치 기준 (n, f)"""
+    out = np.zeros((n, hit.shape[1]), dtype=bool)
+    if len(hit):
+        out[w - 1:] = hit
+    return out
+
+
+def rule_matrix(z: np.ndarray, rules=ALL_RULES) -> dict:
+    """z 점수 행렬 (배치 x 피처) -> {규칙: 위반 bool 행렬}"""
+    n = z.shape[0]
+    valid = ~np.isnan(z)
+    with np.errstate(invalid="ignore"):
+        above, below = z > 0, z < 0
+        out = {}
+
+        if 1 in rules:
+            out[1] = np.abs(z) > 3
+
+        if 2 in rules and n >= 9:
+            out[2] = _at_end((_window_count(above, 9) == 9) | (_window_count(below, 9) == 9), 9, n)
+
+        d = np.diff(z, axis=0)                       # 결측이 끼면 NaN -> 증감 모두 False
+        if 3 in rules and n >= 6:
+            up, down = _window_count(d > 0, 5), _window_count(d < 0, 5)
+            out[3] = _at_end((up == 5) | (down == 5), 6, n)
+
+        if 4 in rules and n >= 14:
+            flip = (d[:-1] * d[1:]) < 0              # 점 k, k+1, k+2 가 교대
+            out[4] = _at_end(_window_count(flip, 12) == 12, 14, n)
+
+        if 5 in rules and n >= 3:
+            hit = (_window_count(z > 2, 3) >= 2) | (_window_count(z < -2, 3) >= 2)
+            out[5] = _at_end(hit, 3, n)
+
+        if 6 in rules and n >= 5:
+            hit = (_window_count(z > 1, 5) >= 4) | (_window_count(z < -1, 5) >= 4)
+            out[6] = _at_end(hit, 5, n)
+
+        if 7 in rules and n >= 15:
+            out[7] = _at_end(_window_count(valid & (np.abs(z) < 1), 15) == 15, 15, n)
+
+        if 8 in rules and n >= 8:
+            # 8점 모두 ±1σ 밖 + 양쪽에 모두 점이 있어야 함 (한쪽만이면 규칙 2/6 쪽)
+            hit = ((_window_count(np.abs(z) > 1, 8) == 8)
+                   & (_window_count(z > 1, 8) >= 1) & (_window_count(z < -1, 8) >= 1))
+            out[8] = _at_end(hit, 8, n)
+
+    return out
+
+
+def evaluate(means: pd.DataFrame, center=None, sigma=None, rules=ALL_RULES, batches=None) -> pd.DataFrame:
+    """배치 평균 행렬 (index = Batch_Index, columns = 피처) -> 위반 목록
+
+    center / sigma 기본값: 배치 평균들의 평균 / 표준편차 (SPC 관리도와 같은 기준)
+    """
+    M = means.to_numpy(dtype=float)
+    if M.size == 0:
+        return pd.DataFrame(columns=VIOLATION_COLS)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.nanmean(M, axis=0) if center is None else np.asarray(center, dtype=float)
+        sd = np.nanstd(M, axis=0, ddof=1) if sigma is None else np.asarray(sigma, dtype=float)
+        z = (M - mu) / np.where(sd > 0, sd, np.nan)
+
+    frames = []
+    for rule, hit in rule_matrix(z, rules).items():
+        bi, fj = np.nonzero(hit)
+        if len(bi):
+            frames.append(pd.DataFrame({'pos': bi, 'fj': fj, 'rule': rule}))
+    if not frames:
+        return pd.DataFrame(columns=VIOLATION_COLS)
+
+    v = pd.concat(frames, ignore_index=True)
+    pos, fj = v['pos'].to_numpy(), v['fj'].to_numpy()
+    out = pd.DataFrame({
+        'Batch_Index': means.index.to_numpy()[pos],
+        '배치번호': np.asarray(batches)[pos] if batches is not None else means.index.to_numpy()[pos],
+        'feature': means.columns.to_numpy()[fj],
+        'rule': v['rule'].to_numpy(),
+        'description': v['rule'].map(RULES).to_numpy(),
+        'value': M[pos, fj],
+        'z': z[pos, fj],
+    })
+    return out.sort_values(['Batch_Index', 'feature', 'rule'], kind='stable').reset_index(drop=True)
+
+
+def evaluate_cube(cube, features=None, rules=ALL_RULES) -> pd.DataFrame:
+    """batch_cube.BatchCube 의 배치 평균 전체에 규칙 적용"""
+    means = cube.batch_means()
+    if features is not None:
+        means = means[[f for f in features if f in means.columns]]
+    return evaluate(means, rules=rules, batches=cube.batches)
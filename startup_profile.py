@@ -0,0 +1,132 @@
+# ==========================================
+# startup_profile.py  (페이지 모듈 import / 모델 로딩 시간 측정)
+#
+#   앱 내부 : timed_import("KPI"), with measure("model", "lgbm_v4.pkl"): ...
+#   콜드 측정: python startup_profile.py            (모듈별 새 프로세스에서 import)
+#             python startup_profile.py --json base.json --compare prev.json
+# ==========================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+# 앱이 무겁게 import 하는 모듈 (콜드 측정 대상)
+PAGE_MODULES = ["KPI", "stats", "machine"]
+HEAVY_MODULES = ["scipy.ndimage", "scipy.signal", "joblib", "PIL.Image", "ultralytics"]
+
+# 비교 시 이 비율 이상 느려지면 회귀로 표시
+REGRESSION_RATIO = 1.25
+
+_records = []
+_lock = threading.Lock()
+
+
+def record(kind: str, name: str, seconds: float):
+    with _lock:
+        _records.append({"kind": kind, "name": name, "seconds": seconds, "at": time.time()})
+
+
+@contextmanager
+def measure(kind: str, name: str):
+    """with 블록 소요 시간을 프로세스 기록에 추가 (kind: import / model 등)"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - t0)
+
+
+def timed_import(name: str):
+    """모듈 import (이 프로세스에서 처음 import 될 때만 기록)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    with measure("import", name):
+        return importlib.import_module(name)
+
+
+def report() -> pd.DataFrame:
+    """이 프로세스의 측정 기록 (느린 순)"""
+    with _lock:
+        rows = list(_records)
+    if not rows:
+        return pd.DataFrame(columns=["kind", "name", "seconds"])
+    df = pd.DataFrame(rows)[["kind", "name", "seconds"]]
+    return df.sort_values("seconds", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# ==========================================
+# 콜드 import 측정 (모듈마다 새 인터프리터)
+# ==========================================
+_COLD_SNIPPET = (
+    "import time, importlib\n"
+    "import streamlit, pandas, numpy\n"      # 공통 기반은 미리 올려서 모듈 자체 비용만 측정
+    "t0 = time.perf_counter()\n"
+    "importlib.import_module({name!r})\n"
+    "print(time.perf_counter() - t0)\n"
+)
+
+
+def cold_import_time(name: str, repeat: int = 1):
+    """새 프로세스에서 import 소요 시간 (실패 시 None)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-c", _COLD_SNIPPET.format(name=name)],
+            cwd=here, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return None
+        sec = float(proc.stdout.strip().splitlines()[-1])
+        best = sec if best is None else min(best, sec)
+    return best
+
+
+def cold_profile(modules=None, repeat: int = 3) -> dict:
+    modules = modules or PAGE_MODULES + HEAVY_MODULES
+    return {m: cold_import_time(m, repeat) for m in modules}
+
+
+def compare(current: dict, previous: dict, ratio: float = REGRESSION_RATIO) -> pd.DataFrame:
+    rows = []
+    for name, sec in current.items():
+        prev = previous.get(name)
+        slower = sec is not None and prev and sec > prev * ratio
+        rows.append({"module": name, "seconds": sec, "previous": prev, "regression": bool(slower)})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="페이지 모듈 콜드 import 시간 측정")
+    parser.add_argument("modules", nargs="*", help="측정할 모듈 (기본: 페이지 + 무거운 의존성)")
+    parser.add_argument("--repeat", type=int, default=3, help="모듈별 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--json", help="결과 저장 경로")
+    parser.add_argument("--compare", help="이전 결과 JSON (회귀 표시)")
+    args = parser.parse_args(argv)
+
+    result = cold_profile(args.modules or None, args.repeat)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            table = compare(result, json.load(f))
+    else:
+        table = pd.DataFrame({"module": list(result), "seconds": list(result.values())})
+    print(table.to_string(index=False))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.compare and table["regression"].any():
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
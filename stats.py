@@ -4,30 +4,56 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 
+from batch_cube import get_cube
+from colstats import DESCRIBE_COLS, CPK_SPEC
+from data_source import frame_fingerprint
+from spc_rules import evaluate_cube
+import precompute
+from compute_engine import get_engine
+import tracing
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def get_column_stats(_df: pd.DataFrame, fingerprint: str, cols: tuple, spec: tuple):
+    # 필터 결과(지문)별 1회 계산 -> 변수 선택 변경 시 재계산 없음 (COMPUTE_ENGINE 엔진)
+    return get_engine().column_stats(_df, cols, dict(spec))
+
+
+def add_rule_markers(fig, violations, var):
+    # ±3σ 이외의 Nelson 규칙 위반 배치는 주황 마름모로 표시 (hover 에 규칙명)
+    if violations is None or violations.empty:
+        return
+    v = violations[(violations['feature'] == var) & (violations['rule'] != 1)]
+    if v.empty:
+        return
+    pts = v.groupby('Batch_Index').agg(value=('value', 'first'), rules=('description', ' / '.join))
+    fig.add_trace(go.Scatter(
+        x=pts.index, y=pts['value'],
+        mode='markers',
+        marker=dict(size=9, color="#E17055", symbol="diamond"),
+        text=pts['rules'],
+        hovertemplate="Batch %{x}<br>%{y:.2f}<br>%{text}<extra></extra>",
+        name="Nelson Rule"
+    ))
+
 # --------------------------------------------------------------------------
 # 1) Plotly SPC 관리도 함수
 # --------------------------------------------------------------------------
-def make_spc_chart_plotly(df_src: pd.DataFrame, var: str):
-    if ('배치번호' not in df_src.columns) or (var not in df_src.columns):
+def make_spc_chart_plotly(df_src: pd.DataFrame, var: str, cube=None, violations=None):
+    if cube is None:
+        if ('배치번호' not in df_src.columns) or (var not in df_src.columns):
+            return None
+        cube = get_cube(df_src)
+    if var not in cube.features:
         return None
+    if violations is None:
+        violations = evaluate_cube(cube, [var])
 
-    df_spc = df_src[['배치번호', var]].dropna().copy()
-    if df_spc.empty:
+    # 배치 평균은 큐브에서 바로 조회 (Batch_Index = 배치 등장 순서)
+    y = cube.batch_mean(var)
+    if y.empty:
         return None
-
-    batch_order = df_spc['배치번호'].unique()
-    batch_map = {b: idx for idx, b in enumerate(batch_order)}
-    df_spc['Batch_Index'] = df_spc['배치번호'].map(batch_map)
-
-    batch_avg = (
-        df_spc.groupby('Batch_Index')[var]
-              .mean()
-              .reset_index()
-              .sort_values('Batch_Index')
-    )
-
-    x = batch_avg['Batch_Index']
-    y = batch_avg[var]
+    x = y.index.to_series()
 
     mean = y.mean()
     std = y.std()
@@ -46,6 +72,8 @@ def make_spc_chart_plotly(df_src: pd.DataFrame, var: str):
         name="Batch Mean"
     ))
 
+    add_rule_markers(fig, violations, var)
+
     fig.add_trace(go.Scatter(
         x=x[out_mask], y=y[out_mask],
         mode='markers',
@@ -70,7 +98,8 @@ def make_spc_chart_plotly(df_src: pd.DataFrame, var: str):
 # ==============================================================================
 #                                 show_page(df)
 # ==============================================================================
-def show_page(df: pd.DataFrame):
+def show_page(df: pd.DataFrame, summary=None):
+    # summary: sketches.StreamingSummary (스트리밍 모드, df 에는 라벨 컬럼만 있음)
 
     # 헤더
     st.markdown("""
@@ -84,24 +113,21 @@ def show_page(df: pd.DataFrame):
 
     num_cols = df.select_dtypes(include=np.number).columns.tolist()
 
-    # 불량 라벨 생성
-    if '불량여부_le' in df.columns:
-        df['_불량라벨'] = df['불량여부_le'].apply(lambda x: '불량' if x == 1 else '정상')
-    else:
-        df['_불량라벨'] = df['불량여부'].astype(str).apply(
-            lambda v: '불량' if v.upper() not in ['0', 'FALSE'] else '정상'
-        )
+    # 배치 x 피처 통계 큐브 (SPC / Six-Sigma / Cpk 공용, 데이터셋당 1회 집계)
+    # (사전 집계 데몬이 같은 원본/필터로 계산해 둔 결과가 있으면 그대로 사용)
+    with tracing.stage("stats.batch_cube", rows=len(df)):
+        if summary is not None:
+            cube = summary.cube
+        else:
+            cube = precompute.lookup(st.session_state, "cube")
+            if cube is None and '배치번호' in df.columns:
+                cube = get_engine().batch_cube(df)
 
-    # 공정 × 결함 조합
-    if '공정명' in df.columns and '결함유형' in df.columns:
-        combo_counts = (
-            df.groupby(['공정명', '결함유형'])
-              .size()
-              .reset_index(name='Count')
-              .sort_values('Count', ascending=False)
-        )
-    else:
-        combo_counts = None
+    # Nelson 규칙 위반 (전체 피처 x 전체 배치 1회 판정, 관리도 공용)
+    with tracing.stage("stats.spc_rules"):
+        violations = evaluate_cube(cube) if cube is not None else None
+
+    # df 는 캐시된 원본 프레임일 수 있으므로 읽기 전용으로만 사용 (파생 컬럼 추가 금지)
 
     # ----------------------------------------------------------------------
     # 상단 compact 필터 (SPC 그룹)
@@ -132,41 +158,34 @@ def show_page(df: pd.DataFrame):
     # 왼쪽 SPC
     with col_left:
         st.markdown(f"<h5>{var_left}</h5>", unsafe_allow_html=True)
-        fig1 = make_spc_chart_plotly(df, var_left)
-        if fig1:
-            st.plotly_chart(fig1, use_container_width=True)
-        else:
-            st.info(f"{var_left} 관리도를 그릴 수 없습니다.")
+        with tracing.stage("stats.spc_chart"):
+            fig1 = make_spc_chart_plotly(df, var_left, cube, violations)
+            if fig1:
+                st.plotly_chart(fig1, use_container_width=True)
+            else:
+                st.info(f"{var_left} 관리도를 그릴 수 없습니다.")
 
     # 가운데 SPC
     with col_mid:
         st.markdown(f"<h5>{var_mid}</h5>", unsafe_allow_html=True)
-        fig2 = make_spc_chart_plotly(df, var_mid)
-        if fig2:
-            st.plotly_chart(fig2, use_container_width=True)
-        else:
-            st.info(f"{var_mid} 관리도를 그릴 수 없습니다.")
+        with tracing.stage("stats.spc_chart"):
+            fig2 = make_spc_chart_plotly(df, var_mid, cube, violations)
+            if fig2:
+                st.plotly_chart(fig2, use_container_width=True)
+            else:
+                st.info(f"{var_mid} 관리도를 그릴 수 없습니다.")
 
     # Cpk 계산 함수 및 등급
-    spec = {
-        "에너지값": (0, 6000),
-        "검출면적": (0, 0.5),
-        "신호강도": (0, 1500),
-        "잡음정도": (0, 800),
-        "명도수준": (0, 500),
-        "기준편차": (0, 300)
-    }
+    spec = CPK_SPEC
 
-    def compute_cpk(series, lsl, usl):
-        s = series.dropna()
-        if len(s) < 3:
-            return np.nan
-        m, sd = s.mean(), s.std()
-        if sd == 0:
-            return np.nan
-        cpu = (usl - m) / (3 * sd)
-        cpl = (m - lsl) / (3 * sd)
-        return min(cpu, cpl)
+    # 수치 컬럼 전체 통계 (Cpk / 이상치 / 기술통계 공용, 행렬 1회 계산)
+    with tracing.stage("stats.column_stats", rows=len(df)):
+        if summary is not None:
+            col_stats = summary.column_stats(spec)
+        else:
+            col_stats = precompute.lookup(st.session_state, "colstats")
+        if col_stats is None:
+            col_stats = get_column_stats(df, frame_fingerprint(df), tuple(num_cols), tuple(spec.items()))
 
     def cpk_status(cpk):
         if cpk >= 1.67: return "최우수 (6σ)", "#6C5CE7"
@@ -181,9 +200,8 @@ def show_page(df: pd.DataFrame):
 
         rows = []
         for v in spc_groups["에너지/물리 결함"] + spc_groups["신호/잡음 결함"] + spc_groups["SHAP 기준 결함"]:
-            if v in df.columns and v in spec:
-                lsl, usl = spec[v]
-                cpk = compute_cpk(df[v], lsl, usl)
+            if v in col_stats.index and v in spec:
+                cpk = col_stats.at[v, 'cpk']
                 if not np.isnan(cpk):
                     rows.append((v, cpk))
 
@@ -214,15 +232,9 @@ def show_page(df: pd.DataFrame):
         '정렬정도', '점형지수', '영역잡음', '상대강도',
         '활성지수', '패치신호'
     ]
-    mid_features = [c for c in mid_features if c in df.columns]
-
-    # Batch_Index 없으면 생성
-    if '배치번호' in df.columns and 'Batch_Index' not in df.columns:
-        batch_order_mid = df['배치번호'].unique()
-        batch_map_mid = {b: idx for idx, b in enumerate(batch_order_mid)}
-        df['Batch_Index'] = df['배치번호'].map(batch_map_mid)
+    mid_features = [c for c in mid_features if c in col_stats.index]
 
-    if mid_features and 'Batch_Index' in df.columns:
+    if mid_features and cube is not None:
         # compact 필터
         st.markdown("""
             <div style='display:flex; justify-content:flex-end; margin-top:5px; margin-bottom:-10px;'>
@@ -238,12 +250,9 @@ def show_page(df: pd.DataFrame):
             key="mid_feature_select"
         )
 
-        series = df[selected_mid_feature].dropna()
-        if len(series) > 1:
-            μ_raw = series.mean()
-            σ_raw = series.std()
-        else:
-            μ_raw, σ_raw = series.mean(), 0.0
+        n_valid = int(col_stats.at[selected_mid_feature, 'count'])
+        μ_raw = col_stats.at[selected_mid_feature, 'mean']
+        σ_raw = col_stats.at[selected_mid_feature, 'std'] if n_valid > 1 else 0.0
 
         # 레이아웃
         m_left, m_mid, m_right = st.columns([2, 2, 1])
@@ -252,15 +261,19 @@ def show_page(df: pd.DataFrame):
         with m_left:
             st.markdown(f"<h5>{selected_mid_feature} 분포</h5>", unsafe_allow_html=True)
 
-            if len(series) > 1:
-                bins = 40
-                counts, bin_edges = np.histogram(series, bins=bins)
+            if n_valid > 1:
+                with tracing.stage("stats.histogram", rows=n_valid):
+                    if summary is not None:
+                        counts, bin_edges = summary.histogram(selected_mid_feature)
+                    else:
+                        bins = 40
+                        counts, bin_edges = np.histogram(df[selected_mid_feature].dropna(), bins=bins)
                 bin_centers = 0.5 * (bin_edges[:-1] + bin_edges[1:])
 
                 if σ_raw > 0:
                     pdf = (1 / (σ_raw * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((bin_centers - μ_raw) / σ_raw) ** 2)
                     bin_width = bin_edges[1] - bin_edges[0]
-                    pdf_scaled = pdf * len(series) * bin_width
+                    pdf_scaled = pdf * n_valid * bin_width
                 else:
                     pdf_scaled = np.zeros_like(bin_centers)
 
@@ -294,17 +307,9 @@ def show_page(df: pd.DataFrame):
         with m_mid:
             st.markdown(f"<h5>{selected_mid_feature} Six-Sigma</h5>", unsafe_allow_html=True)
 
-            df_six = df[['Batch_Index', selected_mid_feature]].dropna()
-            if not df_six.empty:
-                df_six = (
-                    df_six.groupby('Batch_Index')[selected_mid_feature]
-                          .mean()
-                          .reset_index()
-                          .sort_values('Batch_Index')
-                )
-
-                y = df_six[selected_mid_feature]
-                x = df_six['Batch_Index']
+            y = cube.batch_mean(selected_mid_feature)
+            if not y.empty:
+                x = y.index.to_series()
 
                 μ_batch = y.mean()
                 σ_batch = y.std()
@@ -362,6 +367,8 @@ def show_page(df: pd.DataFrame):
                     name="Batch Mean"
                 ))
 
+                add_rule_markers(fig_six, violations, selected_mid_feature)
+
                 # ±3σ 넘은 점만 빨간 점
                 if σ_batch > 0:
                     mask_out = (y > z3p) | (y < z3n)
@@ -399,20 +406,12 @@ def show_page(df: pd.DataFrame):
         with m_right:
             st.markdown("<h5>이상치 Top10</h5>", unsafe_allow_html=True)
 
-            outlier_summary = []
-            for col in mid_features:
-                s = df[col].dropna()
-                if len(s) < 2:
-                    outlier_summary.append((col, 0))
-                    continue
-                m = s.mean()
-                sd = s.std()
-                upper = m + 3 * sd
-                lower = m - 3 * sd
-                cnt = ((s > upper) | (s < lower)).sum()
-                outlier_summary.append((col, cnt))
-
-            outlier_summary = sorted(outlier_summary, key=lambda x: x[1], reverse=True)[:10]
+            outlier_summary = (
+                col_stats.loc[mid_features, 'outliers']
+                         .sort_values(ascending=False, kind='stable')
+                         .head(10)
+                         .items()
+            )
 
             html = "<ul style='font-size:13px; line-height:1.6;'>"
             for idx, (col, oc) in enumerate(outlier_summary):
@@ -434,8 +433,9 @@ def show_page(df: pd.DataFrame):
     # ----------------------------------------------------------------------
     st.markdown("<h5>숫자형 기술통계</h5>", unsafe_allow_html=True)
 
-    if num_cols:
-        desc = df[num_cols].describe().T
-        st.dataframe(desc, use_container_width=True)
+    if not col_stats.empty:
+        with tracing.stage("stats.describe", rows=len(col_stats)):
+            desc = col_stats[DESCRIBE_COLS]
+            st.dataframe(desc, use_container_width=True)
     else:
         st.info("숫자형 변수가 없습니다.")
@@ -0,0 +1,164 @@
+# ==========================================
+# synthetic.py  (벤치마크용 합성 웨이퍼 데이터)
+#
+#   python synthetic.py 1000000 -o synthetic_1m.csv
+#
+#   원본 CSV 와 같은 스키마: FEATURES + Process / failureType / lotName / x / y
+#   - 배치(lotName)는 ROWS_PER_LOT 행씩 연속 구간, 공정은 배치 단위로 고정
+#   - 결함 유형(model_spec.CLASS_NAMES)별로 좌표 분포(센터 / 도넛 / 엣지 / 스크래치 ...)가 다르고
+#     진성 결함은 일부 피처 평균이 이동 (REAL/FALSE 모델이 학습할 신호)
+#   - 일부 배치는 피처 평균이 드리프트 (SPC 규칙 위반이 나오도록)
+#   같은 (n_rows, seed, chunk_rows) 면 항상 같은 데이터
+# ==========================================
+
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import data_source
+import model_spec
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow 없으면 pandas to_csv 로 기록
+    pa = None
+
+FEATURES = data_source.FEATURES
+
+PROCESSES = ("PC", "RMG", "CBCMP")
+DEFECT_TYPES = ("none",) + tuple(model_spec.CLASS_NAMES[i] for i in sorted(model_spec.CLASS_NAMES))
+DEFECT_WEIGHTS = (0.50, 0.07, 0.04, 0.09, 0.08, 0.08, 0.02, 0.05, 0.07)
+
+ROWS_PER_LOT = 500
+CHUNK_ROWS = 500_000
+
+# 진성 결함일 때 평균이 이동하는 피처 / 드리프트 배치 비율과 크기(표준편차 단위)
+DEFECT_SHIFT = {"신호강도": 0.8, "에너지값": 0.7, "검출면적": 0.6, "명도수준": -0.5}
+DRIFT_LOT_RATE = 0.02
+DRIFT_SIZE = 1.5
+
+# 유형별 반지름 분포 (평균, 표준편차) — 웨이퍼 반지름 1 기준, None 은 원판 균일
+_RADIUS = {
+    "none": None, "Random": None, "Near-full": None,
+    "Center": (0.0, 0.18), "Donut": (0.5, 0.07),
+    "Edge-Loc": (0.9, 0.05), "Edge-Ring": (0.95, 0.03),
+}
+
+
+def _lot_values(lots: np.ndarray, seed: int, salt: int) -> np.ndarray:
+    """배치 번호별 고정 난수 [0, 1) (chunk 경계와 무관하게 같은 배치는 같은 값)"""
+    h = (lots.astype(np.uint64) * np.uint64(2654435761) + np.uint64(seed * 97 + salt)) % np.uint64(2 ** 32)
+    h = (h ^ (h >> np.uint64(16))) * np.uint64(0x45d9f3b) % np.uint64(2 ** 32)
+    return h.astype(np.float64) / 2 ** 32
+
+
+def _coordinates(rng, defect: np.ndarray, lots: np.ndarray, seed: int):
+    n = len(defect)
+    r = np.sqrt(rng.random(n))
+    theta = rng.random(n) * 2 * np.pi
+
+    for name, dist in _RADIUS.items():
+        if dist is None:
+            continue
+        mask = defect == name
+        r[mask] = np.abs(rng.normal(dist[0], dist[1], mask.sum()))
+
+    # Edge-Loc / Loc 은 배치마다 정해진 방향에 몰림
+    lot_angle = _lot_values(lots, seed, 1) * 2 * np.pi
+    mask = np.isin(defect, ("Edge-Loc", "Loc"))
+    theta[mask] = lot_angle[mask] + rng.normal(0, 0.3, mask.sum())
+    mask = defect == "Loc"
+    r[mask] = np.abs(rng.normal(0.55, 0.1, mask.sum()))
+
+    r = np.minimum(r, 1.0)
+    x, y = r * np.cos(theta), r * np.sin(theta)
+
+    # Scratch 는 배치마다 정해진 방향의 선분
+    mask = defect == "Scratch"
+    if mask.any():
+        t = rng.uniform(-0.8, 0.8, mask.sum())
+        ang = lot_angle[mask]
+        x[mask] = t * np.cos(ang) + rng.normal(0, 0.02, mask.sum())
+        y[mask] = t * np.sin(ang) + rng.normal(0, 0.02, mask.sum())
+
+    return np.clip(x, -1, 1), np.clip(y, -1, 1)
+
+
+def generate(n_rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """원본 CSV 스키마의 합성 데이터 n_rows 행 (start: 전체 데이터에서의 시작 행 번호)"""
+    rng = np.random.default_rng([seed, start])
+    lots = (start + np.arange(n_rows)) // ROWS_PER_LOT
+
+    defect = np.asarray(DEFECT_TYPES, dtype=object)[
+        rng.choice(len(DEFECT_TYPES), size=n_rows, p=DEFECT_WEIGHTS)
+    ]
+    process = np.asarray(PROCESSES, dtype=object)[(_lot_values(lots, seed, 0) * len(PROCESSES)).astype(int)]
+
+    X = rng.standard_normal((n_rows, len(FEATURES)))
+    real = defect != "none"
+    for f, shift in DEFECT_SHIFT.items():
+        X[real, FEATURES.index(f)] += shift
+
+    # 배치 평균 드리프트 (대부분 작게, DRIFT_LOT_RATE 비율의 배치는 크게)
+    drift = (_lot_values(lots, seed, 2) - 0.5) * 0.2
+    drift += np.where(_lot_values(lots, seed, 3) < DRIFT_LOT_RATE, DRIFT_SIZE, 0.0)
+    X += drift[:, None]
+
+    x, y = _coordinates(rng, defect, lots, seed)
+
+    df = pd.DataFrame(np.round(X, 5), columns=FEATURES)
+    df["Process"] = process
+    df["failureType"] = defect
+    df["lotName"] = np.char.add("lot", (lots + 1).astype(str)).astype(object)
+    df["x"] = np.round(x, 5)
+    df["y"] = np.round(y, 5)
+    return df
+
+
+def iter_chunks(n_rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS):
+    for start in range(0, n_rows, chunk_rows):
+        yield generate(min(chunk_rows, n_rows - start), seed, start)
+
+
+def write_csv(path: str, n_rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> str:
+    """chunk 단위로 생성해서 기록 (메모리는 chunk 크기만큼만 사용)"""
+    if pa is None:
+        for i, chunk in enumerate(iter_chunks(n_rows, seed, chunk_rows)):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        return path
+
+    writer = None
+    try:
+        for chunk in iter_chunks(n_rows, seed, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pacsv.CSVWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def generate_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """페이지가 받는 형태 (load_csv_frame 과 같은 정규화 / MEMORY_MODE 적용)"""
+    df = data_source.normalize_columns(pd.concat(iter_chunks(n_rows, seed), ignore_index=True))
+    return data_source.compact_frame(df) if data_source.COMPACT else df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="합성 웨이퍼 데이터 CSV 생성")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    write_csv(args.output, args.rows, args.seed)
+    print(f"✅ {args.rows:,}행 -> {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# ==========================================
+# tracing.py  (rerun 단위 단계별 시간 / 처리 행 수 / 메모리 변화 기록)
+#
+#   with tracing.stage("KPI.predict_proba", rows=len(df)) as span:
+#       ...
+#       span.rows = n_scored                     # 처리 행 수를 끝난 뒤에 정해도 됨
+#
+#   TRACE_OVERLAY=1 streamlit run main.py        # 사이드바 '⏱ 단계 프로파일' 토글
+#   TRACE_FILE=trace.json streamlit run main.py  # 매 rerun 을 Chrome trace 로 이어서 기록
+#                                                # (chrome://tracing / ui.perfetto.dev 에서 열기)
+#
+#   - main.py 가 rerun 시작/끝에 begin_run() / end_run() 호출, 그 사이 stage() 는 현재 rerun 에 기록
+#     (rerun 은 세션별 스크립트 스레드에서 실행되므로 현재 rerun 은 스레드 로컬)
+#   - rerun 밖(CLI, 워커 스레드)에서는 기록 없이 블록만 실행
+#   - 프로세스 전체 최근 TRACE_HISTORY 개 rerun 보관 -> 단계별 중앙값 대비 회귀 표시 / 내보내기
+# ==========================================
+
+import os
+import json
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # psutil 없으면 메모리 변화 생략
+    psutil = None
+
+from startup_profile import REGRESSION_RATIO
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "200"))
+
+# 이 시간(초) 미만이거나 이전 기록이 이 개수보다 적은 단계는 회귀 판정에서 제외 (측정 잡음)
+MIN_REGRESSION_SEC = 0.01
+MIN_HISTORY = 3
+
+_local = threading.local()
+_runs = deque(maxlen=TRACE_HISTORY)
+_lock = threading.Lock()
+_file_lock = threading.Lock()
+_run_ids = itertools.count(1)
+_process = psutil.Process() if psutil is not None else None
+
+
+def _rss():
+    return _process.memory_info().rss if _process is not None else None
+
+
+class Span:
+    __slots__ = ("name", "rows", "start", "seconds", "mem_mb", "depth")
+
+    def __init__(self, name: str, rows=None):
+        self.name = name
+        self.rows = rows
+        self.start = self.seconds = self.mem_mb = None
+        self.depth = 0
+
+
+class Run:
+    def __init__(self, label: str = ""):
+        self.id = next(_run_ids)
+        self.label = label
+        self.thread = threading.get_ident()
+        self.started = time.time()
+        self.seconds = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._depth = 0
+
+
+# ==========================================
+# 1. 기록
+# ==========================================
+def begin_run(label: str = "") -> Run:
+    """현재 스레드의 rerun 시작 (이전 rerun 이 끝나지 않았으면 버림 — st.rerun / st.stop)"""
+    _local.run = Run(label)
+    return _local.run
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def end_run():
+    """현재 rerun 종료 -> 기록 보관 (TRACE_FILE 이 있으면 추가 기록)"""
+    run = current_run()
+    if run is None:
+        return None
+    _local.run = None
+    run.seconds = time.perf_counter() - run._t0
+    with _lock:
+        _runs.append(run)
+    if TRACE_FILE:
+        append_chrome(TRACE_FILE, [run])
+    return run
+
+
+@contextmanager
+def stage(name: str, rows=None):
+    """with 블록의 시간 / 처리 행 수 / RSS 변화를 현재 rerun 에 기록"""
+    span = Span(name, rows)
+    run = current_run()
+    if run is None:
+        yield span
+        return
+
+    span.depth = run._depth
+    run._depth += 1
+    mem0 = _rss()
+    t0 = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.seconds = time.perf_counter() - t0
+        span.start = t0 - run._t0
+        if mem0 is not None:
+            span.mem_mb = (_rss() - mem0) / 2 ** 20
+        run._depth -= 1
+        run.spans.append(span)
+
+
+def history():
+    with _lock:
+        return list(_runs)
+
+
+# ==========================================
+# 2. 요약 (오버레이용)
+# ==========================================
+def stage_medians(exclude: Run = None) -> dict:
+    """최근 rerun 들의 단계별 소요 시간 중앙값(초) (기록이 MIN_HISTORY 개 이상인 단계만)"""
+    times = {}
+    for run in history():
+        if run is exclude:
+            continue
+        for s in run.spans:
+            times.setdefault(s.name, []).append(s.seconds)
+    return {name: float(np.median(v)) for name, v in times.items() if len(v) >= MIN_HISTORY}
+
+
+def report(run: Run) -> pd.DataFrame:
+    """rerun 의 단계 목록 (시작 순, 중첩 깊이만큼 들여쓰기) + 최근 중앙값 / 회귀 여부"""
+    cols = ["stage", "ms", "rows", "mem_mb", "p50_ms", "regression"]
+    if run is None or not run.spans:
+        return pd.DataFrame(columns=cols)
+
+    medians = stage_medians(exclude=run)
+    rows = []
+    for s in sorted(run.spans, key=lambda s: s.start):
+        p50 = medians.get(s.name)
+        slower = p50 is not None and s.seconds >= MIN_REGRESSION_SEC and s.seconds > p50 * REGRESSION_RATIO
+        rows.append({
+            "stage": "· " * s.depth + s.name,
+            "ms": s.seconds * 1000,
+            "rows": s.rows,
+            "mem_mb": s.mem_mb,
+            "p50_ms": None if p50 is None else p50 * 1000,
+            "regression": bool(slower),
+        })
+    return pd.DataFrame(rows, columns=cols)
+
+
+# ==========================================
+# 3. Chrome trace 내보내기 (Trace Event Format, complete event 'X')
+# ==========================================
+def chrome_events(runs=None) -> list:
+    runs = history() if runs is None else runs
+    pid = os.getpid()
+    events = []
+    for run in runs:
+        base = run.started * 1e6
+        events.append({
+            "name": f"rerun #{run.id} {run.label}".strip(), "cat": "rerun", "ph": "X",
+            "ts": base, "dur": (run.seconds or 0) * 1e6, "pid": pid, "tid": run.thread,
+        })
+        for s in run.spans:
+            events.append({
+                "name": s.name, "cat": s.name.split(".")[0], "ph": "X",
+                "ts": base + s.start * 1e6, "dur": s.seconds * 1e6, "pid": pid, "tid": run.thread,
+                "args": {"rows": s.rows, "mem_delta_mb": s.mem_mb, "rerun": run.id},
+            })
+    return events
+
+
+def export_chrome(path: str = None, runs=None) -> str:
+    """최근 rerun 기록 -> Chrome trace JSON 문자열 (path 가 있으면 파일로도 저장)"""
+    text = json.dumps({"traceEvents": chrome_events(runs), "displayTimeUnit": "ms"}, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+def append_chrome(path: str, runs):
+    """이벤트를 JSON 배열 형식으로 이어서 기록 (닫는 ']' 없이도 trace 뷰어가 읽음)"""
+    lines = "".join(json.dumps(e, ensure_ascii=False) + ",\n" for e in chrome_events(runs))
+    with _file_lock:
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", encoding="utf-8") as f:
+            if new:
+                f.write("[\n")
+            f.write(lines)
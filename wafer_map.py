@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# 웨이퍼 맵 렌더링 모드 (점 개수 기준 자동 선택)
+#   raw    : 점 그대로 (SVG)
+#   webgl  : 점 그대로 (scattergl)
+#   binned : 색상 범주별 격자 집계 -> 격자 중심점 + 개수
+# --------------------------------------------------------------------------------
+RAW_MAX_POINTS = 20_000
+WEBGL_MAX_POINTS = 300_000
+GRID_BINS = 150
+
+
+def choose_render_mode(n_points: int) -> str:
+    if n_points <= RAW_MAX_POINTS:
+        return "raw"
+    if n_points <= WEBGL_MAX_POINTS:
+        return "webgl"
+    return "binned"
+
+
+def bin_by_category(x, y, category, bins: int = GRID_BINS, color_col: str = "category") -> pd.DataFrame:
+    """범주별 2D 격자 집계 (비어있지 않은 칸만 반환)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y = x[valid], y[valid]
+    codes, cats = pd.factorize(np.asarray(category)[valid], sort=True)
+
+    cols = ["wafer_x", "wafer_y", color_col, "count", "marker_size"]
+    if len(x) == 0:
+        return pd.DataFrame(columns=cols)
+
+    x0, x1 = x.min(), x.max()
+    y0, y1 = y.min(), y.max()
+    wx = (x1 - x0) or 1.0
+    wy = (y1 - y0) or 1.0
+
+    ix = np.minimum(((x - x0) / wx * bins).astype(np.int64), bins - 1)
+    iy = np.minimum(((y - y0) / wy * bins).astype(np.int64), bins - 1)
+
+    # (범주, ix, iy) -> 1차원 칸 번호, 채워진 칸만 집계 (범주 x 격자 전체 배열은 만들지 않음)
+    flat = (codes.astype(np.int64) * bins + ix) * bins + iy
+    nz, cnt = np.unique(flat, return_counts=True)
+
+    cat_idx, rest = np.divmod(nz, bins * bins)
+    bx, by = np.divmod(rest, bins)
+
+    out = pd.DataFrame({
+        "wafer_x": x0 + (bx + 0.5) * wx / bins,
+        "wafer_y": y0 + (by + 0.5) * wy / bins,
+        color_col: np.asarray(cats, dtype=str)[cat_idx],
+        "count": cnt,
+    })
+    # 개수는 로그 스케일로 점 크기에 반영
+    out["marker_size"] = 1 + np.log1p(cnt) / np.log1p(cnt.max()) * 5
+    return out
@@ -0,0 +1,319 @@
+# ==========================================
+# yolo_batch.py  (웨이퍼 맵 이미지 일괄 YOLO 분석)
+#
+#   python yolo_batch.py lot_images.zip -o yolo_summary.csv
+#   python yolo_batch.py ./wafer_maps --batch-size 32 --workers 2 --by-lot
+#
+#   - 폴더 / zip 의 이미지를 batch_size 장씩 묶어 predict (CPU 워커 풀, 워커마다 모델 1개)
+#   - 결과(검출 박스 / 주 결함 / DEFECT_KNOWLEDGE_BASE 항목)는 이미지 내용 해시로 캐시
+#   - 박스가 그려진 이미지는 annotate() 를 호출할 때만 생성
+# ==========================================
+
+import io
+import os
+import sys
+import hashlib
+import zipfile
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+import model_spec
+import inference_server
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+YOLO_CONF = 0.25
+BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", "16"))
+# ultralytics 모델 객체는 스레드 간 공유가 안전하지 않으므로 워커 스레드마다 별도 로딩
+WORKERS = int(os.getenv("YOLO_WORKERS", "2"))
+CACHE_ENTRIES = int(os.getenv("YOLO_CACHE_ENTRIES", "10000"))
+
+SUMMARY_COLS = ["lot", "file", "hash", "n_boxes", "main_defect", "korean", "cause", "action", "max_conf", "cached"]
+
+
+# ==========================================
+# 1. 입력 (폴더 / zip 경로 / 업로드된 zip)
+# ==========================================
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _is_image(name: str) -> bool:
+    base = os.path.basename(name)
+    return name.lower().endswith(IMAGE_EXTS) and not base.startswith(".") and "__MACOSX" not in name
+
+
+def _zip_images(zf: zipfile.ZipFile) -> list:
+    return [i for i in sorted(zf.infolist(), key=lambda i: i.filename) if not i.is_dir() and _is_image(i.filename)]
+
+
+def _iter_zip(zf: zipfile.ZipFile, default_lot: str):
+    for info in _zip_images(zf):
+        lot = os.path.basename(os.path.dirname(info.filename)) or default_lot
+        yield lot, os.path.basename(info.filename), zf.read(info)
+
+
+def zip_image_paths(data: bytes) -> list:
+    """zip 안 이미지의 저장 경로 (iter_images 와 같은 순서 = analyze 요약 행 순서, 압축 해제 없음)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return [i.filename for i in _zip_images(zf)]
+
+
+def read_zip_entry(data: bytes, path: str) -> bytes:
+    """zip 안의 이미지 1장만 읽기 (저장 경로로 조회)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return zf.read(path)
+
+
+def iter_images(source, lot: str = None):
+    """(lot, 파일명, bytes) — lot 은 이미지가 들어있는 폴더명 (없으면 zip/폴더 이름)"""
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, "read"):
+        data = source if isinstance(source, (bytes, bytearray)) else source.read()
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            yield from _iter_zip(zf, lot or getattr(source, "name", "upload"))
+        return
+
+    root_name = os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
+    if os.path.isdir(source):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            for fname in sorted(filenames):
+                if _is_image(fname):
+                    with open(os.path.join(dirpath, fname), "rb") as f:
+                        data = f.read()
+                    sub = os.path.relpath(dirpath, source)
+                    yield (lot or (root_name if sub == "." else os.path.basename(sub))), fname, data
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            yield from _iter_zip(zf, lot or root_name)
+    else:
+        with open(source, "rb") as f:
+            yield lot or root_name, os.path.basename(source), f.read()
+
+
+# ==========================================
+# 2. 결과 캐시 (이미지 해시 -> 분석 결과, LRU)
+# ==========================================
+class ResultCache:
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            rec = self._items.get(key)
+            if rec is not None:
+                self._items.move_to_end(key)
+            return rec
+
+    def put(self, key, rec):
+        with self._lock:
+            self._items[key] = rec
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_cache = ResultCache()
+
+
+def summarize(boxes) -> dict:
+    """boxes: [(cls_id, conf, (x1, y1, x2, y2))] -> 검출 목록 / 주 결함 / 지식베이스 항목"""
+    detections = [(model_spec.CLASS_NAMES.get(c, f"Class-{c}"), conf) for c, conf, _ in boxes]
+    if detections:
+        main_defect = max(detections, key=lambda x: x[1])[0]
+        knowledge = model_spec.DEFECT_KNOWLEDGE_BASE.get(
+            main_defect,
+            {"korean": main_defect, "cause": "원인 미등록", "action": "조치 정보 없음"}
+        )
+    else:
+        main_defect, knowledge = None, None
+    return {"boxes": list(boxes), "detections": detections, "main_defect": main_defect, "knowledge": knowledge}
+
+
+# ==========================================
+# 3. 추론 (워커 스레드별 모델 / 추론 서버)
+# ==========================================
+_local = threading.local()
+_pools = {}     # 워커 수 -> 풀 (교체하면 다른 세션이 쓰던 풀을 닫게 되므로 워커 수별로 유지)
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ThreadPoolExecutor:
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"yolo{workers}")
+            _pools[workers] = pool
+        return pool
+
+
+def _worker_model():
+    if getattr(_local, "model", None) is None:
+        model, err = model_registry.load_file("yolo", model_registry.path("yolo"))
+        if err:
+            raise RuntimeError(err)
+        _local.model = model
+    return _local.model
+
+
+def model_version() -> str:
+    client = inference_server.get_client()
+    if client is not None:
+        return "remote-" + str(client.models().get("yolo", {}).get("version"))
+    fpath = model_registry.path("yolo")
+    if not os.path.exists(fpath):
+        return "missing"
+    st_ = os.stat(fpath)
+    return _file_version(fpath, st_.st_mtime_ns, st_.st_size)
+
+
+_versions = {}
+
+
+def _file_version(fpath, mtime_ns, size):
+    key = (fpath, mtime_ns, size)
+    if key not in _versions:
+        _versions[key] = model_registry.file_sha256(fpath)
+    return _versions[key]
+
+
+def _decode(data: bytes):
+    from PIL import Image
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+def boxes_from_result(result):
+    b = result.boxes
+    return [(int(c), float(p), tuple(float(v) for v in xyxy))
+            for c, p, xyxy in zip(b.cls.tolist(), b.conf.tolist(), b.xyxy.tolist())]
+
+
+def _predict_batch(datas, conf: float):
+    client = inference_server.get_client()
+    if client is not None:
+        # batch_size 장을 요청 1회로 보내고 서버가 (다른 요청과 함께) 마이크로 배치로 묶음
+        return [boxes for boxes, _ in client.yolo_many(datas, conf=conf)]
+    results = _worker_model().predict(source=[_decode(d) for d in datas], conf=conf, save=False, verbose=False)
+    return [boxes_from_result(r) for r in results]
+
+
+def analyze(items, conf: float = YOLO_CONF, batch_size: int = BATCH_SIZE, workers: int = WORKERS,
+            cache: ResultCache = None, progress=None):
+    """items: [(lot, 파일명, bytes)] -> (이미지별 요약 DataFrame, {해시: 분석 결과})
+
+    progress(done, total) 는 새로 분석한 이미지 수 기준으로 호출
+    """
+    cache = cache or _cache
+    version = model_version()
+    items = list(items)
+    hashes = [content_hash(data) for _, _, data in items]
+
+    records, todo = {}, {}
+    for (_, _, data), h in zip(items, hashes):
+        if h in records or h in todo:
+            continue
+        rec = cache.get((version, conf, h))
+        if rec is not None:
+            records[h] = rec
+        else:
+            todo[h] = data
+    cached = set(records)
+
+    if todo:
+        keys = list(todo)
+        batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+        pool = _get_pool(workers)
+        futures = [pool.submit(_predict_batch, [todo[h] for h in b], conf) for b in batches]
+        done = 0
+        for b, fut in zip(batches, futures):
+            for h, boxes in zip(b, fut.result()):
+                rec = summarize(boxes)
+                cache.put((version, conf, h), rec)
+                records[h] = rec
+            done += len(b)
+            if progress is not None:
+                progress(done, len(keys))
+
+    rows = []
+    for (lot, fname, _), h in zip(items, hashes):
+        rec = records[h]
+        kb = rec["knowledge"] or {}
+        rows.append({
+            "lot": lot, "file": fname, "hash": h,
+            "n_boxes": len(rec["boxes"]),
+            "main_defect": rec["main_defect"],
+            "korean": kb.get("korean"), "cause": kb.get("cause"), "action": kb.get("action"),
+            "max_conf": max((c for _, c in rec["detections"]), default=np.nan),
+            "cached": h in cached,
+        })
+    return pd.DataFrame(rows, columns=SUMMARY_COLS), records
+
+
+def analyze_bytes(data: bytes, conf: float = YOLO_CONF) -> dict:
+    """단일 이미지 분석 결과 (같은 내용이면 캐시 사용)"""
+    _, records = analyze([(None, "", data)], conf=conf, workers=WORKERS)
+    return next(iter(records.values()))
+
+
+# ==========================================
+# 4. 후처리 (요청 시 렌더링 / lot 집계)
+# ==========================================
+def annotate(image, record: dict) -> np.ndarray:
+    """검출 박스를 그린 RGB 배열 (image: bytes 또는 PIL 이미지)"""
+    from PIL import ImageDraw
+    img = _decode(image) if isinstance(image, (bytes, bytearray)) else image.convert("RGB")
+    draw = ImageDraw.Draw(img)
+    width = max(2, round(sum(img.size) / 400))
+    for (name, conf), (_, _, (x1, y1, x2, y2)) in zip(record["detections"], record["boxes"]):
+        draw.rectangle((x1, y1, x2, y2), outline=(231, 76, 60), width=width)
+        label = f"{name} {conf:.2f}"
+        tx, ty = x1, max(0, y1 - 12)
+        draw.rectangle(draw.textbbox((tx, ty), label), fill=(231, 76, 60))
+        draw.text((tx, ty), label, fill=(255, 255, 255))
+    return np.asarray(img)
+
+
+def aggregate(summary: pd.DataFrame, by: str = "lot") -> pd.DataFrame:
+    """lot(또는 by 컬럼) x 주 결함 유형 이미지 수"""
+    if summary.empty:
+        return pd.DataFrame()
+    main = summary["main_defect"].fillna("미검출")
+    table = pd.crosstab(summary[by].fillna("-"), main)
+    table["합계"] = table.sum(axis=1)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="웨이퍼 맵 이미지 일괄 YOLO 분석")
+    parser.add_argument("source", help="이미지 폴더 / zip 파일")
+    parser.add_argument("-o", "--output", help="이미지별 요약 CSV")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--conf", type=float, default=YOLO_CONF)
+    parser.add_argument("--by-lot", action="store_true", help="lot 별 주 결함 집계 출력")
+    args = parser.parse_args(argv)
+
+    summary, _ = analyze(iter_images(args.source), args.conf, args.batch_size, args.workers,
+                         progress=lambda d, t: print(f"\r{d:,}/{t:,}", end="", flush=True))
+    print()
+    if args.output:
+        summary.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"✅ {len(summary):,}장 분석 -> {args.output}")
+    else:
+        print(summary.to_string(index=False))
+    if args.by_lot:
+        print(aggregate(summary).to_string())
+
+
+if __name__ == "__main__":
+    sys.exit(main())